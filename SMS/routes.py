@@ -1,7 +1,23 @@
-from flask import Blueprint, render_template, redirect, url_for, session, request, jsonify
+from flask import Blueprint, render_template, redirect, url_for, session, request, jsonify, Response, current_app
 from flask_login import login_required, current_user
 from functools import wraps
-from .utils.sms_handler import SMSHandler
+from datetime import timedelta
+from app.config import Config
+from app.models.user import db
+from app.models.sms_job import SMSJob
+from app.models.contact_set import ContactSet
+from app.utils.contact_store import load_contact_frame
+from app.utils.personalize import personalize
+from app.utils.dedup import PhoneDeduper, recently_messaged
+from app.models.suppression import SuppressionEvent
+from app.utils.suppression import START_KEYWORDS, STOP_KEYWORDS, record_suppression
+from twilio.request_validator import RequestValidator
+from app.utils.message_template import TemplateError, compile_template
+from .utils.sms_handler import get_sms_handler
+from .utils.job_queue import enqueue_campaign
+from .utils.preflight import preflight_messages, preflight_segments, render_batch
+from .utils.receipts import get_receipt_buffer
+from .utils.status_cache import get_status_cache, get_statuses
 from .utils.validator import validate_phone_numbers
 import logging
 
@@ -42,10 +58,19 @@ def index():
 @login_required
 @consent_required
 def send_sms():
-    """Handle SMS sending requests"""
+    """Queue an SMS campaign for the background workers and return its job ID"""
     try:
         data = request.get_json()
         
+        if isinstance(data, dict) and not isinstance(data.get('message', ''), str):
+            return jsonify({
+                'success': False,
+                'error': 'Message must be a string'
+            }), 400
+            
+        if data and 'contact_set_id' in data and 'message' in data:
+            return send_contact_set(data['contact_set_id'], data['message'])
+            
         # Validate input
         if not data or 'recipients' not in data or 'message' not in data:
             return jsonify({
@@ -57,26 +82,37 @@ def send_sms():
         recipients = data['recipients']
         message = data['message']
         
-        valid_numbers, invalid_numbers = validate_phone_numbers(recipients)
-        
-        if not valid_numbers:
+        # Check the template once here rather than failing every recipient in the worker
+        try:
+            compile_template(message).resolve({'phone'})
+        except TemplateError as e:
             return jsonify({
                 'success': False,
-                'error': 'No valid phone numbers provided',
-                'invalid_numbers': invalid_numbers
+                'error': str(e)
             }), 400
             
-        # Initialize SMS handler
-        sms_handler = SMSHandler()
+        numbers, invalid_numbers, skipped_recent = select_numbers(recipients)
         
-        # Send messages
-        results = sms_handler.send_bulk_sms(valid_numbers, message)
+        if not numbers:
+            return jsonify({
+                'success': False,
+                'error': no_numbers_error(skipped_recent),
+                'invalid_numbers': invalid_numbers,
+                'skipped_recent': skipped_recent
+            }), 400
+            
+        # Queue the campaign; SMS.worker sends it outside the request
+        recipients = [{'phone': number} for number in numbers]
+        job = enqueue_campaign(recipients, message, user_id=current_user.id)
         
         return jsonify({
             'success': True,
-            'results': results,
-            'invalid_numbers': invalid_numbers
-        })
+            'job_id': job.id,
+            'status_url': url_for('sms.job_status', job_id=job.id),
+            'invalid_numbers': invalid_numbers,
+            'skipped_recent': skipped_recent,
+            'preflight': preflight_messages(render_batch(recipients, message))
+        }), 202
         
     except Exception as e:
         logger.error(f"Error in send_sms: {str(e)}")
@@ -85,12 +121,161 @@ def send_sms():
             'error': 'Internal server error'
         }), 500
 
+def select_numbers(numbers):
+    """
+    Validate and deduplicate campaign numbers, then drop any messaged within
+    the last SMS_DEDUPE_WINDOW_HOURS when that window is set
+    
+    Returns:
+        tuple: (standardized numbers to message, invalid numbers, count of
+            numbers skipped as recently messaged)
+    """
+    valid_numbers, invalid_numbers = validate_phone_numbers(numbers)
+    numbers, skipped_recent = drop_recently_messaged(valid_numbers)
+    return numbers, invalid_numbers, skipped_recent
+
+def drop_recently_messaged(numbers):
+    """
+    Drop numbers messaged within the last SMS_DEDUPE_WINDOW_HOURS when that
+    window is set
+    
+    Returns:
+        tuple: (numbers to message, count of numbers skipped as recently messaged)
+    """
+    if not Config.SMS_DEDUPE_WINDOW_HOURS:
+        return numbers, 0
+        
+    recent = recently_messaged(numbers, timedelta(hours=Config.SMS_DEDUPE_WINDOW_HOURS))
+    return [number for number in numbers if number not in recent], len(recent)
+
+def no_numbers_error(skipped_recent):
+    """Error for a campaign left with nobody to message"""
+    if skipped_recent:
+        return f"Every valid number was already messaged in the last {Config.SMS_DEDUPE_WINDOW_HOURS} hours"
+    return 'No valid phone numbers provided'
+
+@sms.route('/preflight', methods=['POST'])
+@login_required
+@consent_required
+def preflight():
+    """
+    Report the encoding, segment count and estimated cost of a campaign without sending it.
+    Takes the same body as /sms/send: recipients or contact_set_id, plus message.
+    """
+    data = request.get_json(silent=True) or {}
+    if 'message' not in data or ('recipients' not in data and 'contact_set_id' not in data):
+        return jsonify({
+            'success': False,
+            'error': 'Missing required fields: recipients or contact_set_id, and message'
+        }), 400
+        
+    if not isinstance(data['message'], str):
+        return jsonify({
+            'success': False,
+            'error': 'Message must be a string'
+        }), 400
+        
+    if 'contact_set_id' in data:
+        prepared, error = prepare_contact_set(data['contact_set_id'], data['message'])
+        if error:
+            return error
+        _, invalid_numbers, skipped_recent, summary = prepared
+    else:
+        try:
+            compile_template(data['message']).resolve({'phone'})
+        except TemplateError as e:
+            return jsonify({
+                'success': False,
+                'error': str(e)
+            }), 400
+            
+        numbers, invalid_numbers, skipped_recent = select_numbers(data['recipients'])
+        recipients = [{'phone': number} for number in numbers]
+        summary = preflight_messages(render_batch(recipients, data['message']))
+        
+    return jsonify({
+        'success': True,
+        'preflight': summary,
+        'invalid_numbers': invalid_numbers,
+        'skipped_recent': skipped_recent
+    })
+
+def prepare_contact_set(contact_set_id, message):
+    """
+    Render a message for every sendable contact of a contact set
+    
+    Messages are rendered for the whole set up front with the shared batch
+    renderer, which also counts their segments.
+    
+    Returns:
+        tuple: ((recipients with phone and body, invalid numbers (always empty,
+            contacts without a valid number have no phone), count skipped as
+            recently messaged, preflight summary), None), or (None, error response)
+    """
+    contact_set = db.session.get(ContactSet, contact_set_id or 0)
+    if contact_set is None or (contact_set.user_id != current_user.id and not current_user.is_admin):
+        return None, (jsonify({
+            'success': False,
+            'error': 'Contact set not found'
+        }), 404)
+        
+    try:
+        batch = personalize(load_contact_frame(contact_set), message, links=False)
+    except TemplateError as e:
+        return None, (jsonify({
+            'success': False,
+            'error': str(e)
+        }), 400)
+        
+    # Stored numbers were validated and normalized at upload, so they are not
+    # run through the validator again; only the '+' of E.164 is put back
+    phones = ['+' + phone if phone else None for phone in batch['phone']]
+    numbers, skipped_recent = drop_recently_messaged([phone for phone in phones if phone])
+    allowed = set(numbers)
+    # Only the first contact with a given number is messaged
+    first = PhoneDeduper().keep(phones)
+    sendable = [phone in allowed and keep for phone, keep in zip(phones, first)]
+    recipients = [{'phone': phone, 'body': body}
+                  for phone, body, keep in zip(phones, batch['body'], sendable) if keep]
+    summary = preflight_segments(batch['encoding'][sendable] == 'UCS-2', batch['segments'][sendable])
+    return (recipients, [], skipped_recent, summary), None
+
+def send_contact_set(contact_set_id, message):
+    """
+    Queue a campaign for an uploaded contact set
+    
+    The response carries the preflight segment count and cost; the worker
+    then sends the pre-rendered bodies.
+    """
+    prepared, error = prepare_contact_set(contact_set_id, message)
+    if error:
+        return error
+    recipients, invalid_numbers, skipped_recent, summary = prepared
+    
+    if not recipients:
+        return jsonify({
+            'success': False,
+            'error': no_numbers_error(skipped_recent),
+            'invalid_numbers': invalid_numbers,
+            'skipped_recent': skipped_recent
+        }), 400
+        
+    job = enqueue_campaign(recipients, '{body}', user_id=current_user.id)
+    
+    return jsonify({
+        'success': True,
+        'job_id': job.id,
+        'status_url': url_for('sms.job_status', job_id=job.id),
+        'invalid_numbers': invalid_numbers,
+        'skipped_recent': skipped_recent,
+        'preflight': summary
+    }), 202
+
 @sms.route('/status/<message_id>')
 def message_status(message_id):
-    """Get the status of a sent message"""
+    """Get the status of a sent message, from the status cache when it is fresh"""
     try:
-        sms_handler = SMSHandler()
-        status = sms_handler.get_message_status(message_id)
+        status = get_statuses(get_sms_handler(), [message_id])[message_id]
         
         return jsonify({
             'success': True,
@@ -104,6 +289,144 @@ def message_status(message_id):
             'error': 'Internal server error'
         }), 500
 
+@sms.route('/status', methods=['POST'])
+@login_required
+def message_statuses():
+    """
+    Get the statuses of many sent messages in one request.
+    Body: {"message_ids": [...]}, at most STATUS_BULK_MAX IDs.
+    """
+    data = request.get_json(silent=True) or {}
+    message_ids = data.get('message_ids')
+    if not isinstance(message_ids, list) or not message_ids or \
+            not all(isinstance(message_id, str) for message_id in message_ids):
+        return jsonify({
+            'success': False,
+            'error': 'Missing required field: message_ids'
+        }), 400
+        
+    if len(message_ids) > Config.STATUS_BULK_MAX:
+        return jsonify({
+            'success': False,
+            'error': f"At most {Config.STATUS_BULK_MAX} message IDs per request"
+        }), 400
+        
+    try:
+        statuses = get_statuses(get_sms_handler(), message_ids)
+        
+        return jsonify({
+            'success': True,
+            'statuses': statuses
+        })
+        
+    except Exception as e:
+        logger.error(f"Error in message_statuses: {str(e)}")
+        return jsonify({
+            'success': False,
+            'error': 'Internal server error'
+        }), 500
+
+@sms.route('/jobs/<int:job_id>')
+@login_required
+def job_status(job_id):
+    """Report progress counters for a queued SMS campaign"""
+    job = SMSJob.query.get(job_id)
+    if job is None or (job.user_id != current_user.id and not current_user.is_admin):
+        return jsonify({
+            'success': False,
+            'error': 'Job not found'
+        }), 404
+        
+    return jsonify({
+        'success': True,
+        'job': job.to_dict()
+    })
+
+def valid_signature(public_url=None):
+    """
+    Whether the request carries a valid X-Twilio-Signature for our auth token.
+    Twilio signs the URL it posted to. Behind the App Service front end TLS
+    ends before the app, so request.url is http:// while Twilio signed
+    https://; the configured public URL is checked instead when there is one.
+    """
+    if not Config.TWILIO_AUTH_TOKEN:
+        return False
+    validator = RequestValidator(Config.TWILIO_AUTH_TOKEN)
+    return validator.validate(public_url or request.url, request.form,
+                              request.headers.get('X-Twilio-Signature', ''))
+
+@sms.route('/status-callback', methods=['POST'])
+def status_callback():
+    """
+    Twilio delivery receipts (SMS_STATUS_CALLBACK_URL). Receipts are buffered
+    and written to message_statuses in batches, so this only queues them.
+    """
+    if not valid_signature(Config.SMS_STATUS_CALLBACK_URL):
+        logger.warning("Rejected status callback with an invalid signature")
+        return Response(status=403)
+        
+    sid = request.form.get('MessageSid')
+    status = request.form.get('MessageStatus')
+    if not sid or not status:
+        return Response(status=400)
+        
+    error_code = request.form.get('ErrorCode') or None
+    get_receipt_buffer(current_app._get_current_object()).add(sid, status, error_code)
+    get_status_cache().put(sid, {'status': status, 'error_code': error_code, 'error_message': None})
+    return Response(status=204)
+
+@sms.route('/inbound', methods=['POST'])
+def inbound():
+    """
+    Twilio webhook for replies: STOP-style keywords add the sender to the
+    suppression list and START-style keywords take them off it
+    """
+    if not valid_signature(Config.SMS_INBOUND_URL):
+        logger.warning("Rejected inbound SMS webhook with an invalid signature")
+        return Response(status=403)
+        
+    keyword = request.form.get('Body', '').strip().upper()
+    sender = request.form.get('From', '')
+    if keyword in STOP_KEYWORDS:
+        record_suppression([sender], True, SuppressionEvent.REASON_STOP)
+    elif keyword in START_KEYWORDS:
+        record_suppression([sender], False, SuppressionEvent.REASON_START)
+        
+    # Empty TwiML: no automatic reply beyond the provider's own
+    return Response('<?xml version="1.0" encoding="UTF-8"?><Response></Response>', mimetype='text/xml')
+
+@sms.route('/suppressions', methods=['POST', 'DELETE'])
+@login_required
+def suppressions():
+    """
+    Block numbers from receiving messages (POST), or lift blocks (DELETE, admins only).
+    Body: {"numbers": [...]}
+    """
+    data = request.get_json(silent=True) or {}
+    numbers = data.get('numbers')
+    if not isinstance(numbers, list) or not numbers:
+        return jsonify({
+            'success': False,
+            'error': 'Missing required field: numbers'
+        }), 400
+        
+    suppress = request.method == 'POST'
+    if not suppress and not current_user.is_admin:
+        return jsonify({
+            'success': False,
+            'error': 'Only administrators can unblock numbers'
+        }), 403
+        
+    valid_numbers, invalid_numbers = validate_phone_numbers(numbers)
+    recorded = record_suppression(valid_numbers, suppress, SuppressionEvent.REASON_MANUAL,
+                                  user_id=current_user.id)
+    
+    return jsonify({
+        'success': True,
+        'blocked' if suppress else 'unblocked': recorded,
+        'invalid_numbers': invalid_numbers
+    })
+
 @sms.route('/validate-number', methods=['POST'])
 @login_required
 @consent_required
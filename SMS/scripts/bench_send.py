@@ -0,0 +1,36 @@
+"""
+Compare the thread-pool and asyncio send paths against a provider endpoint.
+
+Usage (with SMS.scripts.fake_provider running):
+    TWILIO_API_BASE_URL=http://127.0.0.1:8099 SMS_RATE_LIMIT=1000 \
+        python -m SMS.scripts.bench_send --count 2000
+"""
+import argparse
+import time
+from SMS.utils.sms_handler import get_sms_handler
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark SMS send paths')
+    parser.add_argument('--count', type=int, default=1000)
+    args = parser.parse_args()
+
+    handler = get_sms_handler()
+    recipients = [{'phone': f"07{i:09d}", 'name': f"Contact {i}"} for i in range(args.count)]
+    template = "Hello {name}, this is a benchmark message."
+
+    start = time.perf_counter()
+    results = handler.send_batch_sms(recipients, template)
+    elapsed = time.perf_counter() - start
+    sent = sum(1 for r in results if r['success'])
+    print(f"thread pool: {sent}/{args.count} sent in {elapsed:.2f}s ({sent / elapsed:.0f} msg/s)")
+
+    start = time.perf_counter()
+    results = handler.run_async(handler.send_batch_sms_async(recipients, template))
+    elapsed = time.perf_counter() - start
+    sent = sum(1 for r in results if r['success'])
+    print(f"asyncio:     {sent}/{args.count} sent in {elapsed:.2f}s ({sent / elapsed:.0f} msg/s)")
+
+    handler.run_async(handler.aclose())
+
+if __name__ == '__main__':
+    main()
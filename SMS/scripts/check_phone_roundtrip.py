@@ -0,0 +1,58 @@
+"""
+Check that numbers survive the SMS pipeline: validate, queue, then format for sending.
+
+Each sample number is validated the way /sms/send validates it, queued in a
+throwaway SQLite database, read back as the worker reads it and formatted
+for the provider. The formatted number must be the expected E.164 number.
+Exits non-zero if any number is lost or changed.
+
+Usage:
+    python -m SMS.scripts.check_phone_roundtrip
+"""
+import os
+import sys
+import tempfile
+
+# One number per numbering plan shape, with the E.164 form it must be sent to
+SAMPLES = [
+    ('+1 202 555 0123', '+12025550123'),
+    ('+27 82 123 4567', '+27821234567'),
+    ('+7 916 123 4567', '+79161234567'),
+    ('+33 6 12 34 56 78', '+33612345678'),
+    ('+44 (0)7946 220153', '+447946220153'),
+    ('07946 220154', '+447946220154'),
+]
+
+def main():
+    workdir = tempfile.mkdtemp(prefix='phone-roundtrip-')
+    os.environ['DATABASE_URL'] = 'sqlite:///' + os.path.join(workdir, 'roundtrip.db')
+    os.environ.setdefault('TWILIO_ACCOUNT_SID', 'AC' + '0' * 32)
+    os.environ.setdefault('TWILIO_AUTH_TOKEN', 'roundtrip')
+    os.environ.setdefault('TWILIO_PHONE_NUMBER', '+15005550006')
+
+    # Imported here so the app binds to the throwaway database
+    from app.app import app
+    from SMS.utils.job_queue import enqueue_campaign
+    from SMS.utils.sms_handler import get_sms_handler
+    from SMS.utils.validator import validate_phone_numbers
+
+    failures = 0
+    with app.app_context():
+        handler = get_sms_handler()
+        for raw, expected in SAMPLES:
+            valid, _ = validate_phone_numbers([raw])
+            stored = None
+            if valid:
+                job = enqueue_campaign([{'phone': valid[0]}], 'Round trip')
+                stored = job.recipients.first().phone
+            formatted = handler.format_phone_number(stored) if stored else None
+            ok = formatted == expected
+            failures += not ok
+            print(f"{'ok  ' if ok else 'FAIL'} {raw!r}: validated {valid[0] if valid else None!r}, "
+                  f"stored {stored!r}, sent to {formatted!r}")
+
+    print(f"{len(SAMPLES) - failures}/{len(SAMPLES)} numbers round-tripped")
+    sys.exit(1 if failures else 0)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,54 @@
+"""
+Local stand-in for the Twilio Messages API, for benchmarking the SMS send path.
+
+Usage:
+    python -m SMS.scripts.fake_provider --port 8099 --latency 0.15
+
+Then point the handler at it:
+    TWILIO_API_BASE_URL=http://127.0.0.1:8099
+"""
+import argparse
+import asyncio
+import itertools
+from aiohttp import web
+
+_sids = itertools.count(1)
+
+def create_app(latency: float) -> web.Application:
+    """Build an app that answers message create and fetch calls after a fixed delay"""
+    async def create_message(request: web.Request) -> web.Response:
+        form = await request.post()
+        await asyncio.sleep(latency)
+        return web.json_response({
+            'sid': f"SM{next(_sids):032d}",
+            'account_sid': request.match_info['account_sid'],
+            'to': form.get('To'),
+            'from': form.get('From'),
+            'body': form.get('Body'),
+            'status': 'queued',
+            'error_code': None,
+            'error_message': None
+        }, status=201)
+
+    async def fetch_message(request: web.Request) -> web.Response:
+        await asyncio.sleep(latency)
+        return web.json_response({
+            'sid': request.match_info['sid'],
+            'account_sid': request.match_info['account_sid'],
+            'status': 'delivered',
+            'error_code': None,
+            'error_message': None
+        })
+
+    app = web.Application()
+    app.router.add_post('/2010-04-01/Accounts/{account_sid}/Messages.json', create_message)
+    app.router.add_get('/2010-04-01/Accounts/{account_sid}/Messages/{sid}.json', fetch_message)
+    return app
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Fake Twilio Messages API')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8099)
+    parser.add_argument('--latency', type=float, default=0.15, help='seconds per request')
+    args = parser.parse_args()
+    web.run_app(create_app(args.latency), host=args.host, port=args.port)
@@ -0,0 +1,73 @@
+"""
+Post signed fake delivery receipts to /sms/status-callback, for load-testing it.
+
+Each message gets a sent receipt followed by a delivered or undelivered one,
+posted concurrently the way a provider flushes a burst of callbacks.
+
+Usage:
+    python -m SMS.scripts.fake_receipts http://127.0.0.1:5000/sms/status-callback \\
+        --auth-token $TWILIO_AUTH_TOKEN --messages 5000 --concurrency 50
+
+Receipts are signed for the URL they are posted to, or for --signed-url when
+the app checks them against SMS_STATUS_CALLBACK_URL.
+"""
+import argparse
+import asyncio
+import random
+import time
+from collections import deque
+from aiohttp import ClientSession, TCPConnector
+from twilio.request_validator import RequestValidator
+
+def receipts(messages: int):
+    """Form bodies for every receipt, message by message"""
+    for i in range(messages):
+        sid = f"SM{i:032d}"
+        yield {'MessageSid': sid, 'MessageStatus': 'sent'}
+        if random.random() < 0.05:
+            yield {'MessageSid': sid, 'MessageStatus': 'undelivered', 'ErrorCode': '30003'}
+        else:
+            yield {'MessageSid': sid, 'MessageStatus': 'delivered'}
+
+async def post_all(url: str, auth_token: str, messages: int, concurrency: int, signed_url: str = None):
+    validator = RequestValidator(auth_token)
+    queue = deque(receipts(messages))
+    latencies = []
+    statuses = {}
+
+    async def post(session: ClientSession):
+        while queue:
+            form = queue.popleft()
+            headers = {'X-Twilio-Signature': validator.compute_signature(signed_url or url, form)}
+            start = time.perf_counter()
+            async with session.post(url, data=form, headers=headers) as response:
+                await response.read()
+            latencies.append(time.perf_counter() - start)
+            statuses[response.status] = statuses.get(response.status, 0) + 1
+
+    async with ClientSession(connector=TCPConnector(limit=concurrency)) as session:
+        await asyncio.gather(*(post(session) for _ in range(concurrency)))
+    return latencies, statuses
+
+def main():
+    parser = argparse.ArgumentParser(description='Post fake delivery receipts')
+    parser.add_argument('url')
+    parser.add_argument('--auth-token', required=True)
+    parser.add_argument('--messages', type=int, default=5000)
+    parser.add_argument('--concurrency', type=int, default=50)
+    parser.add_argument('--signed-url', help='URL to sign receipts for, the app\'s SMS_STATUS_CALLBACK_URL')
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    latencies, statuses = asyncio.run(post_all(args.url, args.auth_token, args.messages,
+                                               args.concurrency, args.signed_url))
+    elapsed = time.perf_counter() - start
+
+    latencies.sort()
+    p50 = latencies[len(latencies) // 2] * 1000
+    p99 = latencies[int(len(latencies) * 0.99)] * 1000
+    print(f"{len(latencies)} receipts in {elapsed:.2f}s ({len(latencies) / elapsed:.0f}/s), "
+          f"p50 {p50:.1f}ms, p99 {p99:.1f}ms, responses {statuses}")
+
+if __name__ == '__main__':
+    main()
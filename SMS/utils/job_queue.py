@@ -0,0 +1,246 @@
+from datetime import datetime, timedelta
+import logging
+from typing import Dict, List, Optional
+from sqlalchemy import and_, or_, update
+from sqlalchemy.exc import OperationalError
+from app.config import Config
+from app.models.user import db
+from app.models.sms_job import SMSJob, SMSJobRecipient
+from app.models.activity import ActivityEvent, MessageRollup
+from app.utils.activity import count_messages, record_activity
+from app.utils.dedup import purge_recipient_history, record_recipients
+from .sms_handler import get_sms_handler
+
+logger = logging.getLogger(__name__)
+
+# Errors that interrupt a job without meaning it can't be sent: the database
+# or the network being briefly unavailable
+_TRANSIENT_ERRORS = (OperationalError, OSError)
+
+def enqueue_campaign(recipients: List[Dict[str, str]], message_template: str,
+                     user_id: Optional[int] = None) -> SMSJob:
+    """
+    Persist a campaign so a worker can send it outside the request
+
+    Args:
+        recipients (List[Dict]): Recipient dictionaries with a 'phone' key and template variables
+        message_template (str): Message template with placeholders
+        user_id (Optional[int]): The user who queued the campaign
+
+    Returns:
+        SMSJob: The queued job
+    """
+    job = SMSJob(
+        user_id=user_id,
+        message_template=message_template,
+        status=SMSJob.STATUS_QUEUED,
+        total=len(recipients),
+        sent=0,
+        failed=0,
+        next_position=0
+    )
+    db.session.add(job)
+    db.session.flush()
+
+    db.session.bulk_insert_mappings(SMSJobRecipient, [
+        {
+            'job_id': job.id,
+            'position': position,
+            'phone': recipient['phone'],
+            'variables': recipient,
+            'status': SMSJobRecipient.STATUS_PENDING
+        }
+        for position, recipient in enumerate(recipients)
+    ])
+    if Config.SMS_DEDUPE_WINDOW_HOURS:
+        # Remember the numbers so later campaigns within the window skip them
+        record_recipients([recipient['phone'] for recipient in recipients], job.created_at)
+    count_messages({MessageRollup.METRIC_QUEUED: job.total})
+    record_activity(ActivityEvent.KIND_CAMPAIGN_QUEUED,
+                    f"SMS campaign #{job.id} queued for {job.total} recipients", user_id)
+    db.session.commit()
+
+    logger.info(f"Queued SMS job {job.id} with {job.total} recipients")
+    if Config.SMS_DEDUPE_WINDOW_HOURS:
+        purge_recipient_history(timedelta(hours=Config.SMS_DEDUPE_WINDOW_HOURS))
+    return job
+
+def _claimable(now: datetime):
+    """Jobs that are waiting, or running under a worker whose lease has expired"""
+    lease_expiry = now - timedelta(seconds=Config.SMS_JOB_LEASE_SECONDS)
+    return or_(
+        SMSJob.status == SMSJob.STATUS_QUEUED,
+        and_(SMSJob.status == SMSJob.STATUS_RUNNING,
+             or_(SMSJob.heartbeat_at.is_(None), SMSJob.heartbeat_at < lease_expiry))
+    )
+
+def claim_next_job(worker_id: str) -> Optional[SMSJob]:
+    """
+    Atomically take ownership of the oldest claimable job
+
+    The claim is a conditional UPDATE, so when several workers race for the
+    same job only one of them sees a changed row.
+
+    Args:
+        worker_id (str): Identifier of the calling worker
+
+    Returns:
+        Optional[SMSJob]: The claimed job, or None if the queue is empty
+    """
+    now = datetime.utcnow()
+    candidates = db.session.query(SMSJob.id).filter(_claimable(now)) \
+        .order_by(SMSJob.created_at, SMSJob.id).limit(5).all()
+
+    for (job_id,) in candidates:
+        claimed = db.session.execute(
+            update(SMSJob)
+            .where(SMSJob.id == job_id, _claimable(now))
+            .values(status=SMSJob.STATUS_RUNNING, worker_id=worker_id, heartbeat_at=now)
+            .execution_options(synchronize_session=False)
+        )
+        db.session.commit()
+        if claimed.rowcount == 1:
+            job = db.session.get(SMSJob, job_id)
+            db.session.refresh(job)
+            if job.started_at is None:
+                job.started_at = now
+                db.session.commit()
+            return job
+
+    return None
+
+def _lease_update(job_id: int, owner: str, **values):
+    """
+    UPDATE of a job that only matches while the owner worker still holds it;
+    every write renews the heartbeat
+    """
+    return update(SMSJob) \
+        .where(SMSJob.id == job_id, SMSJob.worker_id == owner, SMSJob.status == SMSJob.STATUS_RUNNING) \
+        .values(heartbeat_at=datetime.utcnow(), **values)
+
+def _session_lease_update(job_id: int, owner: str, **values) -> bool:
+    """Run _lease_update in the session's transaction; False if the lease was lost"""
+    result = db.session.execute(
+        _lease_update(job_id, owner, **values).execution_options(synchronize_session=False)
+    )
+    return result.rowcount == 1
+
+def renew_lease(job_id: int, worker_id: str) -> bool:
+    """
+    Refresh a job's heartbeat in its own transaction, leaving the session's
+    pending work alone
+
+    Returns:
+        bool: False if another worker has taken the job over
+    """
+    with db.engine.begin() as connection:
+        return connection.execute(_lease_update(job_id, worker_id)).rowcount == 1
+
+def process_job(job: SMSJob, worker_id: str, should_stop=lambda: False) -> SMSJob:
+    """
+    Send a claimed job in chunks, checkpointing after each one
+
+    Each chunk of SMS_BATCH_SIZE recipients is sent and then committed together
+    with the job's counters and next_position. A worker that crashes loses at
+    most the chunk in flight, which the next worker to claim the job resends.
+
+    Every write to the job is conditional on this worker still holding it.
+    Long chunks are sent in slices that take about a third of the lease at
+    SMS_RATE_LIMIT, renewing the heartbeat after each, so a live worker's job
+    isn't taken over. If it is taken over anyway, the worker stops and its
+    uncommitted chunk (outcomes and counters) is discarded.
+
+    Args:
+        job (SMSJob): A job claimed by this worker
+        worker_id (str): Identifier of the calling worker
+        should_stop (callable): Returns True when the worker is shutting down
+
+    Returns:
+        SMSJob: The job after processing
+    """
+    handler = get_sms_handler()
+    chunk_size = max(1, Config.SMS_BATCH_SIZE)
+    slice_size = max(1, int(Config.SMS_RATE_LIMIT * Config.SMS_JOB_LEASE_SECONDS / 3))
+    job_id = job.id
+
+    def lost_lease() -> SMSJob:
+        db.session.rollback()
+        logger.warning(f"SMS job {job_id} was taken over by another worker; {worker_id} stopped sending it")
+        return job
+
+    try:
+        while True:
+            if should_stop():
+                # Hand the job back so another worker can resume it immediately
+                if not _session_lease_update(job_id, worker_id, status=SMSJob.STATUS_QUEUED, worker_id=None):
+                    return lost_lease()
+                db.session.commit()
+                logger.info(f"Released SMS job {job_id} at position {job.next_position}")
+                return job
+
+            chunk = job.recipients \
+                .filter(SMSJobRecipient.position >= job.next_position) \
+                .order_by(SMSJobRecipient.position) \
+                .limit(chunk_size).all()
+            if not chunk:
+                break
+
+            payload = [dict(recipient.variables or {}, phone=recipient.phone) for recipient in chunk]
+            results = []
+            for start in range(0, len(payload), slice_size):
+                if start and not renew_lease(job_id, worker_id):
+                    return lost_lease()
+                results += handler.send_batch_sms(payload[start:start + slice_size], job.message_template)
+
+            now = datetime.utcnow()
+            sent = 0
+            for recipient, result in zip(chunk, results):
+                if result.get('success'):
+                    recipient.status = SMSJobRecipient.STATUS_SENT
+                    recipient.message_id = result.get('message_id')
+                    recipient.sent_at = now
+                    sent += 1
+                else:
+                    recipient.status = SMSJobRecipient.STATUS_FAILED
+                    recipient.error = result.get('error')
+            failed = len(chunk) - sent
+            count_messages({MessageRollup.METRIC_SENT: sent, MessageRollup.METRIC_FAILED: failed}, now)
+
+            # Checkpoint, committed only while this worker still holds the job
+            if not _session_lease_update(job_id, worker_id, next_position=chunk[-1].position + 1,
+                                         sent=SMSJob.sent + sent, failed=SMSJob.failed + failed):
+                return lost_lease()
+            db.session.commit()
+            logger.info(f"SMS job {job_id}: {job.processed}/{job.total} processed")
+
+        if not _session_lease_update(job_id, worker_id, status=SMSJob.STATUS_COMPLETED,
+                                     completed_at=datetime.utcnow(), worker_id=None, error=None):
+            return lost_lease()
+        record_activity(ActivityEvent.KIND_CAMPAIGN_COMPLETED,
+                        f"SMS campaign #{job_id} completed: {job.sent} sent, {job.failed} failed", job.user_id)
+        db.session.commit()
+        logger.info(f"Completed SMS job {job_id}: {job.sent} sent, {job.failed} failed")
+
+    except _TRANSIENT_ERRORS as e:
+        # Keep the checkpoint and let the lease lapse: any worker resumes the
+        # job from next_position after SMS_JOB_LEASE_SECONDS, so an error
+        # that persists doesn't resend the same chunk in a tight loop
+        db.session.rollback()
+        logger.warning(f"SMS job {job_id} interrupted, will resume from its last checkpoint: {str(e)}")
+        try:
+            if _session_lease_update(job_id, worker_id, worker_id=None, error=str(e)):
+                db.session.commit()
+        except Exception as release_error:
+            db.session.rollback()
+            logger.error(f"Could not release SMS job {job_id}, its lease will expire: {str(release_error)}")
+
+    except Exception as e:
+        db.session.rollback()
+        logger.error(f"SMS job {job_id} failed: {str(e)}")
+        if _session_lease_update(job_id, worker_id, status=SMSJob.STATUS_FAILED, error=str(e), worker_id=None):
+            record_activity(ActivityEvent.KIND_CAMPAIGN_FAILED,
+                            f"SMS campaign #{job_id} failed after {job.processed} of {job.total} recipients",
+                            job.user_id)
+            db.session.commit()
+
+    return job
@@ -0,0 +1,54 @@
+import logging
+from typing import Dict, List, Sequence
+from app.config import Config
+from app.utils.message_template import MissingFieldError, compile_template
+from app.utils.segments import count_segments, summarize_segments
+
+logger = logging.getLogger(__name__)
+
+def preflight_messages(bodies: Sequence[str]) -> Dict[str, object]:
+    """
+    Segment and cost summary for rendered message bodies, before anything is sent
+
+    Args:
+        bodies (Sequence[str]): Rendered messages
+
+    Returns:
+        Dict: summarize_segments totals priced at SMS_SEGMENT_PRICE, plus the currency
+    """
+    is_ucs2, _, segments = count_segments(bodies)
+    return preflight_segments(is_ucs2, segments)
+
+def preflight_segments(is_ucs2: Sequence[bool], segments: Sequence[int]) -> Dict[str, object]:
+    """
+    Preflight summary for segment counts that were already worked out
+
+    Args:
+        is_ucs2 (Sequence[bool]): Whether each message needs UCS-2
+        segments (Sequence[int]): Segment count of each message
+
+    Returns:
+        Dict: summarize_segments totals priced at SMS_SEGMENT_PRICE, plus the currency
+    """
+    summary = summarize_segments(is_ucs2, segments, Config.SMS_SEGMENT_PRICE, Config.SMS_MAX_SEGMENTS)
+    summary['currency'] = Config.SMS_PRICE_CURRENCY
+    if summary['over_limit']:
+        logger.warning(f"{summary['over_limit']} of {summary['messages']} messages exceed "
+                       f"{Config.SMS_MAX_SEGMENTS} segments")
+    return summary
+
+def render_batch(recipients: Sequence[Dict[str, str]], message_template: str) -> List[str]:
+    """
+    Render a campaign the way send_batch_sms will, skipping recipients it would reject
+
+    Raises:
+        TemplateError: If the template itself is malformed
+    """
+    template = compile_template(message_template)
+    bodies = []
+    for recipient in recipients:
+        try:
+            bodies.append(template.render(recipient))
+        except MissingFieldError:
+            continue
+    return bodies
@@ -0,0 +1,66 @@
+import threading
+import time
+from typing import Optional
+
+
+class TokenBucket:
+    """Thread-safe token bucket used to pace outbound provider requests"""
+
+    def __init__(self, rate: float, capacity: Optional[float] = None):
+        """
+        Initialize the bucket
+
+        Args:
+            rate (float): Tokens added per second (messages per second)
+            capacity (Optional[float]): Maximum burst size, defaults to one second of tokens
+        """
+        if rate <= 0:
+            raise ValueError("Token bucket rate must be positive")
+
+        self.rate = float(rate)
+        self.capacity = float(capacity) if capacity else max(1.0, self.rate)
+        self._tokens = self.capacity
+        self._last_refill = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self, now: float) -> None:
+        elapsed = now - self._last_refill
+        if elapsed > 0:
+            self._tokens = min(self.capacity, self._tokens + elapsed * self.rate)
+            self._last_refill = now
+
+    def reserve(self, tokens: float = 1) -> float:
+        """
+        Reserve tokens and return how long the caller must wait before using them.
+
+        Reservations are handed out in lock order, so concurrent callers are
+        served first come, first served and the long-run rate never exceeds
+        the configured rate.
+
+        Args:
+            tokens (float): Number of tokens to take
+
+        Returns:
+            float: Seconds to wait before the reservation is valid
+        """
+        with self._lock:
+            self._refill(time.monotonic())
+            self._tokens -= tokens
+            if self._tokens >= 0:
+                return 0.0
+            return -self._tokens / self.rate
+
+    def acquire(self, tokens: float = 1) -> float:
+        """
+        Block until the requested tokens are available
+
+        Args:
+            tokens (float): Number of tokens to take
+
+        Returns:
+            float: Seconds spent waiting
+        """
+        wait = self.reserve(tokens)
+        if wait > 0:
+            time.sleep(wait)
+        return wait
@@ -0,0 +1,174 @@
+import atexit
+import logging
+import os
+import threading
+from datetime import datetime
+from typing import Dict, Iterable, Optional, Tuple
+from flask import Flask
+from app.config import Config
+from app.models.user import db
+from app.models.message_status import MessageStatus
+from app.models.activity import MessageRollup
+from app.utils.activity import count_messages
+
+logger = logging.getLogger(__name__)
+
+# Order statuses move through, so a receipt that arrives late never
+# overwrites a later state (callbacks are not guaranteed to arrive in order)
+STATUS_ORDER = {
+    'accepted': 0, 'scheduled': 0, 'queued': 0,
+    'sending': 1,
+    'sent': 2,
+    'delivered': 3, 'undelivered': 3, 'failed': 3, 'canceled': 3,
+    'read': 4
+}
+
+# Rank of the final outcomes, which never replace one another
+_FINAL_RANK = STATUS_ORDER['delivered']
+
+# SIDs per lookup when flushing
+_QUERY_BATCH = 500
+
+def _newer(status: str, than: Optional[str]) -> bool:
+    """
+    Whether status may replace than
+
+    A later rank always wins. Within a rank only pending statuses replace
+    each other: once a message is delivered, undelivered, failed or canceled,
+    a different outcome for it is ignored, so it can't flip back and forth.
+    """
+    if than is None:
+        return True
+    rank, current = STATUS_ORDER.get(status, 0), STATUS_ORDER.get(than, 0)
+    return rank > current or (rank == current and (rank < _FINAL_RANK or status == than))
+
+class ReceiptBuffer:
+    """
+    Delivery receipts held in memory and written to message_statuses in batches
+
+    add() only updates a dict under a lock, so the webhook answers at once
+    however fast receipts arrive. Receipts for the same message are coalesced
+    to the latest state. A background thread flushes every flush_seconds, or
+    sooner once flush_size messages are waiting.
+    """
+
+    def __init__(self, app: Flask, flush_size: int = 500, flush_seconds: float = 1):
+        self.app = app
+        self.flush_size = max(1, flush_size)
+        self.flush_seconds = flush_seconds
+        self._pending: Dict[str, Tuple[str, Optional[str], datetime]] = {}
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wake = threading.Event()
+
+    def __len__(self) -> int:
+        return len(self._pending)
+
+    def add(self, sid: str, status: str, error_code: Optional[str] = None,
+            received_at: Optional[datetime] = None) -> None:
+        """Queue a receipt for the next flush"""
+        with self._lock:
+            current = self._pending.get(sid)
+            if current is None or _newer(status, current[0]):
+                self._pending[sid] = (status, error_code, received_at or datetime.utcnow())
+            if len(self._pending) >= self.flush_size:
+                self._wake.set()
+
+    def flush(self) -> int:
+        """
+        Write the buffered receipts, updating existing rows and inserting new ones
+
+        Receipts that fail to write are put back for the next flush.
+
+        Returns:
+            int: Number of messages written
+        """
+        with self._flush_lock:
+            with self._lock:
+                receipts, self._pending = self._pending, {}
+            if not receipts:
+                return 0
+            try:
+                with self.app.app_context():
+                    written = self._write(receipts)
+            except Exception as e:
+                logger.error(f"Failed to write {len(receipts)} delivery receipts: {str(e)}")
+                with self._lock:
+                    for sid, receipt in receipts.items():
+                        current = self._pending.get(sid)
+                        if current is None or _newer(receipt[0], current[0]):
+                            self._pending[sid] = receipt
+                return 0
+        logger.debug(f"Wrote {written} delivery receipts")
+        return written
+
+    def _write(self, receipts: Dict[str, Tuple[str, Optional[str], datetime]]) -> int:
+        sids = list(receipts)
+        written = delivered = 0
+        try:
+            for start in range(0, len(sids), _QUERY_BATCH):
+                batch = sids[start:start + _QUERY_BATCH]
+                existing = dict(db.session.query(MessageStatus.sid, MessageStatus.status)
+                                .filter(MessageStatus.sid.in_(batch)).all())
+                updates, inserts = [], []
+                for sid in batch:
+                    status, error_code, received_at = receipts[sid]
+                    row = {'sid': sid, 'status': status, 'error_code': error_code, 'updated_at': received_at}
+                    if sid not in existing:
+                        inserts.append(row)
+                    elif _newer(status, existing[sid]):
+                        updates.append(row)
+                    else:
+                        continue
+                    # Counted once, when the message first reaches an outcome
+                    delivered += status == 'delivered' and \
+                        (sid not in existing or STATUS_ORDER.get(existing[sid], 0) < _FINAL_RANK)
+                db.session.bulk_update_mappings(MessageStatus, updates)
+                db.session.bulk_insert_mappings(MessageStatus, inserts)
+                written += len(updates) + len(inserts)
+            count_messages({MessageRollup.METRIC_DELIVERED: delivered})
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            raise
+        return written
+
+    def run(self) -> None:
+        """Flush loop for the background thread"""
+        while True:
+            self._wake.wait(self.flush_seconds)
+            self._wake.clear()
+            self.flush()
+
+def stored_statuses(sids: Iterable[str]) -> Dict[str, Dict[str, str]]:
+    """
+    Look up statuses recorded from delivery receipts
+
+    Returns:
+        Dict[str, Dict]: Status for each SID with a stored receipt
+    """
+    sids = list(sids)
+    found = {}
+    for start in range(0, len(sids), _QUERY_BATCH):
+        for row in MessageStatus.query.filter(MessageStatus.sid.in_(sids[start:start + _QUERY_BATCH])):
+            found[row.sid] = row.to_dict()
+    return found
+
+_shared_buffer: Optional[ReceiptBuffer] = None
+_shared_buffer_pid: Optional[int] = None
+_shared_buffer_lock = threading.Lock()
+
+def get_receipt_buffer(app: Flask) -> ReceiptBuffer:
+    """
+    Return this process's receipt buffer, starting its flush thread on first use
+
+    Anything still buffered when the process exits is flushed then.
+    """
+    global _shared_buffer, _shared_buffer_pid
+    with _shared_buffer_lock:
+        if _shared_buffer is None or _shared_buffer_pid != os.getpid():
+            _shared_buffer = ReceiptBuffer(app, Config.RECEIPT_FLUSH_SIZE, Config.RECEIPT_FLUSH_SECONDS)
+            _shared_buffer_pid = os.getpid()
+            threading.Thread(target=_shared_buffer.run, name='sms-receipt-flush', daemon=True).start()
+            atexit.register(_shared_buffer.flush)
+        return _shared_buffer
@@ -1,15 +1,60 @@
 from twilio.rest import Client
 from twilio.base.exceptions import TwilioRestException
+from twilio.http.async_http_client import AsyncTwilioHttpClient
+from aiohttp import ClientSession, ClientTimeout, TCPConnector
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from requests.adapters import HTTPAdapter
+import asyncio
+import os
+import threading
 import time
 import logging
-from typing import List, Dict, Optional, Union
+from typing import Any, Awaitable, List, Dict, Optional, Tuple, TypeVar, Union
 from app.config import Config
+from app.utils.message_template import MissingFieldError, compile_template
+from app.utils.metrics import metrics
+from app.utils.phone import process_phone_number
+from app.utils.segments import message_segments
+from app.utils.suppression import get_suppression_list
+from .rate_limiter import TokenBucket
 
 logger = logging.getLogger(__name__)
 
+T = TypeVar('T')
+
+# Result error for recipients on the suppression list
+OPTED_OUT_ERROR = 'Recipient has opted out'
+
+_shared_handler: Optional['SMSHandler'] = None
+_shared_handler_pid: Optional[int] = None
+_shared_handler_lock = threading.Lock()
+
+def get_sms_handler() -> 'SMSHandler':
+    """
+    Return the SMS handler shared by every request in this process
+    
+    The handler owns the provider HTTP connection pools, so reusing it keeps
+    connections alive between requests instead of paying for a new TLS
+    handshake each time. A forked worker builds its own handler.
+    
+    Returns:
+        SMSHandler: The process-wide handler
+    """
+    global _shared_handler, _shared_handler_pid
+    with _shared_handler_lock:
+        if _shared_handler is None or _shared_handler_pid != os.getpid():
+            _shared_handler = SMSHandler()
+            _shared_handler_pid = os.getpid()
+        return _shared_handler
+
 class SMSHandler:
     """Handles SMS operations including sending and status checking"""
     
+    # Provider rate limits apply per account, so every handler in the
+    # process draws from the same bucket
+    _rate_limiter: Optional[TokenBucket] = None
+    _rate_limiter_lock = threading.Lock()
+    
     def __init__(self):
         """Initialize the SMS handler with Twilio credentials"""
         self.account_sid = Config.TWILIO_ACCOUNT_SID
@@ -23,11 +68,51 @@ class SMSHandler:
         self.client = Client(self.account_sid, self.auth_token)
         self.rate_limit = Config.SMS_RATE_LIMIT
         self.max_length = Config.SMS_MAX_LENGTH
+        self.max_segments = Config.SMS_MAX_SEGMENTS
         self.batch_size = Config.SMS_BATCH_SIZE
+        self.max_workers = max(1, Config.SMS_MAX_WORKERS)
+        self.rate_limiter = self._get_rate_limiter(self.rate_limit)
+        
+        # Size the keep-alive pool so each dispatch worker gets its own connection
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.max_workers)
+        self.client.http_client.session.mount('https://', adapter)
+        self.client.http_client.session.mount('http://', adapter)
+        self._apply_base_url(self.client)
+        
+        # Ask the provider to push delivery receipts when a callback URL is set
+        self.callback_args = {'status_callback': Config.SMS_STATUS_CALLBACK_URL} \
+            if Config.SMS_STATUS_CALLBACK_URL else {}
+        
+        # Async client and the event loop that owns its connection pool,
+        # both created lazily on first async use
+        self.async_concurrency = max(1, Config.SMS_ASYNC_CONCURRENCY)
+        self.http_timeout = Config.SMS_HTTP_TIMEOUT
+        self._async_client: Optional[Client] = None
+        self._async_client_loop: Optional[asyncio.AbstractEventLoop] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._loop_lock = threading.Lock()
+
+    @staticmethod
+    def _apply_base_url(client: Client) -> None:
+        """Point the client at TWILIO_API_BASE_URL when set (e.g. a local fake provider)"""
+        if Config.TWILIO_API_BASE_URL:
+            client.api.base_url = Config.TWILIO_API_BASE_URL
+
+    @classmethod
+    def _get_rate_limiter(cls, rate: int) -> TokenBucket:
+        """Return the process-wide token bucket, creating it on first use"""
+        with cls._rate_limiter_lock:
+            if cls._rate_limiter is None or cls._rate_limiter.rate != rate:
+                cls._rate_limiter = TokenBucket(rate)
+            return cls._rate_limiter
 
     def validate_message(self, message: str) -> bool:
         """
-        Validate message length and content
+        Validate message length, content and segment count
+        
+        The segment count follows the encoding the provider will pick: GSM-7
+        when every character is in the GSM 03.38 alphabet (extension
+        characters take two septets), UCS-2 otherwise.
         
         Args:
             message (str): The message to validate
@@ -43,31 +128,54 @@ class SMSHandler:
             logger.error(f"Message exceeds maximum length of {self.max_length} characters")
             return False
             
+        encoding, units, segments = message_segments(message)
+        if self.max_segments and segments > self.max_segments:
+            logger.error(f"Message needs {segments} {encoding} segments ({units} units), "
+                         f"more than the maximum of {self.max_segments}")
+            return False
+            
         return True
 
     def format_phone_number(self, phone: str) -> Optional[str]:
         """
         Format phone number to E.164 format
         
+        Uses the shared validation rules in app.utils.phone, so a number the
+        upload or validate_phone_numbers accepted is formatted the same way.
+        Numbers already in E.164 form (with the '+') come back unchanged.
+        
         Args:
             phone (str): The phone number to format
             
         Returns:
             Optional[str]: Formatted phone number or None if invalid
         """
-        # Remove any non-digit characters
-        cleaned = ''.join(filter(str.isdigit, str(phone)))
+        normalized = process_phone_number(phone)
+        return '+' + normalized if normalized else None
+
+    def suppressed_recipients(self, recipients: List[Dict[str, str]]) -> List[bool]:
+        """
+        Check recipients against the opt-out list
         
-        if not cleaned:
-            return None
-            
-        # Handle UK numbers
-        if cleaned.startswith('0'):
-            cleaned = '44' + cleaned[1:]
-        elif not cleaned.startswith('44'):
-            cleaned = '44' + cleaned
+        The in-memory list is refreshed when stale, then every number is
+        checked in memory, so a batch costs at most one incremental query.
+        Numbers are compared in the form they would be sent to.
+        
+        Args:
+            recipients (List[Dict]): Recipient dictionaries with phone numbers
             
-        return '+' + cleaned
+        Returns:
+            List[bool]: True for each recipient that must not be messaged
+        """
+        suppression = get_suppression_list()
+        suppression.refresh_if_stale()
+        suppressed = suppression.suppressed_mask(
+            [self.format_phone_number(recipient.get('phone', '')) for recipient in recipients]
+        )
+        blocked = suppressed.count(True)
+        if blocked:
+            logger.info(f"Skipping {blocked} of {len(recipients)} recipients on the suppression list")
+        return suppressed
 
     def send_single_sms(self, to_number: str, message: str) -> Dict[str, Union[bool, str]]:
         """
@@ -80,19 +188,22 @@ class SMSHandler:
         Returns:
             dict: Result of the operation with status and message
         """
-        if not self.validate_message(message):
+        with metrics.span('sms.validate', 1):
+            valid = self.validate_message(message)
+            formatted_number = self.format_phone_number(to_number) if valid else None
+        if not valid:
             return {'success': False, 'error': 'Invalid message'}
-            
-        formatted_number = self.format_phone_number(to_number)
         if not formatted_number:
             return {'success': False, 'error': 'Invalid phone number'}
             
         try:
-            message = self.client.messages.create(
-                body=message,
-                from_=self.phone_number,
-                to=formatted_number
-            )
+            with metrics.span('sms.provider', 1):
+                message = self.client.messages.create(
+                    body=message,
+                    from_=self.phone_number,
+                    to=formatted_number,
+                    **self.callback_args
+                )
             logger.info(f"SMS sent successfully to {formatted_number}. Message SID: {message.sid}")
             return {'success': True, 'message_id': message.sid}
             
@@ -100,6 +211,46 @@ class SMSHandler:
             logger.error(f"Failed to send SMS to {formatted_number}: {str(e)}")
             return {'success': False, 'error': str(e)}
 
+    def dispatch(self, messages: List[Tuple[str, str]]) -> List[Dict[str, Union[bool, str]]]:
+        """
+        Send many messages through a bounded worker pool paced by the token bucket
+        
+        Each worker takes a token before calling the provider, so throughput
+        tracks SMS_RATE_LIMIT instead of the latency of individual requests.
+        
+        Args:
+            messages (List[Tuple]): (to_number, body) pairs to send
+            
+        Returns:
+            List[Dict]: send_single_sms results in the same order as messages
+        """
+        results: List[Optional[Dict[str, Union[bool, str]]]] = [None] * len(messages)
+        if not messages:
+            return []
+        
+        def send(to_number: str, body: str) -> Dict[str, Union[bool, str]]:
+            self.rate_limiter.acquire()
+            return self.send_single_sms(to_number, body)
+        
+        workers = min(self.max_workers, len(messages))
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='sms-dispatch') as executor:
+            futures = {
+                executor.submit(send, to_number, body): index
+                for index, (to_number, body) in enumerate(messages)
+            }
+            for completed, future in enumerate(as_completed(futures), start=1):
+                index = futures[future]
+                try:
+                    results[index] = future.result()
+                except Exception as e:
+                    logger.error(f"Unexpected error dispatching SMS: {str(e)}")
+                    results[index] = {'success': False, 'error': str(e)}
+                    
+                if completed % self.batch_size == 0:
+                    logger.info(f"Processed {completed} messages")
+                    
+        return results
+
     def send_batch_sms(self, recipients: List[Dict[str, str]], message_template: str) -> List[Dict[str, Union[bool, str]]]:
         """
         Send SMS messages to multiple recipients with rate limiting
@@ -110,34 +261,51 @@ class SMSHandler:
             
         Returns:
             List[Dict]: List of results for each message
+            
+        Raises:
+            TemplateError: If the template itself is malformed
         """
-        results = []
+        template = compile_template(message_template)
+        results: List[Optional[Dict[str, Union[bool, str]]]] = [None] * len(recipients)
+        pending = []
+        missing = 0
+        with metrics.span('sms.suppression', len(recipients)):
+            suppressed = self.suppressed_recipients(recipients)
         
+        render_started = time.perf_counter()
         for i, recipient in enumerate(recipients):
-            # Apply rate limiting
-            if i > 0 and i % self.rate_limit == 0:
-                time.sleep(1)  # Sleep for 1 second after every rate_limit messages
+            if suppressed[i]:
+                results[i] = {
+                    'success': False,
+                    'error': OPTED_OUT_ERROR,
+                    'recipient': recipient
+                }
+                continue
                 
             # Format message for this recipient
             try:
-                personalized_message = message_template.format(**recipient)
-            except KeyError as e:
-                logger.error(f"Missing template variable for recipient: {str(e)}")
-                results.append({
+                personalized_message = template.render(recipient)
+            except MissingFieldError as e:
+                missing += 1
+                results[i] = {
                     'success': False,
-                    'error': f"Missing template variable: {str(e)}",
+                    'error': str(e),
                     'recipient': recipient
-                })
+                }
                 continue
                 
-            # Send message
-            result = self.send_single_sms(recipient.get('phone'), personalized_message)
-            result['recipient'] = recipient
-            results.append(result)
+            pending.append((i, recipient.get('phone'), personalized_message))
+        metrics.observe('sms.render', time.perf_counter() - render_started, len(recipients))
+            
+        if missing:
+            logger.error(f"{missing} of {len(recipients)} recipients lack template variables for {template.fields}")
             
-            # Process in batches
-            if (i + 1) % self.batch_size == 0:
-                logger.info(f"Processed {i + 1} messages")
+        # Send messages concurrently, keeping results in recipient order
+        with metrics.span('sms.dispatch', len(pending)):
+            sent = self.dispatch([(phone, body) for _, phone, body in pending])
+        for (i, _, _), result in zip(pending, sent):
+            result['recipient'] = recipients[i]
+            results[i] = result
                 
         return results
 
@@ -166,6 +334,176 @@ class SMSHandler:
                 'error_message': str(e)
             }
     
+    def _get_async_client(self) -> Client:
+        """
+        Return the async Twilio client bound to the running event loop
+        
+        The client keeps a single keep-alive aiohttp pool, capped at
+        SMS_ASYNC_CONCURRENCY connections, that every in-flight request shares.
+        """
+        loop = asyncio.get_running_loop()
+        if self._async_client is None or self._async_client_loop is not loop:
+            http_client = AsyncTwilioHttpClient(pool_connections=False, timeout=self.http_timeout)
+            http_client.session = ClientSession(
+                connector=TCPConnector(limit=self.async_concurrency, keepalive_timeout=60),
+                timeout=ClientTimeout(total=self.http_timeout)
+            )
+            client = Client(self.account_sid, self.auth_token, http_client=http_client)
+            self._apply_base_url(client)
+            self._async_client = client
+            self._async_client_loop = loop
+        return self._async_client
+
+    async def send_single_sms_async(self, to_number: str, message: str) -> Dict[str, Union[bool, str]]:
+        """
+        Send a single SMS message without blocking the event loop
+        
+        Args:
+            to_number (str): The recipient's phone number
+            message (str): The message to send
+            
+        Returns:
+            dict: Result of the operation with status and message
+        """
+        with metrics.span('sms.validate', 1):
+            valid = self.validate_message(message)
+            formatted_number = self.format_phone_number(to_number) if valid else None
+        if not valid:
+            return {'success': False, 'error': 'Invalid message'}
+        if not formatted_number:
+            return {'success': False, 'error': 'Invalid phone number'}
+            
+        wait = self.rate_limiter.reserve()
+        if wait > 0:
+            await asyncio.sleep(wait)
+            
+        try:
+            client = self._get_async_client()
+            with metrics.span('sms.provider', 1):
+                message = await client.messages.create_async(
+                    body=message,
+                    from_=self.phone_number,
+                    to=formatted_number,
+                    **self.callback_args
+                )
+            logger.info(f"SMS sent successfully to {formatted_number}. Message SID: {message.sid}")
+            return {'success': True, 'message_id': message.sid}
+            
+        except TwilioRestException as e:
+            logger.error(f"Failed to send SMS to {formatted_number}: {str(e)}")
+            return {'success': False, 'error': str(e)}
+
+    async def send_batch_sms_async(self, recipients: List[Dict[str, str]], message_template: str) -> List[Dict[str, Union[bool, str]]]:
+        """
+        Send SMS messages to multiple recipients concurrently on the event loop
+        
+        Requests are multiplexed over the shared connection pool and paced by
+        the same token bucket as send_batch_sms.
+        
+        Args:
+            recipients (List[Dict]): List of recipient dictionaries with phone numbers and template variables
+            message_template (str): Message template with placeholders
+            
+        Returns:
+            List[Dict]: List of results for each message
+            
+        Raises:
+            TemplateError: If the template itself is malformed
+        """
+        template = compile_template(message_template)
+        missing = []
+        with metrics.span('sms.suppression', len(recipients)):
+            suppressed = self.suppressed_recipients(recipients)
+        
+        async def send(recipient: Dict[str, str], opted_out: bool) -> Dict[str, Union[bool, str]]:
+            if opted_out:
+                return {
+                    'success': False,
+                    'error': OPTED_OUT_ERROR,
+                    'recipient': recipient
+                }
+            try:
+                personalized_message = template.render(recipient)
+            except MissingFieldError as e:
+                missing.append(recipient)
+                return {
+                    'success': False,
+                    'error': str(e),
+                    'recipient': recipient
+                }
+            try:
+                result = await self.send_single_sms_async(recipient.get('phone'), personalized_message)
+            except Exception as e:
+                logger.error(f"Unexpected error dispatching SMS: {str(e)}")
+                result = {'success': False, 'error': str(e)}
+            result['recipient'] = recipient
+            return result
+            
+        with metrics.span('sms.dispatch', len(recipients)):
+            results = list(await asyncio.gather(*(send(recipient, opted_out)
+                                                  for recipient, opted_out in zip(recipients, suppressed))))
+        if missing:
+            logger.error(f"{len(missing)} of {len(recipients)} recipients lack template variables for {template.fields}")
+        return results
+
+    async def get_message_status_async(self, message_id: str) -> Dict[str, str]:
+        """
+        Get the status of a sent message without blocking the event loop
+        
+        Args:
+            message_id (str): The Twilio message SID
+            
+        Returns:
+            dict: Message status information
+        """
+        try:
+            client = self._get_async_client()
+            message = await client.messages(message_id).fetch_async()
+            return {
+                'status': message.status,
+                'error_code': message.error_code,
+                'error_message': message.error_message
+            }
+        except TwilioRestException as e:
+            logger.error(f"Failed to get message status for {message_id}: {str(e)}")
+            return {
+                'status': 'error',
+                'error_code': str(e.code),
+                'error_message': str(e)
+            }
+
+    def run_async(self, coro: Awaitable[T], timeout: Optional[float] = None) -> T:
+        """
+        Run a coroutine on the handler's background event loop and wait for it
+        
+        Lets synchronous Flask views use the async API while every request
+        thread in the process shares one event loop and one connection pool.
+        
+        Args:
+            coro (Awaitable): Coroutine to run, e.g. get_message_status_async(...)
+            timeout (Optional[float]): Seconds to wait for the result
+            
+        Returns:
+            The coroutine's result
+        """
+        with self._loop_lock:
+            if self._loop is None or self._loop.is_closed():
+                self._loop = asyncio.new_event_loop()
+                threading.Thread(
+                    target=self._loop.run_forever,
+                    name='sms-event-loop',
+                    daemon=True
+                ).start()
+            loop = self._loop
+        return asyncio.run_coroutine_threadsafe(coro, loop).result(timeout)
+
+    async def aclose(self) -> None:
+        """Close the async connection pool"""
+        if self._async_client is not None:
+            await self._async_client.http_client.close()
+            self._async_client = None
+            self._async_client_loop = None
+
     def get_remaining_quota(self) -> Dict[str, Any]:
         """Get remaining SMS quota information"""
         # TODO: Implement actual quota checking logic
@@ -0,0 +1,205 @@
+import asyncio
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Iterable, List, NamedTuple, Optional
+from app.config import Config
+from .receipts import stored_statuses
+
+logger = logging.getLogger(__name__)
+
+# Twilio statuses a message never leaves, so they are cached for good
+TERMINAL_STATUSES = {'delivered', 'undelivered', 'failed', 'canceled', 'read', 'received'}
+
+class _Entry(NamedTuple):
+    status: Dict[str, str]
+    fetched_at: float
+    requested_at: float
+
+    @property
+    def terminal(self) -> bool:
+        return self.status.get('status') in TERMINAL_STATUSES
+
+class StatusCache:
+    """
+    Delivery statuses keyed by message SID
+
+    Terminal statuses are kept until evicted; others are served for ttl
+    seconds. The least recently used entries are evicted beyond max_entries.
+    Pending messages requested within watch_seconds are "watched", so the
+    background poller keeps them fresh and status requests rarely reach the
+    provider.
+    """
+
+    def __init__(self, ttl: float = 15, watch_seconds: float = 600, max_entries: int = 100000):
+        self.ttl = ttl
+        self.watch_seconds = watch_seconds
+        self.max_entries = max_entries
+        self._entries: 'OrderedDict[str, _Entry]' = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get_many(self, sids: Iterable[str]) -> Dict[str, Dict[str, str]]:
+        """
+        Look up cached statuses and mark the SIDs as requested
+
+        Returns:
+            Dict[str, Dict]: Status for each SID with a fresh entry; missing or
+                expired SIDs are left out
+        """
+        now = time.monotonic()
+        found = {}
+        with self._lock:
+            for sid in sids:
+                entry = self._entries.get(sid)
+                if entry is None:
+                    continue
+                self._entries[sid] = entry._replace(requested_at=now)
+                self._entries.move_to_end(sid)
+                if entry.terminal or now - entry.fetched_at < self.ttl:
+                    found[sid] = entry.status
+        return found
+
+    def put(self, sid: str, status: Dict[str, str], requested: bool = False) -> None:
+        """
+        Store a status fetched from, or reported by, the provider
+
+        A terminal status already cached is not replaced by a pending one
+        that arrives late.
+
+        Args:
+            sid (str): Message SID
+            status (Dict): Status with status, error_code and error_message
+            requested (bool): Whether a client asked for this status just now
+        """
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(sid)
+            if entry is not None and entry.terminal and status.get('status') not in TERMINAL_STATUSES:
+                return
+            requested_at = now if requested or entry is None else entry.requested_at
+            self._entries[sid] = _Entry(status, now, requested_at)
+            self._entries.move_to_end(sid)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def watched(self) -> List[str]:
+        """
+        SIDs the poller should refresh: pending and requested recently,
+        least recently fetched first
+        """
+        now = time.monotonic()
+        with self._lock:
+            pending = [(entry.fetched_at, sid) for sid, entry in self._entries.items()
+                       if not entry.terminal and now - entry.requested_at < self.watch_seconds]
+        return [sid for _, sid in sorted(pending)]
+
+async def fetch_statuses(handler, sids: List[str]) -> Dict[str, Dict[str, str]]:
+    """
+    Fetch statuses for many messages concurrently over the handler's async pool
+
+    Twilio has no bulk lookup by SID, so the requests are multiplexed instead.
+
+    Args:
+        handler (SMSHandler): Handler whose async client makes the requests
+        sids (List[str]): Message SIDs
+
+    Returns:
+        Dict[str, Dict]: Status for each SID
+    """
+    statuses = await asyncio.gather(*(handler.get_message_status_async(sid) for sid in sids))
+    return dict(zip(sids, statuses))
+
+def refresh_statuses(handler, sids: List[str], requested: bool = False) -> Dict[str, Dict[str, str]]:
+    """
+    Fetch statuses in batches of STATUS_POLL_BATCH_SIZE and cache them
+
+    Lookup errors are returned but not cached, so the next request retries.
+
+    Returns:
+        Dict[str, Dict]: Status for each SID
+    """
+    cache = get_status_cache()
+    batch_size = max(1, Config.STATUS_POLL_BATCH_SIZE)
+    statuses = {}
+    for start in range(0, len(sids), batch_size):
+        batch = handler.run_async(fetch_statuses(handler, sids[start:start + batch_size]),
+                                  timeout=handler.http_timeout)
+        for sid, status in batch.items():
+            if status.get('status') != 'error':
+                cache.put(sid, status, requested=requested)
+        statuses.update(batch)
+    return statuses
+
+def get_statuses(handler, sids: Iterable[str]) -> Dict[str, Dict[str, str]]:
+    """
+    Return statuses for many messages, from the cache where possible
+
+    SIDs with no fresh cache entry are looked up in the statuses stored from
+    delivery receipts, and only the rest are fetched from the provider. The
+    background poller is started on first use. Needs an application context.
+
+    Args:
+        handler (SMSHandler): Handler used for cache misses
+        sids (Iterable[str]): Message SIDs
+
+    Returns:
+        Dict[str, Dict]: Status for each distinct SID
+    """
+    sids = list(dict.fromkeys(sids))
+    start_status_poller(handler)
+    cache = get_status_cache()
+    statuses = cache.get_many(sids)
+    missing = [sid for sid in sids if sid not in statuses]
+    if missing:
+        for sid, status in stored_statuses(missing).items():
+            cache.put(sid, status, requested=True)
+            statuses[sid] = status
+        missing = [sid for sid in missing if sid not in statuses]
+    if missing:
+        statuses.update(refresh_statuses(handler, missing, requested=True))
+    return {sid: statuses[sid] for sid in sids}
+
+def _poll(handler) -> None:
+    """Refresh watched statuses every STATUS_POLL_INTERVAL seconds"""
+    while True:
+        time.sleep(Config.STATUS_POLL_INTERVAL)
+        sids = get_status_cache().watched()
+        if not sids:
+            continue
+        try:
+            refresh_statuses(handler, sids)
+        except Exception as e:
+            logger.error(f"Status poller failed to refresh {len(sids)} messages: {str(e)}")
+
+_shared_cache: Optional[StatusCache] = None
+_shared_cache_lock = threading.Lock()
+_poller_pid: Optional[int] = None
+
+def get_status_cache() -> StatusCache:
+    """Return the status cache shared by everything in this process"""
+    global _shared_cache
+    with _shared_cache_lock:
+        if _shared_cache is None:
+            _shared_cache = StatusCache(Config.STATUS_CACHE_TTL_SECONDS, Config.STATUS_WATCH_SECONDS,
+                                        Config.STATUS_CACHE_MAX_ENTRIES)
+        return _shared_cache
+
+def start_status_poller(handler) -> None:
+    """
+    Start this process's background status poller unless it is running,
+    STATUS_POLL_INTERVAL is 0, or delivery receipts are pushed to
+    SMS_STATUS_CALLBACK_URL instead
+    """
+    global _poller_pid
+    if Config.STATUS_POLL_INTERVAL <= 0 or Config.SMS_STATUS_CALLBACK_URL:
+        return
+    with _shared_cache_lock:
+        if _poller_pid == os.getpid():
+            return
+        _poller_pid = os.getpid()
+    threading.Thread(target=_poll, args=(handler,), name='sms-status-poller', daemon=True).start()
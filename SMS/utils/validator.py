@@ -1,10 +1,21 @@
 import re
 from typing import Tuple, List
+from app.utils.phone import normalize_phones
+
+_NON_DIGITS = re.compile(r'[^\d+]')
 
 def validate_phone_numbers(numbers: List[str]) -> Tuple[List[str], List[str]]:
     """
     Validate a list of phone numbers and separate them into valid and invalid numbers
     
+    Numbers go through the same rules as uploaded contacts
+    (app.utils.phone), so SMS and WhatsApp agree on which numbers are usable.
+    The whole list is normalized in one vectorized pass. Valid numbers are
+    standardized to E.164 with its '+' and deduplicated, so a number listed
+    twice in different formats is only returned once. The '+' keeps a stored
+    number international when it is formatted again at send time; bare
+    digits such as 12025550123 would be read as a UK national number.
+    
     Args:
         numbers (List[str]): List of phone numbers to validate
         
@@ -14,30 +25,14 @@ def validate_phone_numbers(numbers: List[str]) -> Tuple[List[str], List[str]]:
     valid_numbers = []
     invalid_numbers = []
     
-    # Basic UK phone number pattern
-    # Accepts formats:
-    # - +44 7XXX XXXXXX
-    # - 07XXX XXXXXX
-    # - 447XXX XXXXXX
-    uk_pattern = re.compile(r'^(?:(?:\+44)|(?:44)|(?:0))(?:7\d{9})$')
-    
-    for number in numbers:
-        # Clean the number
-        cleaned = clean_phone_number(number)
-        
-        # Validate
-        if uk_pattern.match(cleaned):
-            # Standardize to international format
-            if cleaned.startswith('0'):
-                cleaned = '44' + cleaned[1:]
-            elif not cleaned.startswith('44'):
-                cleaned = '44' + cleaned
-                
-            valid_numbers.append(cleaned)
+    for number, normalized in zip(numbers, normalize_phones(numbers)):
+        if normalized:
+            valid_numbers.append('+' + normalized)
         else:
             invalid_numbers.append(number)
     
-    return valid_numbers, invalid_numbers
+    # dict keeps the first occurrence of each number, in order
+    return list(dict.fromkeys(valid_numbers)), invalid_numbers
 
 def clean_phone_number(number: str) -> str:
     """
@@ -50,10 +45,10 @@ def clean_phone_number(number: str) -> str:
         str: Cleaned phone number
     """
     # Remove all non-digit characters except '+'
-    cleaned = re.sub(r'[^\d+]', '', str(number))
+    cleaned = _NON_DIGITS.sub('', str(number))
     
     # Remove '+' if it exists
     if cleaned.startswith('+'):
         cleaned = cleaned[1:]
     
-    return cleaned 
\ No newline at end of file
+    return cleaned
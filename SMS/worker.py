@@ -0,0 +1,52 @@
+"""
+Background worker that drains the SMS job queue.
+
+Usage:
+    python -m SMS.worker
+
+Run as many worker processes as the provider rate limit allows; they
+coordinate through the sms_jobs table.
+"""
+import logging
+import os
+import signal
+import socket
+import time
+from app.app import app
+from app.config import Config
+from app.utils.metrics import serve_metrics
+from SMS.utils.job_queue import claim_next_job, process_job
+
+# Named explicitly, since under python -m this module is __main__. Importing
+# the app sets up logging: records go through its queued, masking handler
+# at LOG_LEVEL
+logger = logging.getLogger('SMS.worker')
+
+_stopping = False
+
+def _request_stop(signum, frame):
+    global _stopping
+    logger.info(f"Received signal {signum}, stopping after the current chunk")
+    _stopping = True
+
+def run_worker():
+    """Claim and process jobs until asked to stop"""
+    worker_id = f"{socket.gethostname()}:{os.getpid()}"
+    signal.signal(signal.SIGTERM, _request_stop)
+    signal.signal(signal.SIGINT, _request_stop)
+    
+    if serve_metrics(Config.SMS_WORKER_METRICS_PORT, Config.SMS_WORKER_METRICS_HOST):
+        logger.info(f"Serving send metrics on {Config.SMS_WORKER_METRICS_HOST}:{Config.SMS_WORKER_METRICS_PORT}/metrics")
+    logger.info(f"SMS worker {worker_id} started")
+    with app.app_context():
+        while not _stopping:
+            job = claim_next_job(worker_id)
+            if job is None:
+                time.sleep(Config.SMS_WORKER_POLL_INTERVAL)
+                continue
+            logger.info(f"Worker {worker_id} claimed SMS job {job.id} at position {job.next_position}")
+            process_job(job, worker_id, should_stop=lambda: _stopping)
+    logger.info(f"SMS worker {worker_id} stopped")
+
+if __name__ == '__main__':
+    run_worker()
@@ -1,8 +1,11 @@
-from flask import Blueprint, render_template, redirect, url_for, flash, request
+from flask import Blueprint, render_template, redirect, url_for, flash, request, Response
 from flask_login import login_required, current_user
 from functools import wraps
 from app.models.user import User, db
-from datetime import datetime, timedelta
+from app.utils.metrics import CONTENT_TYPE, metrics
+from app.utils.activity import message_totals, recent_activity, user_counts
+from app.utils.user_listing import USER_SORTS, get_users_page
+from app.config import Config
 
 admin = Blueprint('admin', __name__, url_prefix='/admin')
 
@@ -19,39 +22,53 @@ def admin_required(f):
 @login_required
 @admin_required
 def dashboard():
-    # Get statistics
-    total_users = User.query.count()
-    active_sessions = User.query.filter(
-        User.last_login > datetime.utcnow() - timedelta(hours=24)
-    ).count()
+    # Get statistics; user totals are recounted at most once a minute
+    counts = user_counts(Config.DASHBOARD_USER_COUNT_SECONDS)
     
-    # Placeholder for messages count
-    messages_today = 0  # This should be implemented based on your message tracking
+    # Today's message counters, read from the daily rollup rows
+    messages = message_totals()
     
-    # Placeholder for recent activities
-    recent_activities = [
-        {
-            'description': 'New user registration',
-            'timestamp': datetime.utcnow().strftime('%Y-%m-%d %H:%M:%S')
-        },
-        {
-            'description': 'System backup completed',
-            'timestamp': (datetime.utcnow() - timedelta(hours=1)).strftime('%Y-%m-%d %H:%M:%S')
-        }
-    ]
+    # Newest activity feed entries
+    recent_activities = recent_activity(Config.DASHBOARD_ACTIVITY_LIMIT)
     
     return render_template('admin/dashboard.html',
-                         total_users=total_users,
-                         active_sessions=active_sessions,
-                         messages_today=messages_today,
+                         total_users=counts['total_users'],
+                         active_sessions=counts['active_sessions'],
+                         messages_today=messages['sent'],
+                         messages_failed_today=messages['failed'],
+                         messages_delivered_today=messages['delivered'],
                          recent_activities=recent_activities)
 
 @admin.route('/users')
 @login_required
 @admin_required
 def users():
-    users = User.query.all()
-    return render_template('admin/users.html', users=users)
+    """One page of users, searched by email prefix and sorted by an indexed column"""
+    search = request.args.get('q', '').strip()
+    sort = request.args.get('sort', 'created_at')
+    if sort not in USER_SORTS:
+        sort = 'created_at'
+    order = request.args.get('order', 'asc' if sort == 'email' else 'desc')
+    if order not in ('asc', 'desc'):
+        order = 'desc'
+    
+    try:
+        page, next_cursor = get_users_page(search, sort, order == 'desc', request.args.get('cursor'),
+                                           Config.ADMIN_USERS_PAGE_SIZE)
+    except ValueError:
+        flash('That page link is no longer valid; showing the first page.', 'error')
+        return redirect(url_for('admin.users', q=search or None, sort=sort, order=order))
+    
+    return render_template('admin/users.html', users=page, next_cursor=next_cursor,
+                           search=search, sort=sort, order=order,
+                           first_page=not request.args.get('cursor'))
+
+@admin.route('/metrics')
+@login_required
+@admin_required
+def stage_metrics():
+    """Upload and send stage timings for this process, in Prometheus text format"""
+    return Response(metrics.render(), mimetype=CONTENT_TYPE)
 
 @admin.route('/settings')
 @login_required
@@ -1,22 +1,47 @@
-from flask import Flask, render_template, request, jsonify, url_for, redirect, Response, session
+from flask import Flask, render_template, request, jsonify, url_for, redirect, Response, session, stream_with_context
 from flask_login import LoginManager, login_required, current_user
 import pandas as pd
 import os
+import json
 from werkzeug.utils import secure_filename
 import urllib.parse
 import logging
 import traceback
 from datetime import datetime, timedelta
-from logging.handlers import RotatingFileHandler
 from functools import wraps
-import re
 import sys
 import secrets
+import threading
+import multiprocessing
+import importlib
+import heapq
+import re
+from collections import deque
 from app.config import Config
 from .models.user import db, User
+from .models.sms_job import SMSJob, SMSJobRecipient
+from .models.contact_set import ContactSet, Contact
+from .models.recipient_history import RecipientHistory
+from .models.suppression import SuppressionEvent
+from .models.message_status import MessageStatus
+from .models.activity import ActivityEvent, MessageRollup
+from .utils.phone import process_phone_number, select_best_phone, stored_phone, strip_non_digits
+from .utils.xlsx_reader import iter_xlsx_chunks
+from .utils.log_queue import AsyncLogHandler, BatchedRotatingFileHandler, BatchedStreamHandler, LogSampler
+from .utils.log_masking import MaskingFormatter
+from .utils.metrics import metrics
+from .utils.upload_cache import UploadCache, hash_stream
+from .utils.dedup import PhoneDeduper
+from .utils.message_template import MERGE_FIELDS, TemplateError, compile_template
+from .utils.personalize import personalize, render_links, wa_links
+from .utils.contact_store import (CONTACT_FIELDS, add_contacts, create_contact_set, find_contact_set,
+                                  finish_contact_set, get_contacts_page, iter_contact_set_pages,
+                                  load_contact_frame, parse_fields, purge_expired_contact_sets,
+                                  start_contact_set)
 from .auth.routes import auth
 from .admin.routes import admin
 from .customer.routes import customer
+from SMS.routes import sms
 
 # Security headers
 def security_headers(response: Response) -> Response:
@@ -34,15 +59,6 @@ def security_headers(response: Response) -> Response:
 logs_dir = os.path.join('app', 'logs')
 os.makedirs(logs_dir, exist_ok=True)
 
-# Configure logging with sensitive data masking
-class SensitiveDataFilter(logging.Filter):
-    def filter(self, record):
-        if hasattr(record, 'msg'):
-            record.msg = str(record.msg)
-            # Mask phone numbers in log messages
-            record.msg = re.sub(r'(\d{2})\d+(\d{4})', r'\1****\2', record.msg)
-        return True
-
 # Configure detailed formatter
 detailed_formatter = logging.Formatter(
     '\n%(asctime)s %(levelname)s [%(filename)s:%(lineno)d]:\n'
@@ -60,17 +76,16 @@ class DebugLogRecord(logging.LogRecord):
 logging.setLogRecordFactory(DebugLogRecord)
 
 # Configure file handler for all logs
-file_handler = RotatingFileHandler(
+file_handler = BatchedRotatingFileHandler(
     os.path.join(logs_dir, 'app.log'),
     maxBytes=1024 * 1024,
     backupCount=10
 )
 file_handler.setFormatter(detailed_formatter)
 file_handler.setLevel(logging.DEBUG)
-file_handler.addFilter(SensitiveDataFilter())
 
 # Configure debug file handler for real-time monitoring
-debug_handler = RotatingFileHandler(
+debug_handler = BatchedRotatingFileHandler(
     os.path.join(logs_dir, 'debug.log'),
     maxBytes=1024 * 1024,
     backupCount=5
@@ -79,22 +94,34 @@ debug_handler.setFormatter(detailed_formatter)
 debug_handler.setLevel(logging.DEBUG)
 
 # Configure console handler for immediate output
-console_handler = logging.StreamHandler(sys.stdout)
+console_handler = BatchedStreamHandler(sys.stdout)
 console_handler.setFormatter(detailed_formatter)
 console_handler.setLevel(logging.DEBUG)
 
-# Setup logger
+# Setup logging: records are queued and written by one background thread,
+# so requests never wait on disk or stdout
+log_queue_handler = AsyncLogHandler([file_handler, debug_handler, console_handler], Config.LOG_BATCH_SIZE)
+# Phone numbers are masked once per record, before it reaches any of the handlers
+log_queue_handler.setFormatter(MaskingFormatter())
+# The handler sits on the root logger so every module's records (app.utils.*,
+# SMS.*, libraries) are queued and masked; our own packages log at LOG_LEVEL,
+# libraries only at the root's WARNING
+logging.getLogger().addHandler(log_queue_handler)
+for package in ('app', 'SMS', __name__):
+    logging.getLogger(package).setLevel(Config.LOG_LEVEL)
 logger = logging.getLogger(__name__)
-logger.setLevel(logging.DEBUG)  # Set to DEBUG level to capture all logs
-logger.addHandler(file_handler)
-logger.addHandler(debug_handler)
-logger.addHandler(console_handler)
+
+# Per-row log lines are sampled so a bad upload doesn't flood the logs
+row_log_sampler = LogSampler(Config.LOG_ROW_SAMPLE_RATE)
 
 # Function to log detailed debug information
 def log_debug_info(message, extra_info=None):
     """
-    Log detailed debug information with context
+    Log detailed debug information with context.
+    Skips building the record when DEBUG is off.
     """
+    if not logger.isEnabledFor(logging.DEBUG):
+        return
     debug_message = [message]
     if extra_info:
         debug_message.extend([f"{k}: {v}" for k, v in extra_info.items()])
@@ -130,6 +157,7 @@ def track_customer_login():
 app.register_blueprint(auth)
 app.register_blueprint(admin, url_prefix='/admin')
 app.register_blueprint(customer, url_prefix='/customer')
+app.register_blueprint(sms)
 
 # Apply security headers to all responses
 app.after_request(security_headers)
@@ -137,6 +165,9 @@ app.after_request(security_headers)
 # Create database tables
 with app.app_context():
     db.create_all()
+    # create_all() leaves existing tables alone, so add indexes introduced since
+    for index in User.__table__.indexes:
+        index.create(db.engine, checkfirst=True)
 
 # Add template context processor for datetime
 @app.context_processor
@@ -151,7 +182,9 @@ def require_login():
         'auth.register',
         'static',
         'auth.reset_password_request',
-        'auth.reset_password'
+        'auth.reset_password',
+        'sms.inbound',  # Twilio webhooks, checked by signature instead
+        'sms.status_callback'
     ]
     
     if not current_user.is_authenticated:
@@ -214,83 +247,244 @@ def upload_file():
                 'error': 'Invalid file type'
             }), 400
             
-        # Secure the filename and save
         filename = secure_filename(file.filename)
-        filepath = os.path.join(app.config['UPLOAD_FOLDER'], filename)
-        file.save(filepath)
+        extension = file.filename.rsplit('.', 1)[1].lower()
+        digest = hash_stream(file.stream)
+        
+        # A repeat upload of the same bytes reuses the stored contact set
+        contact_set = find_contact_set(current_user.id, digest, extension)
+        if contact_set is None:
+            processed = upload_cache.get(digest, extension)
+            if processed is not None:
+                log_debug_info("Upload served from cache", {"sha256": digest, "contacts": len(processed['results'])})
+                purge_expired_contact_sets(timedelta(hours=app.config['CONTACT_SET_MAX_AGE_HOURS']))
+                with metrics.span('upload.store', len(processed['results'])):
+                    contact_set = create_contact_set(current_user.id, filename, digest, extension, processed)
+            else:
+                # Secure the filename and save
+                filepath = os.path.join(app.config['UPLOAD_FOLDER'], filename)
+                file.save(filepath)
+                
+                purge_expired_contact_sets(timedelta(hours=app.config['CONTACT_SET_MAX_AGE_HOURS']))
+                contact_set = start_contact_set(current_user.id, filename, digest, extension)
+                # Contacts go to the database chunk by chunk; a copy is kept
+                # for the upload cache only while the upload is small
+                cacheable = [] if upload_cache.enabled else None
+                
+                def store_chunk(results):
+                    nonlocal cacheable
+                    with metrics.span('upload.store', len(results)):
+                        add_contacts(contact_set, results)
+                    if cacheable is not None:
+                        cacheable.extend(results)
+                        if len(cacheable) > app.config['UPLOAD_CACHE_MAX_ROWS']:
+                            cacheable = None
+                
+                # Process the file
+                with metrics.span('upload.process') as span:
+                    processed, status = process_uploaded_file(filepath, sink=store_chunk)
+                    span.rows = contact_set.total
+                if status != 200:
+                    db.session.rollback()
+                    return jsonify(dict(processed, success=False)), status
+                contact_set = finish_contact_set(contact_set, processed['warnings'], processed['merge_fields'])
+                if cacheable is not None:
+                    with metrics.span('upload.serialize', len(cacheable)):
+                        upload_cache.put(digest, extension, dict(processed, results=cacheable))
         
-        # Process the file
-        results = process_uploaded_file(filepath)
+        # Only the first page goes out with the upload; the rest is fetched on demand
+        warnings = contact_set.warnings or []
+        contacts, next_cursor = get_contacts_page(
+            contact_set, None, app.config['CONTACT_PAGE_SIZE'], list(CONTACT_FIELDS)
+        )
         
         return jsonify({
             'success': True,
             'filename': filename,
-            'results': results
+            'contact_set': contact_set.to_dict(),
+            'contacts': contacts,
+            'next_cursor': next_cursor,
+            'warnings': warnings[:app.config['UPLOAD_WARNING_LIMIT']],
+            'warning_count': len(warnings),
+            'merge_fields': contact_set.merge_fields or []
         })
         
     except Exception as e:
+        db.session.rollback()
         logger.error(f"Error in upload_file: {str(e)}\n{traceback.format_exc()}")
         return jsonify({
             'success': False,
             'error': 'Internal server error'
         }), 500
 
+@app.route('/contact_sets/<int:set_id>/contacts')
+@login_required
+def contact_set_contacts(set_id):
+    """Serve one page of a stored contact set"""
+    contact_set = db.session.get(ContactSet, set_id)
+    if contact_set is None or (contact_set.user_id != current_user.id and not current_user.is_admin):
+        return jsonify({
+            'success': False,
+            'error': 'Contact set not found'
+        }), 404
+        
+    try:
+        fields = parse_fields(request.args.get('fields'))
+    except ValueError as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 400
+        
+    cursor = request.args.get('cursor', type=int)
+    limit = request.args.get('limit', app.config['CONTACT_PAGE_SIZE'], type=int)
+    limit = max(1, min(limit, app.config['CONTACT_PAGE_MAX_SIZE']))
+    
+    contacts, next_cursor = get_contacts_page(contact_set, cursor, limit, fields)
+    return jsonify({
+        'success': True,
+        'contact_set': contact_set.to_dict(),
+        'contacts': contacts,
+        'next_cursor': next_cursor
+    })
+
+# Columns /personalize can return
+PERSONALIZE_COLUMNS = ['id', 'phone', 'body', 'encoding', 'units', 'segments', 'link']
+
+@app.route('/personalize', methods=['POST'])
+@login_required
+def personalize_contact_set():
+    """
+    Render a template for a whole contact set in one call.
+    Returns column arrays (id, phone, body, encoding, units, segments, link);
+    pass "columns" to receive only some of them.
+    """
+    data = request.get_json(silent=True) or {}
+    contact_set = db.session.get(ContactSet, data.get('contact_set_id') or 0)
+    if contact_set is None or (contact_set.user_id != current_user.id and not current_user.is_admin):
+        return jsonify({
+            'success': False,
+            'error': 'Contact set not found'
+        }), 404
+        
+    if not data.get('message_template'):
+        return jsonify({
+            'success': False,
+            'error': 'No message template provided'
+        }), 400
+        
+    if not isinstance(data['message_template'], str):
+        return jsonify({
+            'success': False,
+            'error': 'Message template must be a string'
+        }), 400
+        
+    wanted = data.get('columns') or PERSONALIZE_COLUMNS
+    unknown = [column for column in wanted if column not in PERSONALIZE_COLUMNS]
+    if unknown:
+        return jsonify({
+            'success': False,
+            'error': f"Unknown columns: {', '.join(map(str, unknown))}"
+        }), 400
+        
+    try:
+        batch = personalize(load_contact_frame(contact_set), data['message_template'], links='link' in wanted)
+    except TemplateError as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 400
+        
+    return jsonify({
+        'success': True,
+        'contact_set': contact_set.to_dict(),
+        'count': len(batch['body']),
+        'total_segments': int(batch['segments'].sum()),
+        'columns': {column: batch[column] if isinstance(batch[column], list) else batch[column].tolist()
+                    for column in wanted}
+    })
+
 @app.route('/generate_links', methods=['POST'])
 @login_required
 def generate_links():
-    """Generate WhatsApp links from uploaded data"""
+    """
+    Generate WhatsApp links from uploaded data.
+    Rows can be posted as a JSON object ({"rows": [...]}) or as NDJSON, one row
+    per line. A JSON object with contact_set_id instead of rows covers every
+    contact of that stored set, less any listed in exclude_ids.
+    NDJSON requests, and JSON requests with ?format=ndjson or an Accept header
+    preferring application/x-ndjson, get one NDJSON record per row streamed
+    back as it is built instead of a single JSON document.
+    An optional message_template (in the JSON body, or the query string for
+    NDJSON) replaces the default message; it may use the upload merge fields.
+    """
     try:
-        data = request.get_json()
+        ndjson_request = request.mimetype == NDJSON_MIMETYPE
+        stream_response = ndjson_request or request.args.get('format') == 'ndjson' or \
+            request.accept_mimetypes.best_match(['application/json', NDJSON_MIMETYPE]) == NDJSON_MIMETYPE
         
-        if not data or 'rows' not in data:
+        if ndjson_request:
+            data = None
+            template_text = request.args.get('message_template')
+        else:
+            data = request.get_json()
+            
+            if not data or ('rows' not in data and 'contact_set_id' not in data):
+                return jsonify({
+                    'success': False,
+                    'error': 'No data provided'
+                }), 400
+            template_text = data.get('message_template')
+            
+        # Compile and check the template once for the whole request
+        template = None
+        if template_text and not isinstance(template_text, str):
             return jsonify({
                 'success': False,
-                'error': 'No data provided'
+                'error': 'Message template must be a string'
             }), 400
-            
-        results = []
-        for row in data['rows']:
+        if template_text:
             try:
-                # Create message for this contact
-                message = create_message(row)
-                
-                # Format phone number
-                phone = process_phone_number(row.get('Phone', ''))
-                if not phone:
-                    phone = process_phone_number(row.get('Mobile', ''))
-                if not phone:
-                    phone = process_phone_number(row.get('Work Phone', ''))
-                    
-                if not phone:
-                    results.append({
-                        'success': False,
-                        'error': 'No valid phone number found',
-                        'row': row
-                    })
-                    continue
-                    
-                # Generate WhatsApp link
-                whatsapp_link = f"https://wa.me/{phone}?text={urllib.parse.quote(message)}"
-                
-                results.append({
-                    'success': True,
-                    'phone': phone,
-                    'message': message,
-                    'link': whatsapp_link,
-                    'row': row
-                })
-                
-            except Exception as e:
-                logger.error(f"Error processing row: {str(e)}\n{traceback.format_exc()}")
-                results.append({
+                template = compile_template(template_text)
+            except TemplateError as e:
+                return jsonify({
                     'success': False,
-                    'error': str(e),
-                    'row': row
-                })
+                    'error': str(e)
+                }), 400
+            unknown = [field for field in template.fields if field not in MERGE_FIELDS]
+            if unknown:
+                return jsonify({
+                    'success': False,
+                    'error': f"Unknown merge fields: {', '.join('{' + field + '}' for field in unknown)}"
+                }), 400
                 
+        if ndjson_request:
+            results = iter_ndjson_link_results(request.stream, template)
+        elif 'rows' in data:
+            results = iter_link_results(data['rows'], template)
+        else:
+            contact_set = db.session.get(ContactSet, data['contact_set_id'] or 0)
+            if contact_set is None or (contact_set.user_id != current_user.id and not current_user.is_admin):
+                return jsonify({
+                    'success': False,
+                    'error': 'Contact set not found'
+                }), 404
+            exclude = data.get('exclude_ids') or []
+            if not isinstance(exclude, list):
+                return jsonify({
+                    'success': False,
+                    'error': 'exclude_ids must be a list of contact ids'
+                }), 400
+            results = iter_contact_set_link_results(contact_set, template, set(exclude))
+            
+        if stream_response:
+            records = (json.dumps(result) + '\n' for result in results)
+            return Response(stream_with_context(records), mimetype=NDJSON_MIMETYPE,
+                            headers={'X-Accel-Buffering': 'no'})  # let proxies pass records through
+            
         return jsonify({
             'success': True,
-            'results': results
+            'results': list(results)
         })
         
     except Exception as e:
@@ -300,6 +494,137 @@ def generate_links():
             'error': 'Internal server error'
         }), 500
 
+NDJSON_MIMETYPE = 'application/x-ndjson'
+
+def iter_link_results(rows, template=None):
+    """Build link results for posted rows, LINK_BATCH_ROWS rows at a time"""
+    batch_rows = app.config['LINK_BATCH_ROWS']
+    for start in range(0, len(rows), batch_rows):
+        yield from build_link_results(rows[start:start + batch_rows], template)
+
+def iter_contact_set_link_results(contact_set, template=None, exclude=()):
+    """Build link results for a stored contact set, reading LINK_BATCH_ROWS contacts at a time"""
+    for rows in iter_contact_set_pages(contact_set, app.config['LINK_BATCH_ROWS'], exclude):
+        yield from build_link_results(rows, template)
+
+def iter_ndjson_link_results(stream, template=None):
+    """
+    Build link results for an NDJSON request body, reading it one line at a time.
+    Rows are handed to build_link_results in batches of LINK_BATCH_ROWS; an
+    invalid line flushes the rows before it so results keep the input order.
+    """
+    batch_rows = app.config['LINK_BATCH_ROWS']
+    rows = []
+    for line in stream:
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            row = json.loads(line)
+        except ValueError as e:
+            yield from build_link_results(rows, template)
+            rows = []
+            yield {
+                'success': False,
+                'error': f'Invalid JSON: {str(e)}',
+                'row': None
+            }
+            continue
+        rows.append(row)
+        if len(rows) >= batch_rows:
+            yield from build_link_results(rows, template)
+            rows = []
+    yield from build_link_results(rows, template)
+
+def row_phone(row):
+    """The first usable phone number of a posted row, normalized, or None"""
+    phone = process_phone_number(row.get('Phone', ''))
+    if not phone:
+        phone = process_phone_number(row.get('Mobile', ''))
+    if not phone:
+        phone = process_phone_number(row.get('Work Phone', ''))
+    if not phone:
+        # Contacts served from a contact set carry the normalized number,
+        # which is used as it is rather than normalized a second time
+        best_phone = row.get('best_phone', '')
+        phone = stored_phone(best_phone) or process_phone_number(best_phone)
+    return phone
+
+def build_link_results(rows, template=None):
+    """
+    Build the WhatsApp link results for a batch of posted rows.
+    Messages are percent-encoded for the whole batch at once; with a template
+    its fixed text is encoded a single time and only the merge values are
+    encoded per contact. A batch that can't be handled this way (rows that
+    aren't JSON objects, or an unexpected error) falls back to row by row.
+    """
+    if not rows:
+        return []
+    try:
+        if all(isinstance(row, dict) for row in rows):
+            phones = [row_phone(row) for row in rows]
+            if template:
+                # Fields the rows lack render empty
+                messages, links = render_links(rows, template, phones, default='')
+            else:
+                messages = [create_message(row) for row in rows]
+                links = wa_links(phones, messages)
+                
+            return [
+                {
+                    'success': True,
+                    'phone': phone,
+                    'message': message,
+                    'link': link,
+                    'row': row
+                } if phone else {
+                    'success': False,
+                    'error': 'No valid phone number found',
+                    'row': row
+                }
+                for row, phone, message, link in zip(rows, phones, messages, links)
+            ]
+    except Exception as e:
+        logger.error(f"Error processing batch of {len(rows)} rows: {str(e)}\n{traceback.format_exc()}")
+    return [build_link_result(row, template) for row in rows]
+
+def build_link_result(row, template=None):
+    """Build the WhatsApp link result for one posted row, using template when given"""
+    try:
+        # Create message for this contact; fields the row lacks render empty
+        message = template.render(row, default='') if template else create_message(row)
+        
+        # Format phone number
+        phone = row_phone(row)
+        if not phone:
+            return {
+                'success': False,
+                'error': 'No valid phone number found',
+                'row': row
+            }
+            
+        # Generate WhatsApp link
+        whatsapp_link = f"https://wa.me/{phone}?text={urllib.parse.quote(message)}"
+        
+        return {
+            'success': True,
+            'phone': phone,
+            'message': message,
+            'link': whatsapp_link,
+            'row': row
+        }
+        
+    except Exception as e:
+        seen = row_log_sampler.hit('build_link_result')
+        if seen:
+            logger.error(f"Error processing row ({seen} so far, 1 in {row_log_sampler.every} logged): "
+                         f"{str(e)}\n{traceback.format_exc()}")
+        return {
+            'success': False,
+            'error': str(e),
+            'row': row
+        }
+
 # Load configuration from Config class
 app.config.from_object(Config)
 
@@ -308,37 +633,62 @@ app.config.from_object(Config)
 # Secure configuration
 app.config['UPLOAD_FOLDER'] = os.path.join('app', 'uploads')
 app.config['SOURCE_FOLDER'] = os.path.join('data', 'source')
-app.config['MAX_CONTENT_LENGTH'] = 16 * 1024 * 1024  # 16MB max file size
 app.config['ALLOWED_EXTENSIONS'] = {'xlsx', 'xls', 'csv'}
 
 # Ensure upload and source directories exist
 os.makedirs(app.config['UPLOAD_FOLDER'], exist_ok=True)
 os.makedirs(app.config['SOURCE_FOLDER'], exist_ok=True)
 
+# Processed uploads keyed by the SHA-256 of their bytes
+upload_cache = UploadCache(app.config['UPLOAD_CACHE_FOLDER'], app.config['UPLOAD_CACHE_MAX_BYTES'])
+
+# Columns every upload must provide; nothing else in the sheet is used
+REQUIRED_COLUMNS = ['First Name', 'Last Name', 'Phone', 'Location',
+                    'Newest Engagement Date', 'Personal Volunteering Site URL',
+                    'Mobile', 'Work Phone']
+
 def allowed_file(filename):
     return '.' in filename and filename.rsplit('.', 1)[1].lower() in app.config['ALLOWED_EXTENSIONS']
 
+def read_upload_chunks(filepath):
+    """
+    Yield the uploaded sheet as DataFrames of at most UPLOAD_CHUNK_ROWS rows.
+    CSVs are streamed from disk, with every cell read as text so column types
+    can't change from one chunk to the next. .xlsx sheets are streamed by the
+    lightweight reader, which only extracts REQUIRED_COLUMNS. Legacy .xls
+    files are read whole.
+    """
+    if filepath.endswith('.xlsx'):
+        yield from iter_xlsx_chunks(filepath, REQUIRED_COLUMNS, app.config['UPLOAD_CHUNK_ROWS'])
+    elif filepath.endswith('.xls'):
+        yield pd.read_excel(filepath)
+    else:
+        with pd.read_csv(filepath, dtype=str, chunksize=app.config['UPLOAD_CHUNK_ROWS']) as reader:
+            yield from reader
+
 def clean_dataframe(df):
     """Clean and standardize the dataframe data"""
-    # Make a copy to avoid modifying the original
-    df = df.copy()
-    
     # Replace various forms of empty/null values with NaN
+    # (replace returns a new frame, so the caller's frame is left untouched)
     df = df.replace(['', 'nan', 'none', 'null', 'N/A', 'NA'], pd.NA)
     
     # Strip whitespace from string columns
     for col in df.select_dtypes(include=['object']):
-        df[col] = df[col].apply(lambda x: x.strip() if isinstance(x, str) else x)
+        try:
+            stripped = df[col].str.strip()
+        except AttributeError:
+            # Column holds no strings at all
+            continue
+        # Non-string cells come back as NaN from .str, keep their original value
+        stripped = stripped.where(stripped.notna(), df[col])
         # Convert empty strings to NaN
-        df[col] = df[col].replace(r'^\s*$', pd.NA, regex=True)
+        df[col] = stripped.mask(stripped.eq(''), pd.NA)
     
     # Clean phone numbers - remove non-numeric characters
     phone_columns = ['Phone', 'Mobile', 'Work Phone']
     for col in phone_columns:
         if col in df.columns:
-            df[col] = df[col].apply(lambda x: ''.join(filter(str.isdigit, str(x))) if pd.notna(x) else pd.NA)
-            # Convert empty strings to NaN
-            df[col] = df[col].replace('', pd.NA)
+            df[col] = strip_non_digits(df[col])
     
     return df
 
@@ -353,37 +703,34 @@ def validate_file_content(df):
         return errors, warnings
     
     # Check required columns
-    required_columns = ['First Name', 'Last Name', 'Phone', 'Location', 
-                       'Newest Engagement Date', 'Personal Volunteering Site URL',
-                       'Mobile', 'Work Phone']
-    missing_columns = [col for col in required_columns if col not in df.columns]
+    missing_columns = [col for col in REQUIRED_COLUMNS if col not in df.columns]
     if missing_columns:
         errors.append(f"Missing required columns: {', '.join(missing_columns)}")
         return errors, warnings
     
-    # Add row index to DataFrame for error reporting
-    df['Row_Number'] = df.index + 2  # Adding 2 because: 1 for 1-based indexing, 1 for header row
+    # Row numbers for error reporting
+    row_numbers = (df.index + 2).tolist()  # Adding 2 because: 1 for 1-based indexing, 1 for header row
+    first_names = df['First Name']
+    last_names = df['Last Name']
+    first_missing = first_names.isna().tolist()
+    last_missing = last_names.isna().tolist()
     
-    # Check empty names
-    empty_names = df[df[['First Name', 'Last Name']].isna().any(axis=1)]
-    if not empty_names.empty:
-        for _, row in empty_names.iterrows():
+    no_phone = df[['Phone', 'Mobile', 'Work Phone']].isna().all(axis=1).tolist()
+    
+    # Check empty names and missing phone numbers, row by row so warnings
+    # come out in file order however the file is split into chunks
+    for row_number, first_name, last_name, no_first, no_last, missing in zip(
+            row_numbers, first_names.tolist(), last_names.tolist(), first_missing, last_missing, no_phone):
+        if no_first or no_last:
             missing_fields = []
-            if pd.isna(row['First Name']):
+            if no_first:
                 missing_fields.append('First Name')
-            if pd.isna(row['Last Name']):
+            if no_last:
                 missing_fields.append('Last Name')
-            warnings.append(f"Row {row['Row_Number']}: Missing fields: {', '.join(missing_fields)}. This contact will be skipped.")
-    
-    # Check for missing phone numbers
-    no_phone = df[df[['Phone', 'Mobile', 'Work Phone']].isna().all(axis=1)]
-    if not no_phone.empty:
-        for _, row in no_phone.iterrows():
-            contact_name = f"{row['First Name'] if pd.notna(row['First Name']) else '[No First Name]'} {row['Last Name'] if pd.notna(row['Last Name']) else '[No Last Name]'}"
-            warnings.append(f"Row {row['Row_Number']}: No phone number found for contact: {contact_name}. This contact will be skipped.")
-    
-    # Remove the temporary row number column
-    df.drop('Row_Number', axis=1, inplace=True)
+            warnings.append(f"Row {row_number}: Missing fields: {', '.join(missing_fields)}. This contact will be skipped.")
+        if missing:
+            contact_name = f"{'[No First Name]' if no_first else first_name} {'[No Last Name]' if no_last else last_name}"
+            warnings.append(f"Row {row_number}: No phone number found for contact: {contact_name}. This contact will be skipped.")
     
     return errors, warnings
 
@@ -460,26 +807,228 @@ def create_message(contact):
         logger.error(f"Error creating message for contact: {str(e)}")
         return "Error creating personalized message."
 
-def safe_get_value(row, column, default='N/A'):
+def safe_get_column(df, column, default='N/A'):
+    """
+    Get a whole column as JSON-safe strings, with missing values replaced by default.
+    Expects a frame from clean_dataframe, so string cells are already stripped.
+    A cell counts as missing when it is NaN/NA or its text contains 'nan'
+    (any case), the same test the per-row lookup has always used.
+    """
+    if column not in df.columns:
+        return pd.Series(default, index=df.index, dtype=object)
+    values = df[column]
+    text = values.astype(object).map(str)
+    missing = values.isna() | text.str.contains('nan', case=False, regex=False)
+    return text.mask(missing, default)
+
+def build_contact_results(df, best_phones):
     """
-    Safely get a value from a pandas row, handling NaN and missing values.
-    Returns JSON-safe values (no NaN).
+    Build the contact result dicts for every row that has a usable phone.
+    Columns are masked and defaulted once for the whole frame, then zipped
+    into dicts in a single pass, in the original row order.
     """
+    has_phone = best_phones.notna()
+    df = df[has_phone]
+    phones = best_phones[has_phone]
+    
+    first_names = safe_get_column(df, 'First Name', '')
+    last_names = safe_get_column(df, 'Last Name', '')
+    full_names = (first_names + ' ' + last_names).str.strip()
+    locations = safe_get_column(df, 'Location', 'N/A')
+    engagement_dates = safe_get_column(df, 'Newest Engagement Date', 'N/A')
+    volunteer_urls = safe_get_column(df, 'Personal Volunteering Site URL', '')
+    volunteer_urls = volunteer_urls.mask(volunteer_urls.eq(''), None)
+    masked_phones = '****-****-' + phones.str[-4:]
+    
+    return [
+        {
+            'id': idx,  # Add unique ID for frontend
+            'full_name': full_name,
+            'First Name': first_name,
+            'Last Name': last_name,
+            'Location': location,
+            'phone': masked,  # Consistent display format
+            'best_phone': phone,  # Clean international format for WhatsApp
+            'phone_display': masked,  # Explicit display version
+            'phone_whatsapp': phone,  # Explicit WhatsApp version
+            'Newest Engagement Date': engagement_date,
+            'Personal Volunteering Site URL': volunteer_url,
+            'selected': True  # Default to selected
+        }
+        for idx, full_name, first_name, last_name, location, masked, phone, engagement_date, volunteer_url
+        in zip(df.index.tolist(), full_names.tolist(), first_names.tolist(), last_names.tolist(),
+               locations.tolist(), masked_phones.tolist(), phones.tolist(),
+               engagement_dates.tolist(), volunteer_urls.tolist())
+    ]
+
+class UploadError(Exception):
+    """An uploaded file that can't be processed, with the HTTP status to report"""
+    def __init__(self, message, status=400, warnings=None):
+        super().__init__(message)
+        self.status = status
+        self.warnings = warnings
+        
+    def __reduce__(self):
+        # Keep status and warnings when raised in an upload worker process
+        return (UploadError, (str(self), self.status, self.warnings))
+
+_upload_pool = None
+_upload_pool_key = None
+_upload_pool_lock = threading.Lock()
+
+def get_upload_pool():
+    """
+    Return this process's pool of upload workers, or None to process uploads
+    in the request thread. The pool is created on first use with
+    UPLOAD_WORKERS processes. Workers come from a fork server (spawned where
+    there is none), not from forking this process: by then it runs the log
+    writer, SMS and receipt threads and holds database connections, and a
+    fork could inherit a lock one of those threads holds, or the connections.
+    Each worker imports the app once as it starts.
+    """
+    global _upload_pool, _upload_pool_key
+    workers = app.config['UPLOAD_WORKERS']
+    if workers < 2:
+        return None
+    with _upload_pool_lock:
+        # A forked server worker, or a changed worker count, needs a new pool
+        key = (os.getpid(), workers)
+        if _upload_pool is None or _upload_pool_key != key:
+            if _upload_pool is not None and _upload_pool_key[0] == os.getpid():
+                _upload_pool.terminate()
+            method = 'forkserver' if 'forkserver' in multiprocessing.get_all_start_methods() else 'spawn'
+            _upload_pool = multiprocessing.get_context(method).Pool(
+                workers, initializer=importlib.import_module, initargs=(__name__,)
+            )
+            _upload_pool_key = key
+            logger.info(f"Started {workers} upload worker processes ({method})")
+        return _upload_pool
+
+def process_chunk(df):
+    """
+    Clean, validate and convert one chunk of the upload.
+    Only uses the frame it is given, so it can run in an upload worker.
+    Returns:
+        tuple: (results, warnings) for the chunk's rows
+    Raises:
+        UploadError: if the chunk fails validation
+    """
+    rows = len(df)
     try:
-        value = row.get(column, default)
-        # Check if it's pandas NaN or numpy NaN
-        if pd.isna(value) or (hasattr(value, '__class__') and 'nan' in str(value).lower()):
-            return default
-        # Convert to string and strip if it's a string-like object
-        if isinstance(value, str):
-            return value.strip()
-        return str(value) if value is not None else default
-    except Exception:
-        return default
-
-def process_uploaded_file(filepath):
+        with metrics.span('upload.clean', rows):
+            df = clean_dataframe(df)
+        with metrics.span('upload.validate', rows):
+            errors, validation_warnings = validate_file_content(df)
+    except Exception as e:
+        raise UploadError(f'Data validation failed: {str(e)}')
+    
+    if errors:
+        log_debug_info("Validation errors found", {"errors": errors})
+        raise UploadError(errors[0], warnings=validation_warnings)
+    
+    # Normalize Mobile -> Phone -> Work Phone for every row in one pass
+    with metrics.span('upload.phones', rows):
+        best_phones = select_best_phone(df)
+    with metrics.span('upload.build', rows):
+        chunk_results = build_contact_results(df, best_phones)
+    
+    skipped = len(df) - len(chunk_results)
+    if skipped:
+        log_debug_info("Rows without a valid phone number skipped", {"count": skipped})
+    
+    return chunk_results, validation_warnings
+
+def process_partition(df):
+    """
+    Run process_chunk in an upload worker, returning the worker's stage
+    timings with the results so the request process can report them
+    """
+    return process_chunk(df), metrics.drain()
+
+def iter_processed_chunks(filepath):
+    """
+    Clean, validate and convert the upload one chunk at a time.
+    Yields (results, warnings) for each chunk so callers can consume contacts
+    without holding the whole sheet in memory.
+    With UPLOAD_WORKERS set, chunks are cut into partitions of
+    UPLOAD_PARTITION_ROWS and processed across the upload worker pool while
+    the file is still being read. At most two partitions per worker are in
+    flight, and results are yielded in row order.
+    Raises:
+        UploadError: if the file can't be read or fails validation
+    """
+    pool = get_upload_pool()
+    if pool is None:
+        for df in iter_upload_frames(filepath):
+            yield process_chunk(df)
+        return
+    
+    partition_rows = max(1, app.config['UPLOAD_PARTITION_ROWS'])
+    max_pending = 2 * app.config['UPLOAD_WORKERS']
+    pending = deque()
+    for df in iter_upload_frames(filepath):
+        for start in range(0, max(len(df), 1), partition_rows):
+            pending.append(pool.apply_async(process_partition, (df.iloc[start:start + partition_rows],)))
+            if len(pending) >= max_pending:
+                yield collect_partition(pending.popleft())
+    while pending:
+        yield collect_partition(pending.popleft())
+
+def collect_partition(async_result):
+    """Wait for a partition from the upload pool and merge its stage timings"""
+    processed, timings = async_result.get()
+    metrics.merge(timings)
+    return processed
+
+def iter_upload_frames(filepath):
+    """
+    Read the upload as DataFrames of at most UPLOAD_CHUNK_ROWS rows.
+    A header-only file yields one empty frame, so validation can report it.
+    Raises:
+        UploadError: if the file can't be read
+    """
+    chunks = read_upload_chunks(filepath)
+    total_rows = 0
+    
+    while True:
+        try:
+            with metrics.span('upload.read') as span:
+                df = next(chunks, None)
+                span.rows = 0 if df is None else len(df)
+        except pd.errors.EmptyDataError:
+            raise UploadError('The uploaded file is empty')
+        except pd.errors.ParserError as e:
+            raise UploadError(f'Failed to parse file: {str(e)}')
+        except Exception as e:
+            raise UploadError(f'Failed to read file: {str(e)}')
+        
+        if df is None:
+            if total_rows:
+                break
+            # Header-only CSVs produce no chunks at all
+            df = pd.DataFrame()
+        
+        log_debug_info("Read file chunk", {"shape": df.shape, "first_row": total_rows + 2})
+        total_rows += len(df)
+        yield df
+        if not total_rows:
+            break
+    
+    log_debug_info("Finished reading file", {"total_rows": total_rows})
+
+_WARNING_ROW = re.compile(r'Row (\d+):')
+
+def warning_row(warning):
+    """Row number an upload warning is about"""
+    match = _WARNING_ROW.match(warning)
+    return int(match.group(1)) if match else 0
+
+def process_uploaded_file(filepath, sink=None):
     """
     Process the uploaded file and extract contact information.
+    With a sink, each chunk's contacts are passed to sink(results) as soon
+    as they are deduplicated and are not kept, so the returned results are
+    empty and memory holds one chunk of contacts at a time (plus warnings).
     Returns:
         tuple: (dict with results or error, HTTP status code)
     """
@@ -503,103 +1052,42 @@ def process_uploaded_file(filepath):
         if not os.path.exists(filepath):
             return {'error': 'File not found'}, 400
 
-        # Read the file
+        # Process the file chunk by chunk; only the deduper sees every number
+        results = []
+        contacts = 0
+        deduper = PhoneDeduper()
         try:
-            if filepath.endswith(('.xlsx', '.xls')):
-                df = pd.read_excel(filepath)
-                log_debug_info("Read Excel file", {"shape": df.shape, "columns": list(df.columns)})
-            else:
-                df = pd.read_csv(filepath)
-                log_debug_info("Read CSV file", {"shape": df.shape, "columns": list(df.columns)})
-        except pd.errors.EmptyDataError:
-            return {'error': 'The uploaded file is empty'}, 400
-        except pd.errors.ParserError as e:
-            return {'error': f'Failed to parse file: {str(e)}'}, 400
-        except Exception as e:
-            return {'error': f'Failed to read file: {str(e)}'}, 400
+            for chunk_results, chunk_warnings in iter_processed_chunks(filepath):
+                # A number listed again, in any phone column, is only messaged once
+                with metrics.span('upload.dedupe', len(chunk_results)):
+                    keep = deduper.keep([result['best_phone'] for result in chunk_results])
+                kept_results = []
+                duplicate_warnings = []
+                for result, kept in zip(chunk_results, keep):
+                    if kept:
+                        kept_results.append(result)
+                    else:
+                        duplicate_warnings.append(f"Row {result['id'] + 2}: Duplicate phone number {result['phone']} "
+                                                  f"already listed for another contact. This contact will be skipped.")
+                # Both lists are in row order; merged, the warnings don't depend on how the file was split
+                warnings.extend(heapq.merge(chunk_warnings, duplicate_warnings, key=warning_row))
+                contacts += len(kept_results)
+                if sink is None:
+                    results.extend(kept_results)
+                elif kept_results:
+                    sink(kept_results)
+        except UploadError as e:
+            if e.warnings is None:
+                return {'error': str(e)}, e.status
+            return {'error': str(e), 'warnings': warnings + e.warnings}, e.status
 
-        # Clean and validate the dataframe
-        try:
-            df = clean_dataframe(df)
-            errors, validation_warnings = validate_file_content(df)
-            warnings.extend(validation_warnings)  # Add validation warnings to main warnings list
-            
-            if errors:
-                log_debug_info("Validation errors found", {"errors": errors})
-                return {'error': errors[0], 'warnings': warnings}, 400
-        except Exception as e:
-            return {'error': f'Data validation failed: {str(e)}'}, 400
-        
-        results = []
-        for idx, row in df.iterrows():
-            try:
-                log_debug_info(f"Processing row {idx + 2}", {
-                    "row_data": {k: str(v) for k, v in row.items()}
-                })
-
-                # Get best available phone number
-                phone = None
-                for col in ['Mobile', 'Phone', 'Work Phone']:
-                    if col in row and not pd.isna(row[col]):
-                        original_phone = str(row[col])
-                        phone = process_phone_number(row[col])
-                        if phone:
-                            log_debug_info(f"Found valid phone in column {col}", {
-                                "original": original_phone,
-                                "processed": phone,
-                                "length": len(phone)
-                            })
-                            break
-                
-                if not phone:
-                    log_debug_info(f"No valid phone number found in row {idx + 2}")
-                    continue
-
-                # Create result object with masked phone for display
-                # Use safe_get_value to ensure no NaN values in JSON
-                first_name = safe_get_value(row, 'First Name', '')
-                last_name = safe_get_value(row, 'Last Name', '')
-                location = safe_get_value(row, 'Location', 'N/A')
-                engagement_date = safe_get_value(row, 'Newest Engagement Date', 'N/A')
-                volunteer_url = safe_get_value(row, 'Personal Volunteering Site URL', '')
-                
-                result = {
-                    'id': idx,  # Add unique ID for frontend
-                    'full_name': f"{first_name} {last_name}".strip(),
-                    'First Name': first_name,
-                    'Last Name': last_name,
-                    'Location': location,
-                    'phone': f"****-****-{phone[-4:]}",  # Consistent display format
-                    'best_phone': phone,  # Clean international format for WhatsApp
-                    'phone_display': f"****-****-{phone[-4:]}",  # Explicit display version
-                    'phone_whatsapp': phone,  # Explicit WhatsApp version
-                    'Newest Engagement Date': engagement_date,
-                    'Personal Volunteering Site URL': volunteer_url if volunteer_url else None,
-                    'selected': True  # Default to selected
-                }
-                
-                log_debug_info(f"Created result for row {idx + 2}", {
-                    "result": {k: v if k != 'best_phone' else '****' for k, v in result.items()}
-                })
-                results.append(result)
-                
-            except Exception as e:
-                error_msg = f"Error processing row {idx + 2}: {str(e)}"
-                log_debug_info(error_msg, {
-                    "error": str(e),
-                    "traceback": traceback.format_exc()
-                })
-                # Continue processing other rows instead of failing completely
-                warnings.append(error_msg)
-                continue
-
-        if not results:
+        if not contacts:
             log_debug_info("No valid results generated")
             return {'error': 'No valid contacts found in the file', 'warnings': warnings}, 400
 
         log_debug_info("File processing completed", {
-            "total_rows": len(df),
-            "processed_results": len(results)
+            "processed_results": contacts,
+            "duplicates_skipped": deduper.duplicates
         })
         
         # Define available merge fields
@@ -613,7 +1101,7 @@ def process_uploaded_file(filepath):
         ]
         
         log_debug_info("ABOUT TO RETURN SUCCESS from process_uploaded_file", {
-            "results_count": len(results),
+            "results_count": contacts,
             "warnings_count": len(warnings),
             "merge_fields_count": len(merge_fields)
         })
@@ -678,61 +1166,6 @@ def validate_file_size(file):
         raise ValueError(f"File size exceeds maximum limit of {app.config['MAX_CONTENT_LENGTH'] // (1024 * 1024)}MB")
     return True
 
-def process_phone_number(phone):
-    if not phone or pd.isna(phone):
-        return None
-        
-    # Convert to string and clean
-    phone_str = str(phone).strip()
-    
-    # Remove common formatting characters but preserve + at start
-    # Keep + at beginning for international format detection
-    if phone_str.startswith('+'):
-        # International format: +44 7946 220153 → +447946220153
-        phone = '+' + re.sub(r'[^\d]', '', phone_str[1:])
-    else:
-        # Remove all non-numeric characters
-        phone = re.sub(r'[^\d]', '', phone_str)
-    
-    # Handle different number formats
-    if phone.startswith('+'):
-        # Already international format, remove + for WhatsApp
-        phone = phone[1:]
-        # Basic validation for international numbers
-        if not (7 <= len(phone) <= 15):
-            return None
-    elif phone.startswith('0'):
-        # UK national format: 07946220153 → 447946220153
-        phone = '44' + phone[1:]
-    elif phone.startswith('44'):
-        # Already UK international format
-        pass
-    elif len(phone) == 10 and phone.startswith('7'):
-        # UK mobile without leading 0: 7946220153 → 447946220153
-        phone = '44' + phone
-    else:
-        # Unknown format - could be international without +
-        # Only convert to UK if it looks like a UK number (10-11 digits starting with certain patterns)
-        if len(phone) in [10, 11] and phone[0] in ['7', '8', '1', '2']:
-            # Likely UK number, add 44
-            if phone.startswith('0'):
-                phone = '44' + phone[1:]
-            else:
-                phone = '44' + phone
-        else:
-            # Assume it's already in correct international format
-            pass
-    
-    # Final validation
-    if not (7 <= len(phone) <= 15):
-        return None
-        
-    # Ensure it's all digits at this point
-    if not phone.isdigit():
-        return None
-        
-    return phone
-
 @app.route('/process', methods=['POST'])
 def process_file_endpoint():
     """Handle the /process endpoint"""
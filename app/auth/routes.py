@@ -1,6 +1,8 @@
 from flask import Blueprint, render_template, redirect, url_for, flash, request, current_app
 from flask_login import login_user, logout_user, login_required, current_user
 from app.models.user import User, db
+from app.models.activity import ActivityEvent
+from app.utils.activity import record_activity
 from urllib.parse import urlparse
 
 auth = Blueprint('auth', __name__)
@@ -95,6 +97,8 @@ def register():
         user.set_password(password)
         
         db.session.add(user)
+        db.session.flush()
+        record_activity(ActivityEvent.KIND_USER_REGISTERED, 'New user registration', user.id)
         db.session.commit()
         
         flash('Registration successful! Please log in.', 'success')
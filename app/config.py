@@ -52,15 +52,59 @@ class Config:
     # File upload configuration
     UPLOAD_FOLDER = os.path.join('app', 'uploads')
     SOURCE_FOLDER = os.path.join('data', 'source')
-    MAX_CONTENT_LENGTH = 16 * 1024 * 1024  # 16MB max file size
+    MAX_CONTENT_LENGTH = int(os.getenv('MAX_CONTENT_LENGTH', str(16 * 1024 * 1024)))  # 16MB default max file size
+    UPLOAD_CHUNK_ROWS = int(os.getenv('UPLOAD_CHUNK_ROWS', '50000'))  # rows per CSV/XLSX ingestion chunk
+    UPLOAD_WORKERS = int(os.getenv('UPLOAD_WORKERS', '0'))  # upload processing processes, 0 or 1 processes in the request
+    UPLOAD_PARTITION_ROWS = int(os.getenv('UPLOAD_PARTITION_ROWS', '10000'))  # rows per upload worker task
     ALLOWED_EXTENSIONS = {'xlsx', 'xls', 'csv'}
+    UPLOAD_CACHE_FOLDER = os.getenv('UPLOAD_CACHE_FOLDER', os.path.join('app', 'cache', 'uploads'))
+    UPLOAD_CACHE_MAX_BYTES = int(os.getenv('UPLOAD_CACHE_MAX_BYTES', str(256 * 1024 * 1024)))  # 0 disables the processed upload cache
+    UPLOAD_CACHE_MAX_ROWS = int(os.getenv('UPLOAD_CACHE_MAX_ROWS', '50000'))  # larger uploads are stored without being cached
+    CONTACT_PAGE_SIZE = int(os.getenv('CONTACT_PAGE_SIZE', '100'))  # contacts per page of a contact set
+    CONTACT_PAGE_MAX_SIZE = int(os.getenv('CONTACT_PAGE_MAX_SIZE', '1000'))  # largest page a client may request
+    UPLOAD_WARNING_LIMIT = int(os.getenv('UPLOAD_WARNING_LIMIT', '100'))  # warnings returned with an upload response
+    LINK_BATCH_ROWS = int(os.getenv('LINK_BATCH_ROWS', '5000'))  # rows /generate_links renders and encodes together
+    CONTACT_SET_MAX_AGE_HOURS = int(os.getenv('CONTACT_SET_MAX_AGE_HOURS', '24'))  # stored uploads are purged after this
+    
+    # Logging configuration
+    LOG_LEVEL = os.getenv('LOG_LEVEL', 'INFO').upper()  # app logger level; DEBUG adds per-chunk upload detail
+    LOG_BATCH_SIZE = int(os.getenv('LOG_BATCH_SIZE', '500'))  # records written per flush by the log writer thread
+    LOG_ROW_SAMPLE_RATE = int(os.getenv('LOG_ROW_SAMPLE_RATE', '100'))  # log 1 in this many repeated per-row errors
+    
+    # Admin dashboard configuration
+    DASHBOARD_USER_COUNT_SECONDS = int(os.getenv('DASHBOARD_USER_COUNT_SECONDS', '60'))  # how long user totals are reused
+    DASHBOARD_ACTIVITY_LIMIT = int(os.getenv('DASHBOARD_ACTIVITY_LIMIT', '10'))  # entries in the activity feed
+    ADMIN_USERS_PAGE_SIZE = int(os.getenv('ADMIN_USERS_PAGE_SIZE', '50'))  # users per page of the admin user list
     
     # Twilio configuration
     TWILIO_ACCOUNT_SID = os.getenv('TWILIO_ACCOUNT_SID')
     TWILIO_AUTH_TOKEN = os.getenv('TWILIO_AUTH_TOKEN')
     TWILIO_PHONE_NUMBER = os.getenv('TWILIO_PHONE_NUMBER')
+    TWILIO_API_BASE_URL = os.getenv('TWILIO_API_BASE_URL')  # override for a local fake provider
+    SMS_STATUS_CALLBACK_URL = os.getenv('SMS_STATUS_CALLBACK_URL')  # public URL of /sms/status-callback, enables delivery receipts
+    SMS_INBOUND_URL = os.getenv('SMS_INBOUND_URL')  # public URL of /sms/inbound as set on the Twilio number, for signature checks
     
     # SMS configuration
     SMS_RATE_LIMIT = int(os.getenv('SMS_RATE_LIMIT', '1'))  # messages per second
     SMS_MAX_LENGTH = int(os.getenv('SMS_MAX_LENGTH', '1600'))  # characters
-    SMS_BATCH_SIZE = int(os.getenv('SMS_BATCH_SIZE', '50'))  # messages per batch 
\ No newline at end of file
+    SUPPRESSION_REFRESH_SECONDS = float(os.getenv('SUPPRESSION_REFRESH_SECONDS', '30'))  # how stale the in-memory opt-out list may get
+    SMS_DEDUPE_WINDOW_HOURS = int(os.getenv('SMS_DEDUPE_WINDOW_HOURS', '0'))  # skip numbers messaged this recently, 0 disables
+    SMS_MAX_SEGMENTS = int(os.getenv('SMS_MAX_SEGMENTS', '10'))  # billable parts per message
+    SMS_SEGMENT_PRICE = float(os.getenv('SMS_SEGMENT_PRICE', '0.04'))  # provider charge per segment
+    SMS_PRICE_CURRENCY = os.getenv('SMS_PRICE_CURRENCY', 'GBP')  # currency of SMS_SEGMENT_PRICE
+    SMS_BATCH_SIZE = int(os.getenv('SMS_BATCH_SIZE', '50'))  # messages per batch
+    SMS_MAX_WORKERS = int(os.getenv('SMS_MAX_WORKERS', '8'))  # concurrent provider requests
+    SMS_ASYNC_CONCURRENCY = int(os.getenv('SMS_ASYNC_CONCURRENCY', '100'))  # in-flight async requests per process
+    SMS_HTTP_TIMEOUT = float(os.getenv('SMS_HTTP_TIMEOUT', '30'))  # seconds
+    SMS_JOB_LEASE_SECONDS = int(os.getenv('SMS_JOB_LEASE_SECONDS', '300'))  # stale worker takeover
+    SMS_WORKER_POLL_INTERVAL = float(os.getenv('SMS_WORKER_POLL_INTERVAL', '2'))  # seconds
+    SMS_WORKER_METRICS_PORT = int(os.getenv('SMS_WORKER_METRICS_PORT', '0'))  # serve worker stage metrics on this port, 0 disables
+    SMS_WORKER_METRICS_HOST = os.getenv('SMS_WORKER_METRICS_HOST', '127.0.0.1')  # interface for the worker metrics server
+    STATUS_CACHE_TTL_SECONDS = float(os.getenv('STATUS_CACHE_TTL_SECONDS', '15'))  # how long a pending delivery status is served
+    STATUS_CACHE_MAX_ENTRIES = int(os.getenv('STATUS_CACHE_MAX_ENTRIES', '100000'))  # cached message statuses per process
+    STATUS_POLL_INTERVAL = float(os.getenv('STATUS_POLL_INTERVAL', '10'))  # seconds between background status refreshes, 0 disables
+    STATUS_POLL_BATCH_SIZE = int(os.getenv('STATUS_POLL_BATCH_SIZE', '100'))  # status lookups in flight together
+    STATUS_WATCH_SECONDS = float(os.getenv('STATUS_WATCH_SECONDS', '600'))  # keep polling a pending message this long after it was requested
+    STATUS_BULK_MAX = int(os.getenv('STATUS_BULK_MAX', '1000'))  # message IDs per bulk status request
+    RECEIPT_FLUSH_SIZE = int(os.getenv('RECEIPT_FLUSH_SIZE', '500'))  # buffered delivery receipts that trigger a write
+    RECEIPT_FLUSH_SECONDS = float(os.getenv('RECEIPT_FLUSH_SECONDS', '1'))  # longest a receipt waits in memory
\ No newline at end of file
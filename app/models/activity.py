@@ -0,0 +1,48 @@
+from datetime import datetime
+from .user import db
+
+class ActivityEvent(db.Model):
+    """Something worth showing in the admin activity feed"""
+    __tablename__ = 'activity_events'
+
+    KIND_USER_REGISTERED = 'user_registered'
+    KIND_CONTACTS_UPLOADED = 'contacts_uploaded'
+    KIND_CAMPAIGN_QUEUED = 'campaign_queued'
+    KIND_CAMPAIGN_COMPLETED = 'campaign_completed'
+    KIND_CAMPAIGN_FAILED = 'campaign_failed'
+
+    id = db.Column(db.Integer, primary_key=True)  # the feed reads the newest ids
+    kind = db.Column(db.String(30), nullable=False)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'))
+    description = db.Column(db.String(255), nullable=False)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+
+    def to_dict(self):
+        """Entry in the shape the dashboard template renders"""
+        return {
+            'description': self.description,
+            'timestamp': self.created_at.strftime('%Y-%m-%d %H:%M:%S')
+        }
+
+class MessageRollup(db.Model):
+    """
+    Message counter for one hour or one day
+
+    Counters are incremented as messages are queued, sent, fail or are
+    delivered, so totals for a period are a single row read however much
+    history there is.
+    """
+    __tablename__ = 'message_rollups'
+
+    PERIOD_HOUR = 'hour'
+    PERIOD_DAY = 'day'
+
+    METRIC_QUEUED = 'queued'
+    METRIC_SENT = 'sent'
+    METRIC_FAILED = 'failed'
+    METRIC_DELIVERED = 'delivered'
+
+    period = db.Column(db.String(4), primary_key=True)
+    bucket = db.Column(db.DateTime, primary_key=True)  # start of the hour or day, UTC
+    metric = db.Column(db.String(20), primary_key=True)
+    count = db.Column(db.BigInteger, default=0, nullable=False)
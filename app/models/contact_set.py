@@ -0,0 +1,46 @@
+from datetime import datetime
+from .user import db
+
+class ContactSet(db.Model):
+    """The processed contacts of one upload, served to the browser page by page"""
+    __tablename__ = 'contact_sets'
+
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), index=True)
+    filename = db.Column(db.String(255))
+    sha256 = db.Column(db.String(64), index=True)  # upload key: digest of the bytes and the processing version
+    file_type = db.Column(db.String(10))
+    total = db.Column(db.Integer, default=0, nullable=False)
+    warnings = db.Column(db.JSON)
+    merge_fields = db.Column(db.JSON)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, index=True)
+
+    contacts = db.relationship('Contact', backref='contact_set', lazy='dynamic',
+                               cascade='all, delete-orphan', passive_deletes=True)
+
+    def to_dict(self):
+        """Convert contact set metadata to a dictionary"""
+        return {
+            'id': self.id,
+            'filename': self.filename,
+            'total': self.total,
+            'created_at': self.created_at.isoformat() if self.created_at else None
+        }
+
+class Contact(db.Model):
+    """One contact of a contact set, keyed by its row id in the upload"""
+    __tablename__ = 'contacts'
+    __table_args__ = (
+        db.UniqueConstraint('contact_set_id', 'row_id', name='uq_contact_set_row'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    contact_set_id = db.Column(db.Integer, db.ForeignKey('contact_sets.id', ondelete='CASCADE'), nullable=False)
+    row_id = db.Column(db.Integer, nullable=False)  # pagination key
+    full_name = db.Column(db.String(255))
+    first_name = db.Column(db.String(255))
+    last_name = db.Column(db.String(255))
+    location = db.Column(db.String(255))
+    best_phone = db.Column(db.String(32), nullable=False)
+    engagement_date = db.Column(db.String(64))
+    volunteer_url = db.Column(db.Text)
@@ -0,0 +1,24 @@
+from datetime import datetime
+from .user import db
+
+class MessageStatus(db.Model):
+    """
+    Latest delivery status of a sent message, from the provider's status callbacks
+
+    Receipts are buffered and written in batches, so a row can lag its
+    callback by up to RECEIPT_FLUSH_SECONDS.
+    """
+    __tablename__ = 'message_statuses'
+
+    sid = db.Column(db.String(64), primary_key=True)  # provider message SID
+    status = db.Column(db.String(20), nullable=False)
+    error_code = db.Column(db.String(10))
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False, index=True)
+
+    def to_dict(self):
+        """Status in the shape returned by SMSHandler.get_message_status"""
+        return {
+            'status': self.status,
+            'error_code': self.error_code,
+            'error_message': None
+        }
@@ -0,0 +1,9 @@
+from datetime import datetime
+from .user import db
+
+class RecipientHistory(db.Model):
+    """When each phone number was last queued in a campaign, keyed by its E.164 digits as an integer"""
+    __tablename__ = 'recipient_history'
+
+    phone_key = db.Column(db.BigInteger, primary_key=True, autoincrement=False)
+    last_sent_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False, index=True)
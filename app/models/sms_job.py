@@ -0,0 +1,72 @@
+from datetime import datetime
+from .user import db
+
+class SMSJob(db.Model):
+    """A queued SMS campaign drained by the background workers"""
+    __tablename__ = 'sms_jobs'
+    
+    STATUS_QUEUED = 'queued'
+    STATUS_RUNNING = 'running'
+    STATUS_COMPLETED = 'completed'
+    STATUS_FAILED = 'failed'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), index=True)
+    message_template = db.Column(db.Text, nullable=False)
+    status = db.Column(db.String(20), default=STATUS_QUEUED, nullable=False, index=True)
+    total = db.Column(db.Integer, default=0, nullable=False)
+    sent = db.Column(db.Integer, default=0, nullable=False)
+    failed = db.Column(db.Integer, default=0, nullable=False)
+    next_position = db.Column(db.Integer, default=0, nullable=False)  # checkpoint
+    worker_id = db.Column(db.String(64))
+    heartbeat_at = db.Column(db.DateTime)
+    error = db.Column(db.Text)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    started_at = db.Column(db.DateTime)
+    completed_at = db.Column(db.DateTime)
+    
+    recipients = db.relationship('SMSJobRecipient', backref='job', lazy='dynamic',
+                                 cascade='all, delete-orphan')
+    
+    @property
+    def processed(self):
+        """Number of recipients already attempted"""
+        return self.sent + self.failed
+    
+    def to_dict(self):
+        """Convert job progress to a dictionary"""
+        return {
+            'id': self.id,
+            'status': self.status,
+            'total': self.total,
+            'sent': self.sent,
+            'failed': self.failed,
+            'processed': self.processed,
+            'remaining': self.total - self.processed,
+            'percent_complete': round(100.0 * self.processed / self.total, 1) if self.total else 100.0,
+            'error': self.error,
+            'created_at': self.created_at.isoformat() if self.created_at else None,
+            'started_at': self.started_at.isoformat() if self.started_at else None,
+            'completed_at': self.completed_at.isoformat() if self.completed_at else None
+        }
+
+class SMSJobRecipient(db.Model):
+    """One recipient of a queued campaign and the outcome of its send"""
+    __tablename__ = 'sms_job_recipients'
+    __table_args__ = (
+        db.UniqueConstraint('job_id', 'position', name='uq_sms_job_recipient_position'),
+    )
+    
+    STATUS_PENDING = 'pending'
+    STATUS_SENT = 'sent'
+    STATUS_FAILED = 'failed'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    job_id = db.Column(db.Integer, db.ForeignKey('sms_jobs.id'), nullable=False)
+    position = db.Column(db.Integer, nullable=False)
+    phone = db.Column(db.String(32), nullable=False)
+    variables = db.Column(db.JSON)
+    status = db.Column(db.String(20), default=STATUS_PENDING, nullable=False)
+    message_id = db.Column(db.String(64))
+    error = db.Column(db.Text)
+    sent_at = db.Column(db.DateTime)
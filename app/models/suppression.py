@@ -0,0 +1,23 @@
+from datetime import datetime
+from .user import db
+
+class SuppressionEvent(db.Model):
+    """
+    One change to the suppression list: a number opted out (or was blocked) or opted back in
+
+    Events are only ever appended, so a process holding the list in memory
+    catches up by reading the events after the last id it has seen. A
+    number's current state is its latest event.
+    """
+    __tablename__ = 'suppression_events'
+
+    REASON_STOP = 'stop'  # the recipient replied STOP
+    REASON_START = 'start'  # the recipient replied START
+    REASON_MANUAL = 'manual'  # blocked or unblocked by a user
+
+    id = db.Column(db.Integer, primary_key=True)
+    phone_key = db.Column(db.BigInteger, nullable=False, index=True)  # E.164 digits as an integer
+    suppressed = db.Column(db.Boolean, nullable=False)
+    reason = db.Column(db.String(20), nullable=False)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'))
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
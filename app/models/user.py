@@ -15,8 +15,8 @@ class User(UserMixin, db.Model):
     last_name = db.Column(db.String(50))
     is_active = db.Column(db.Boolean, default=True)
     is_admin = db.Column(db.Boolean, default=False)
-    created_at = db.Column(db.DateTime, default=datetime.utcnow)
-    last_login = db.Column(db.DateTime)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, index=True)
+    last_login = db.Column(db.DateTime, index=True)
     login_count = db.Column(db.Integer, default=0)
     
     def set_password(self, password):
@@ -0,0 +1,63 @@
+"""
+Compare the per-record cost of log masking with the old SensitiveDataFilter.
+
+The old filter ran str() and an uncompiled re.sub on record.msg for every
+record reaching app.log, and never saw %-style args. MaskingFormatter masks
+the formatted message once per record. Both are timed on the same records,
+and the script reports any phone numbers each leaves visible.
+
+Usage:
+    python -m app.scripts.bench_log_masking --records 200000
+"""
+import argparse
+import logging
+import re
+import time
+from app.utils.log_masking import MaskingFormatter
+
+def old_filter(record):
+    """SensitiveDataFilter.filter as it was"""
+    if hasattr(record, 'msg'):
+        record.msg = str(record.msg)
+        record.msg = re.sub(r'(\d{2})\d+(\d{4})', r'\1****\2', record.msg)
+    return True
+
+def _records(count):
+    templates = [
+        ('Read file chunk', ()),
+        ('SMS sent successfully to +447946220153. Message SID: SM%032d', None),
+        ('Failed to send SMS to %s: %s', ('+447946220153', 'Rate limit exceeded')),
+        ('Worker %s claimed SMS job %d at position %d', ('web-1:4242', 17, 5000)),
+    ]
+    records = []
+    for i in range(count):
+        msg, args = templates[i % len(templates)]
+        if args is None:
+            msg, args = msg % i, ()
+        records.append(logging.LogRecord('app.app', logging.INFO, __file__, 1, msg, args, None))
+    return records
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark log record masking')
+    parser.add_argument('--records', type=int, default=200000)
+    args = parser.parse_args()
+
+    records = _records(args.records)
+    start = time.perf_counter()
+    old = [(old_filter(record), record.getMessage())[1] for record in records]
+    old_elapsed = time.perf_counter() - start
+
+    records = _records(args.records)
+    formatter = MaskingFormatter()
+    start = time.perf_counter()
+    new = [formatter.format(record) for record in records]
+    new_elapsed = time.perf_counter() - start
+
+    for name, elapsed, messages in (('SensitiveDataFilter', old_elapsed, old),
+                                    ('MaskingFormatter', new_elapsed, new)):
+        leaked = sum('7946220153' in message for message in messages)
+        print(f"{name:<20} {elapsed / len(records) * 1e6:.2f}us per record, "
+              f"{leaked} of {len(records)} records show a full number")
+
+if __name__ == '__main__':
+    main()
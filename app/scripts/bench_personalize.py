@@ -0,0 +1,90 @@
+"""
+Compare batch personalization with rendering contacts one at a time.
+
+The per-row path formats the template, picks the phone number, URL-encodes
+the message and counts its segments for each contact in turn; the batch path
+is app.utils.personalize. Both are checked to produce the same output.
+
+Usage:
+    python -m app.scripts.bench_personalize --rows 100000
+"""
+import argparse
+import random
+import time
+import urllib.parse
+import pandas as pd
+from app.utils.message_template import compile_template
+from app.utils.personalize import personalize, WA_ME_URL
+from app.utils.phone import process_phone_number
+from app.utils.segments import GSM7_BASIC, GSM7_EXTENDED, GSM7_LIMITS, UCS2_LIMITS
+
+TEMPLATE = ("Hi {first_name}, thanks for volunteering in {location}! "
+            "Last seen {engagement_date}. Details: {volunteer_url}")
+
+_BASIC = set(GSM7_BASIC)
+_EXTENDED = set(GSM7_EXTENDED)
+
+def _segments(message):
+    """Scalar segment count, one character at a time"""
+    if all(c in _BASIC or c in _EXTENDED for c in message):
+        units = len(message) + sum(c in _EXTENDED for c in message)
+        single, multi = GSM7_LIMITS
+        encoding = 'GSM-7'
+    else:
+        units = len(message.encode('utf-16-le')) // 2
+        single, multi = UCS2_LIMITS
+        encoding = 'UCS-2'
+    if not units:
+        return encoding, 0, 0
+    return encoding, units, 1 if units <= single else -(-units // multi)
+
+def _contacts(rows):
+    random.seed(1)
+    names = ['Ann', 'Bob', 'Zoë', 'Ifeoma', 'Siân', 'Wei']
+    return pd.DataFrame({
+        'First Name': [random.choice(names) for _ in range(rows)],
+        'Last Name': [f"Lee{i}" for i in range(rows)],
+        'Location': [random.choice(['Leeds', 'York', 'Cardiff & Vale', None]) for _ in range(rows)],
+        'Newest Engagement Date': [f"2024-01-{random.randint(1, 28):02d}" for _ in range(rows)],
+        'Personal Volunteering Site URL': [f"https://example.org/v?id={i}" for i in range(rows)],
+        'Phone': [random.choice([f"07{random.randrange(10**9):09d}", None]) for _ in range(rows)],
+        'Mobile': [None] * rows,
+        'Work Phone': [f"07{random.randrange(10**9):09d}" for _ in range(rows)]
+    })
+
+def per_row(contacts, text):
+    template = compile_template(text)
+    results = []
+    for row in contacts.where(contacts.notna(), None).to_dict('records'):
+        values = {key: '' if value is None else str(value) for key, value in row.items()}
+        body = template.render(values)
+        phone = process_phone_number(row['Phone']) or process_phone_number(row['Mobile']) or \
+            process_phone_number(row['Work Phone'])
+        link = f"{WA_ME_URL}{phone}?text={urllib.parse.quote(body)}" if phone else None
+        results.append((phone, body, link) + _segments(body))
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark batch message personalization')
+    parser.add_argument('--rows', type=int, default=100000)
+    parser.add_argument('--template', default=TEMPLATE)
+    args = parser.parse_args()
+
+    contacts = _contacts(args.rows)
+
+    start = time.perf_counter()
+    expected = per_row(contacts, args.template)
+    row_elapsed = time.perf_counter() - start
+
+    start = time.perf_counter()
+    batch = personalize(contacts, args.template)
+    batch_elapsed = time.perf_counter() - start
+
+    actual = list(zip(batch['phone'], batch['body'], batch['link'], batch['encoding'].tolist(),
+                      batch['units'].tolist(), batch['segments'].tolist()))
+    print(f"per-row {row_elapsed:.2f}s, batch {batch_elapsed:.2f}s "
+          f"({row_elapsed / batch_elapsed:.1f}x) for {args.rows} contacts")
+    print('outputs match' if actual == expected else 'OUTPUTS DIFFER')
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,43 @@
+"""
+Time upload processing in the request process and across upload workers.
+
+Runs process_uploaded_file on the same file once per worker count and checks
+that every run finds the same contacts and warnings, in the same order.
+
+Usage:
+    python -m app.scripts.bench_upload contacts.csv --workers 0 2 4 8
+"""
+import argparse
+import time
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark parallel upload processing')
+    parser.add_argument('filepath')
+    parser.add_argument('--workers', type=int, nargs='+', default=[0, 2, 4, 8])
+    parser.add_argument('--partition-rows', type=int, default=None)
+    args = parser.parse_args()
+
+    import app.app as web
+
+    if args.partition_rows:
+        web.app.config['UPLOAD_PARTITION_ROWS'] = args.partition_rows
+
+    baseline = None
+    for workers in args.workers:
+        web.app.config['UPLOAD_WORKERS'] = workers
+        # Start the pool outside the timed run
+        web.get_upload_pool()
+        start = time.perf_counter()
+        processed, status = web.process_uploaded_file(args.filepath)
+        elapsed = time.perf_counter() - start
+
+        results = processed.get('results', [])
+        output = (results, processed.get('warnings', []))
+        if baseline is None:
+            baseline = output
+        match = 'same contacts and warnings' if output == baseline else 'OUTPUT DIFFERS'
+        print(f"workers={workers:<3} status {status}, {len(results)} contacts in {elapsed:.2f}s "
+              f"({len(results) / elapsed:.0f}/s), {match}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,42 @@
+"""
+Compare the streaming .xlsx reader with pandas.read_excel on a workbook.
+
+Each reader runs in a fresh process so peak memory is measured separately.
+
+Usage:
+    python -m app.scripts.bench_xlsx contacts.xlsx
+"""
+import argparse
+import multiprocessing
+import resource
+import time
+import pandas as pd
+from app.utils.xlsx_reader import iter_xlsx_chunks
+
+def _run(mode, filepath, columns, chunk_rows):
+    start = time.perf_counter()
+    if mode == 'read_excel':
+        rows = len(pd.read_excel(filepath))
+    else:
+        rows = sum(len(chunk) for chunk in iter_xlsx_chunks(filepath, columns, chunk_rows))
+    elapsed = time.perf_counter() - start
+    # ru_maxrss is reported in kilobytes on Linux
+    peak_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    return rows, elapsed, peak_mb
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark .xlsx upload parsing')
+    parser.add_argument('filepath')
+    parser.add_argument('--chunk-rows', type=int, default=50000)
+    args = parser.parse_args()
+
+    from app.app import REQUIRED_COLUMNS
+
+    context = multiprocessing.get_context('spawn')
+    for mode in ('xlsx_reader', 'read_excel'):
+        with context.Pool(1) as pool:
+            rows, elapsed, peak_mb = pool.apply(_run, (mode, args.filepath, REQUIRED_COLUMNS, args.chunk_rows))
+        print(f"{mode:<12} {rows} rows in {elapsed:.2f}s ({rows / elapsed:.0f} rows/s), peak RSS {peak_mb:.0f} MB")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,93 @@
+import threading
+import time
+from datetime import date, datetime, timedelta
+from typing import Dict, List, Optional
+from sqlalchemy.exc import IntegrityError
+from app.models.user import User, db
+from app.models.activity import ActivityEvent, MessageRollup
+
+def record_activity(kind: str, description: str, user_id: Optional[int] = None) -> None:
+    """
+    Add an entry to the admin activity feed; the caller commits
+
+    Args:
+        kind (str): One of the ActivityEvent kinds
+        description (str): Text shown in the feed, without personal data
+        user_id (Optional[int]): User the activity belongs to
+    """
+    db.session.add(ActivityEvent(kind=kind, description=description[:255], user_id=user_id))
+
+def _increment(period: str, bucket: datetime, metric: str, amount: int) -> None:
+    rollup = MessageRollup.query.filter_by(period=period, bucket=bucket, metric=metric)
+    if rollup.update({MessageRollup.count: MessageRollup.count + amount}, synchronize_session=False):
+        return
+    try:
+        with db.session.begin_nested():
+            db.session.add(MessageRollup(period=period, bucket=bucket, metric=metric, count=amount))
+    except IntegrityError:
+        # Another process created the row first
+        rollup.update({MessageRollup.count: MessageRollup.count + amount}, synchronize_session=False)
+
+def count_messages(counts: Dict[str, int], at: Optional[datetime] = None) -> None:
+    """
+    Add to the hourly and daily message counters; the caller commits
+
+    Callers pass totals for a whole batch, so each batch costs one update
+    per metric and period rather than one per message.
+
+    Args:
+        counts (Dict[str, int]): Amount to add per MessageRollup metric
+        at (Optional[datetime]): When the messages were counted, now by default
+    """
+    at = at or datetime.utcnow()
+    hour = at.replace(minute=0, second=0, microsecond=0)
+    day = hour.replace(hour=0)
+    for metric, amount in counts.items():
+        if amount:
+            _increment(MessageRollup.PERIOD_HOUR, hour, metric, amount)
+            _increment(MessageRollup.PERIOD_DAY, day, metric, amount)
+
+def message_totals(day: Optional[date] = None) -> Dict[str, int]:
+    """
+    Message counts for one UTC day, read from its daily rollup rows
+
+    Returns:
+        Dict[str, int]: Count for every MessageRollup metric, 0 when absent
+    """
+    day = day or datetime.utcnow().date()
+    totals = dict.fromkeys((MessageRollup.METRIC_QUEUED, MessageRollup.METRIC_SENT,
+                            MessageRollup.METRIC_FAILED, MessageRollup.METRIC_DELIVERED), 0)
+    rows = db.session.query(MessageRollup.metric, MessageRollup.count).filter_by(
+        period=MessageRollup.PERIOD_DAY, bucket=datetime.combine(day, datetime.min.time())
+    )
+    totals.update(dict(rows.all()))
+    return totals
+
+def recent_activity(limit: int = 10) -> List[Dict[str, str]]:
+    """The newest activity feed entries, newest first"""
+    events = ActivityEvent.query.order_by(ActivityEvent.id.desc()).limit(limit).all()
+    return [event.to_dict() for event in events]
+
+_user_counts: Optional[Dict[str, int]] = None
+_user_counts_at = 0.0
+_user_counts_lock = threading.Lock()
+
+def user_counts(max_age: float = 60) -> Dict[str, int]:
+    """
+    Total users and users seen in the last 24 hours, counted at most once
+    per max_age seconds per process
+
+    Returns:
+        Dict[str, int]: total_users and active_sessions
+    """
+    global _user_counts, _user_counts_at
+    with _user_counts_lock:
+        if _user_counts is None or time.monotonic() - _user_counts_at >= max_age:
+            _user_counts = {
+                'total_users': User.query.count(),
+                'active_sessions': User.query.filter(
+                    User.last_login > datetime.utcnow() - timedelta(hours=24)
+                ).count()
+            }
+            _user_counts_at = time.monotonic()
+        return dict(_user_counts)
@@ -0,0 +1,243 @@
+import logging
+import pandas as pd
+from datetime import datetime, timedelta
+from typing import Collection, Dict, Iterator, List, Optional, Sequence, Tuple
+from app.models.user import db
+from app.models.contact_set import ContactSet, Contact
+from app.models.activity import ActivityEvent
+from .activity import record_activity
+
+logger = logging.getLogger(__name__)
+
+# Field names served by the contacts API, matching the keys of upload results,
+# mapped to the column that holds them
+CONTACT_FIELDS = {
+    'id': Contact.row_id,
+    'full_name': Contact.full_name,
+    'First Name': Contact.first_name,
+    'Last Name': Contact.last_name,
+    'Location': Contact.location,
+    'phone': Contact.best_phone,  # masked for display
+    'best_phone': Contact.best_phone,
+    'Newest Engagement Date': Contact.engagement_date,
+    'Personal Volunteering Site URL': Contact.volunteer_url
+}
+
+def mask_phone(phone: str) -> str:
+    """Display form of a phone number that only shows its last four digits"""
+    return '****-****-' + phone[-4:]
+
+def parse_fields(value: Optional[str]) -> List[str]:
+    """
+    Parse a comma-separated field projection
+
+    Args:
+        value (Optional[str]): Query string value, all fields when empty
+
+    Returns:
+        List[str]: Requested field names in order
+
+    Raises:
+        ValueError: If a field name is unknown
+    """
+    if not value:
+        return list(CONTACT_FIELDS)
+    fields = [field.strip() for field in value.split(',') if field.strip()]
+    unknown = [field for field in fields if field not in CONTACT_FIELDS]
+    if unknown:
+        raise ValueError(f"Unknown fields: {', '.join(unknown)}")
+    return fields
+
+def find_contact_set(user_id: int, digest: str, file_type: str) -> Optional[ContactSet]:
+    """The user's most recent contact set built from identical file contents"""
+    return ContactSet.query.filter_by(user_id=user_id, sha256=digest, file_type=file_type) \
+        .order_by(ContactSet.created_at.desc(), ContactSet.id.desc()).first()
+
+def start_contact_set(user_id: int, filename: str, digest: str, file_type: str) -> ContactSet:
+    """
+    Begin storing an upload as a contact set, in the session's transaction
+
+    Contacts are added with add_contacts as the upload is processed, and the
+    set is committed by finish_contact_set; rolling the session back instead
+    discards it with every contact added so far.
+
+    Args:
+        user_id (int): Owner of the upload
+        filename (str): Secured upload filename
+        digest (str): Upload key from hash_stream
+        file_type (str): File extension without the dot
+
+    Returns:
+        ContactSet: The uncommitted, empty contact set
+    """
+    contact_set = ContactSet(
+        user_id=user_id,
+        filename=filename,
+        sha256=digest,
+        file_type=file_type,
+        total=0
+    )
+    db.session.add(contact_set)
+    db.session.flush()
+    return contact_set
+
+def add_contacts(contact_set: ContactSet, results: List[Dict]) -> None:
+    """
+    Insert a batch of processed upload results into a contact set
+
+    Args:
+        contact_set (ContactSet): Set from start_contact_set
+        results (List[Dict]): Contact results from process_uploaded_file
+    """
+    if not results:
+        return
+    db.session.bulk_insert_mappings(Contact, [
+        {
+            'contact_set_id': contact_set.id,
+            'row_id': result['id'],
+            'full_name': result['full_name'],
+            'first_name': result['First Name'],
+            'last_name': result['Last Name'],
+            'location': result['Location'],
+            'best_phone': result['best_phone'],
+            'engagement_date': result['Newest Engagement Date'],
+            'volunteer_url': result['Personal Volunteering Site URL']
+        }
+        for result in results
+    ])
+    contact_set.total += len(results)
+
+def finish_contact_set(contact_set: ContactSet, warnings: List[str], merge_fields: List[Dict]) -> ContactSet:
+    """
+    Record an upload's warnings and merge fields and commit its contact set
+
+    Args:
+        contact_set (ContactSet): Set from start_contact_set
+        warnings (List[str]): Warnings from processing the upload
+        merge_fields (List[Dict]): Merge fields offered for the upload
+
+    Returns:
+        ContactSet: The stored contact set
+    """
+    contact_set.warnings = warnings
+    contact_set.merge_fields = merge_fields
+    record_activity(ActivityEvent.KIND_CONTACTS_UPLOADED,
+                    f"Contact list uploaded with {contact_set.total} contacts", contact_set.user_id)
+    db.session.commit()
+
+    logger.info(f"Stored contact set {contact_set.id} with {contact_set.total} contacts")
+    return contact_set
+
+def create_contact_set(user_id: int, filename: str, digest: str, file_type: str,
+                       processed: Dict) -> ContactSet:
+    """
+    Persist processed upload results as a contact set in one go
+
+    Args:
+        user_id (int): Owner of the upload
+        filename (str): Secured upload filename
+        digest (str): Upload key from hash_stream
+        file_type (str): File extension without the dot
+        processed (Dict): Successful process_uploaded_file payload
+
+    Returns:
+        ContactSet: The stored contact set
+    """
+    contact_set = start_contact_set(user_id, filename, digest, file_type)
+    add_contacts(contact_set, processed['results'])
+    return finish_contact_set(contact_set, processed.get('warnings', []), processed.get('merge_fields', []))
+
+def get_contacts_page(contact_set: ContactSet, cursor: Optional[int], limit: int,
+                      fields: Sequence[str]) -> Tuple[List[Dict], Optional[int]]:
+    """
+    Fetch one page of a contact set using keyset pagination
+
+    Only the columns behind the requested fields are selected, and rows are
+    located through the (contact_set_id, row_id) index, so a page costs the
+    same wherever it falls in the set.
+
+    Args:
+        contact_set (ContactSet): Set to read from
+        cursor (Optional[int]): next_cursor of the previous page, None for the first page
+        limit (int): Maximum contacts to return
+        fields (Sequence[str]): Field names to include in each contact
+
+    Returns:
+        tuple: (contacts, cursor for the next page or None at the end)
+    """
+    columns = {Contact.row_id.key: Contact.row_id}
+    for field in fields:
+        columns.setdefault(CONTACT_FIELDS[field].key, CONTACT_FIELDS[field])
+
+    query = db.session.query(*columns.values()).filter(Contact.contact_set_id == contact_set.id)
+    if cursor is not None:
+        query = query.filter(Contact.row_id > cursor)
+    rows = query.order_by(Contact.row_id).limit(limit + 1).all()
+
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+
+    contacts = []
+    for row in rows:
+        values = row._mapping
+        contact = {}
+        for field in fields:
+            value = values[CONTACT_FIELDS[field].key]
+            contact[field] = mask_phone(value) if field == 'phone' else value
+        contacts.append(contact)
+
+    next_cursor = rows[-1].row_id if has_more else None
+    return contacts, next_cursor
+
+def iter_contact_set_pages(contact_set: ContactSet, page_rows: int,
+                           exclude: Collection[int] = ()) -> Iterator[List[Dict]]:
+    """
+    Walk a whole contact set a page at a time, in row order
+
+    Args:
+        contact_set (ContactSet): Set to read from
+        page_rows (int): Contacts read per page
+        exclude (Collection[int]): Contact ids to leave out
+
+    Yields:
+        List[Dict]: Contacts with every field, shaped as get_contacts_page serves them
+    """
+    fields = list(CONTACT_FIELDS)
+    cursor = None
+    while True:
+        contacts, cursor = get_contacts_page(contact_set, cursor, page_rows, fields)
+        yield [contact for contact in contacts if contact['id'] not in exclude]
+        if cursor is None:
+            break
+
+def load_contact_frame(contact_set: ContactSet) -> pd.DataFrame:
+    """
+    Load a whole contact set as a DataFrame, one column per stored field
+
+    Columns carry the API field names (masked 'phone' excluded), in row order.
+    """
+    fields = [field for field in CONTACT_FIELDS if field != 'phone']
+    rows = db.session.query(*[CONTACT_FIELDS[field] for field in fields]) \
+        .filter(Contact.contact_set_id == contact_set.id) \
+        .order_by(Contact.row_id).all()
+    return pd.DataFrame.from_records(rows, columns=fields)
+
+def purge_expired_contact_sets(max_age: timedelta) -> int:
+    """
+    Delete contact sets older than max_age together with their contacts
+
+    Returns:
+        int: Number of contact sets deleted
+    """
+    cutoff = datetime.utcnow() - max_age
+    expired = [set_id for (set_id,) in
+               db.session.query(ContactSet.id).filter(ContactSet.created_at < cutoff).all()]
+    if not expired:
+        return 0
+
+    Contact.query.filter(Contact.contact_set_id.in_(expired)).delete(synchronize_session=False)
+    ContactSet.query.filter(ContactSet.id.in_(expired)).delete(synchronize_session=False)
+    db.session.commit()
+
+    logger.info(f"Purged {len(expired)} expired contact sets")
+    return len(expired)
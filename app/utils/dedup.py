@@ -0,0 +1,199 @@
+import logging
+from datetime import datetime, timedelta
+from typing import Iterable, List, Optional, Sequence, Set
+from sqlalchemy.dialects.mysql import insert as mysql_insert
+from sqlalchemy.dialects.postgresql import insert as postgresql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.exc import IntegrityError
+from app.models.user import db
+from app.models.recipient_history import RecipientHistory
+
+logger = logging.getLogger(__name__)
+
+# E.164 numbers have at most 15 digits, so every one fits a signed 64-bit key
+MAX_E164_DIGITS = 15
+
+# Keys per IN (...) clause, well below SQLite's bound parameter limit
+_QUERY_BATCH = 500
+
+# Tries at inserting history rows on dialects without an upsert
+_INSERT_ATTEMPTS = 3
+
+def phone_key(phone: Optional[str]) -> Optional[int]:
+    """
+    Integer key of a normalized phone number
+
+    The digits of an E.164 number, read as an integer, identify it exactly,
+    so the key doubles as a collision-free hash that is compact to store and
+    index.
+
+    Args:
+        phone (Optional[str]): Normalized number, with or without a leading '+'
+
+    Returns:
+        Optional[int]: The key, or None if the number has no digits or too many
+    """
+    if not phone:
+        return None
+    digits = str(phone).lstrip('+')
+    if not digits.isdigit() or len(digits) > MAX_E164_DIGITS:
+        return None
+    return int(digits)
+
+class PhoneDeduper:
+    """Remembers the phone numbers seen so far in a batch and flags repeats"""
+
+    def __init__(self):
+        self.seen: Set[int] = set()
+        self.duplicates = 0
+
+    def keep(self, phones: Iterable[Optional[str]]) -> List[bool]:
+        """
+        Flag the first occurrence of each number
+
+        Numbers that can't be keyed are always kept; validation deals with them.
+
+        Args:
+            phones (Iterable[Optional[str]]): Normalized numbers, in batch order
+
+        Returns:
+            List[bool]: False for each number already seen in this batch
+        """
+        seen = self.seen
+        flags = []
+        for phone in phones:
+            key = phone_key(phone)
+            if key is None:
+                flags.append(True)
+            elif key in seen:
+                flags.append(False)
+            else:
+                seen.add(key)
+                flags.append(True)
+        self.duplicates += flags.count(False)
+        return flags
+
+def recently_messaged(phones: Sequence[str], window: timedelta) -> Set[str]:
+    """
+    Numbers queued in a campaign within the last window
+
+    Looks the batch up in recipient_history by primary key, a few hundred
+    numbers per query, so the cost follows the batch size rather than the
+    size of the history.
+
+    Args:
+        phones (Sequence[str]): Normalized numbers
+        window (timedelta): How far back to look
+
+    Returns:
+        Set[str]: The numbers among phones that were messaged within the window
+    """
+    keys = {}
+    for phone in phones:
+        key = phone_key(phone)
+        if key is not None:
+            keys.setdefault(key, []).append(phone)
+    if not keys:
+        return set()
+
+    cutoff = datetime.utcnow() - window
+    unique = list(keys)
+    recent: Set[str] = set()
+    for start in range(0, len(unique), _QUERY_BATCH):
+        rows = db.session.query(RecipientHistory.phone_key) \
+            .filter(RecipientHistory.phone_key.in_(unique[start:start + _QUERY_BATCH])) \
+            .filter(RecipientHistory.last_sent_at >= cutoff).all()
+        for (key,) in rows:
+            recent.update(keys[key])
+    return recent
+
+def _upsert(keys: List[int], sent_at: datetime) -> bool:
+    """
+    Insert history rows, moving the timestamp of rows that already exist,
+    in one statement where the dialect has an upsert
+
+    Returns:
+        bool: False if the dialect has no upsert and nothing was written
+    """
+    rows = [{'phone_key': key, 'last_sent_at': sent_at} for key in keys]
+    dialect = db.session.get_bind().dialect.name
+    if dialect in ('sqlite', 'postgresql'):
+        insert = sqlite_insert if dialect == 'sqlite' else postgresql_insert
+        statement = insert(RecipientHistory).values(rows)
+        statement = statement.on_conflict_do_update(
+            index_elements=[RecipientHistory.phone_key],
+            set_={'last_sent_at': statement.excluded.last_sent_at}
+        )
+    elif dialect in ('mysql', 'mariadb'):
+        statement = mysql_insert(RecipientHistory).values(rows)
+        statement = statement.on_duplicate_key_update(last_sent_at=statement.inserted.last_sent_at)
+    else:
+        return False
+    db.session.execute(statement)
+    return True
+
+def _update_then_insert(keys: List[int], sent_at: datetime) -> None:
+    """
+    Record keys on dialects without an upsert (e.g. SQL Server)
+
+    Another campaign can insert one of the keys between the lookup and the
+    insert. The insert runs in a savepoint, so on a duplicate key only it is
+    rolled back, and the lookup is tried again.
+    """
+    for attempt in range(_INSERT_ATTEMPTS):
+        existing = {key for (key,) in db.session.query(RecipientHistory.phone_key)
+                    .filter(RecipientHistory.phone_key.in_(keys)).all()}
+        if existing:
+            RecipientHistory.query.filter(RecipientHistory.phone_key.in_(existing)) \
+                .update({RecipientHistory.last_sent_at: sent_at}, synchronize_session=False)
+        try:
+            with db.session.begin_nested():
+                db.session.bulk_insert_mappings(RecipientHistory, [
+                    {'phone_key': key, 'last_sent_at': sent_at} for key in keys if key not in existing
+                ])
+            return
+        except IntegrityError:
+            if attempt == _INSERT_ATTEMPTS - 1:
+                raise
+            logger.info("Recipient history insert raced another campaign, retrying")
+
+def record_recipients(phones: Iterable[str], sent_at: Optional[datetime] = None) -> int:
+    """
+    Note that phones were queued in a campaign, for later recently_messaged checks
+
+    Existing history rows get their timestamp moved forward; new numbers are
+    inserted. This is an upsert, so campaigns queued at the same moment
+    with numbers in common don't collide on the primary key. The caller
+    commits.
+
+    Args:
+        phones (Iterable[str]): Normalized numbers
+        sent_at (Optional[datetime]): Time to record, now by default
+
+    Returns:
+        int: Number of distinct numbers recorded
+    """
+    sent_at = sent_at or datetime.utcnow()
+    unique = list({key for key in map(phone_key, phones) if key is not None})
+    # Two bound parameters per row in a multi-row insert
+    batch_size = _QUERY_BATCH // 2
+    for start in range(0, len(unique), batch_size):
+        batch = unique[start:start + batch_size]
+        if not _upsert(batch, sent_at):
+            _update_then_insert(batch, sent_at)
+    return len(unique)
+
+def purge_recipient_history(max_age: timedelta) -> int:
+    """
+    Forget numbers not messaged within max_age
+
+    Returns:
+        int: Number of history rows deleted
+    """
+    cutoff = datetime.utcnow() - max_age
+    deleted = RecipientHistory.query.filter(RecipientHistory.last_sent_at < cutoff) \
+        .delete(synchronize_session=False)
+    db.session.commit()
+    if deleted:
+        logger.info(f"Purged {deleted} recipient history entries")
+    return deleted
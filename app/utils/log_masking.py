@@ -0,0 +1,43 @@
+import logging
+import re
+
+# +-prefixed numbers, which may be written with spaces, dashes or brackets
+# (e.g. +44 (0)7946 220153), and bare runs of 7+ digits (e.g. 447946220153)
+_PHONE_LIKE = re.compile(r'\+\d(?:[ \-()]*\d){6,}|\d{7,}')
+_NON_DIGITS = re.compile(r'\D')
+
+# Attributes every LogRecord has; anything else came in through extra=
+_STANDARD_ATTRS = frozenset(vars(logging.LogRecord('', 0, '', 0, '', None, None))) | {'message', 'asctime'}
+
+def _mask_match(match: re.Match) -> str:
+    digits = _NON_DIGITS.sub('', match.group())
+    return digits[:2] + '****' + digits[-4:]
+
+def mask_text(text: str) -> str:
+    """
+    Mask phone numbers in text, keeping the first two and last four digits
+
+    Args:
+        text (str): Text that may contain phone numbers
+
+    Returns:
+        str: The text with each number shortened to e.g. 44****0153
+    """
+    return _PHONE_LIKE.sub(_mask_match, text)
+
+class MaskingFormatter(logging.Formatter):
+    """
+    Formats a record and masks phone numbers in the result
+
+    Masking runs on the finished message, so numbers passed as %-style args
+    or in a traceback are caught too, and on string fields given through
+    extra=. Set it on the AsyncLogHandler so each emitted record is masked
+    once, before it is handed to the file and console handlers.
+    """
+
+    def format(self, record: logging.LogRecord) -> str:
+        for key in record.__dict__.keys() - _STANDARD_ATTRS:
+            value = record.__dict__[key]
+            if isinstance(value, str):
+                record.__dict__[key] = mask_text(value)
+        return mask_text(super().format(record))
@@ -0,0 +1,115 @@
+import atexit
+import logging
+import os
+import queue
+import threading
+from logging.handlers import QueueHandler, RotatingFileHandler
+from typing import List, Optional
+
+class BatchFlushMixin:
+    """
+    Leaves flushing to the log writer, which flushes once per batch
+
+    logging.StreamHandler flushes after every record, which turns a burst of
+    records into one write call each.
+    """
+
+    def flush(self):
+        pass
+
+    def flush_batch(self):
+        super().flush()
+
+class BatchedRotatingFileHandler(BatchFlushMixin, RotatingFileHandler):
+    """RotatingFileHandler flushed per batch of records"""
+
+class BatchedStreamHandler(BatchFlushMixin, logging.StreamHandler):
+    """StreamHandler flushed per batch of records"""
+
+class AsyncLogHandler(QueueHandler):
+    """
+    Hands records to a background writer thread that owns the real handlers
+
+    Logging calls only format the message and put it on a queue. The writer
+    drains up to batch_size records at a time, passes each to every handler
+    whose level it meets, then flushes each handler once. A forked process
+    (e.g. an upload worker) starts its own writer on its first record.
+    """
+
+    def __init__(self, handlers: List[logging.Handler], batch_size: int = 500):
+        super().__init__(queue.SimpleQueue())
+        self.writers = handlers
+        self.batch_size = max(1, batch_size)
+        self._pid: Optional[int] = None
+        self._thread: Optional[threading.Thread] = None
+        self._start_lock = threading.Lock()
+        os.register_at_fork(after_in_child=self._forget_writer)
+        atexit.register(self.stop)
+
+    def _forget_writer(self) -> None:
+        self._pid = None
+        self._thread = None
+        self._start_lock = threading.Lock()
+        self.queue = queue.SimpleQueue()
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        if self._pid != os.getpid():
+            self._start()
+        self.queue.put_nowait(record)
+
+    def _start(self) -> None:
+        with self._start_lock:
+            if self._pid == os.getpid():
+                return
+            self._thread = threading.Thread(target=self._write, name='log-writer', daemon=True)
+            self._thread.start()
+            self._pid = os.getpid()
+
+    def _write(self) -> None:
+        while True:
+            batch = [self.queue.get()]
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self.queue.get_nowait())
+                except queue.Empty:
+                    break
+            for record in batch:
+                if record is None:
+                    continue
+                for handler in self.writers:
+                    if record.levelno >= handler.level:
+                        try:
+                            handler.handle(record)
+                        except Exception:
+                            handler.handleError(record)
+            for handler in self.writers:
+                getattr(handler, 'flush_batch', handler.flush)()
+            if None in batch:
+                return
+
+    def stop(self, timeout: float = 5) -> None:
+        """Write everything queued so far, then stop the writer"""
+        thread = self._thread
+        if thread is not None and self._pid == os.getpid() and thread.is_alive():
+            self.queue.put_nowait(None)
+            thread.join(timeout)
+        self._pid = None
+
+class LogSampler:
+    """
+    Rate limits a log line that can fire once per row
+
+    hit() returns the running count on the first occurrence and every
+    every-th one after it, and None otherwise.
+    """
+
+    def __init__(self, every: int = 100):
+        self.every = max(1, every)
+        self._counts = {}
+        self._lock = threading.Lock()
+
+    def hit(self, key: str) -> Optional[int]:
+        with self._lock:
+            count = self._counts.get(key, 0) + 1
+            self._counts[key] = count
+        return count if count == 1 or count % self.every == 0 else None
@@ -0,0 +1,216 @@
+from functools import lru_cache
+from operator import itemgetter
+from string import Formatter
+from typing import Collection, List, Mapping, Optional, Sequence, Tuple
+
+# Merge fields offered to uploaders, mapped to the contact keys that fill them
+MERGE_FIELDS = {
+    'first_name': 'First Name',
+    'last_name': 'Last Name',
+    'full_name': 'full_name',
+    'location': 'Location',
+    'engagement_date': 'Newest Engagement Date',
+    'volunteer_url': 'Personal Volunteering Site URL'
+}
+
+class TemplateError(ValueError):
+    """A message template that can't be compiled or rendered"""
+
+class MissingFieldError(TemplateError, KeyError):
+    """Values supplied for a template lack some of its merge fields"""
+
+    def __init__(self, fields: Sequence[str]):
+        self.fields = list(fields)
+        super().__init__(f"Missing template variable: {', '.join(repr(field) for field in self.fields)}")
+
+    def __str__(self):
+        return self.args[0]
+
+class MessageTemplate:
+    """
+    A message template parsed once into literal text and merge field slots
+
+    Templates use str.format syntax with named fields ({first_name}), plus
+    optional conversions and format specs. Compiling rewrites the template
+    into a positional format string, so rendering is a single str.format call
+    on the looked-up values instead of a keyword expansion of the whole
+    contact dict.
+    """
+
+    __slots__ = ('text', 'fields', 'literals', 'slots', '_format')
+
+    def __init__(self, text: str):
+        """
+        Parse and validate a template
+
+        Args:
+            text (str): Template with {field} placeholders
+
+        Raises:
+            TemplateError: If the template is malformed or uses positional or nested fields
+        """
+        if not isinstance(text, str):
+            raise TemplateError("Message template must be a string")
+
+        fields: List[str] = []
+        parts: List[str] = []
+        literals: List[str] = ['']
+        slots: List[Tuple[int, str]] = []
+        try:
+            parsed = list(Formatter().parse(text))
+        except ValueError as e:
+            raise TemplateError(f"Invalid message template: {str(e)}")
+
+        for literal, field, format_spec, conversion in parsed:
+            parts.append(literal.replace('{', '{{').replace('}', '}}'))
+            literals[-1] += literal
+            if field is None:
+                continue
+            if not field or field.isdigit():
+                raise TemplateError("Message template placeholders must be named, e.g. {first_name}")
+            if not field.isidentifier():
+                raise TemplateError(f"Unsupported merge field: {{{field}}}")
+            if format_spec and '{' in format_spec:
+                raise TemplateError(f"Nested placeholders are not supported: {{{field}}}")
+
+            suffix = (f"!{conversion}" if conversion else '') + (f":{format_spec}" if format_spec else '')
+            try:
+                # Format an empty value once, so a bad conversion or spec fails
+                # here instead of on every contact; merge values are text
+                f"{{0{suffix}}}".format('')
+            except ValueError as e:
+                raise TemplateError(f"Invalid format for {{{field}}}: {str(e)}")
+
+            if field not in fields:
+                fields.append(field)
+            index = fields.index(field)
+            parts.append(f"{{{index}{suffix}}}")
+            slots.append((index, f"{{0{suffix}}}"))
+            literals.append('')
+
+        self.text = text
+        self.fields: Tuple[str, ...] = tuple(fields)
+        # The compiled segment list: literals[i] precedes slot i, the last
+        # literal follows the last slot. Each slot is (field index, format
+        # string turning that field's value into text).
+        self.literals: Tuple[str, ...] = tuple(literals)
+        self.slots: Tuple[Tuple[int, str], ...] = tuple(slots)
+        self._format = ''.join(parts)
+
+    def resolve(self, available: Collection[str]) -> Tuple[str, ...]:
+        """
+        Map each merge field to the key that supplies it
+
+        A field is read from a key of the same name, or failing that from the
+        contact column it stands for in MERGE_FIELDS.
+
+        Args:
+            available (Collection[str]): Keys (or column names) that will be supplied
+
+        Returns:
+            Tuple[str, ...]: Lookup key for each field, in field order
+
+        Raises:
+            MissingFieldError: Naming every field that can't be supplied
+        """
+        keys = []
+        missing = []
+        for field in self.fields:
+            if field in available:
+                keys.append(field)
+            elif MERGE_FIELDS.get(field) in available:
+                keys.append(MERGE_FIELDS[field])
+            else:
+                missing.append(field)
+        if missing:
+            raise MissingFieldError(missing)
+        return tuple(keys)
+
+    def render(self, values: Mapping[str, object], default: Optional[str] = None) -> str:
+        """
+        Render the template for one contact
+
+        Args:
+            values (Mapping): The contact's values
+            default (Optional[str]): Value for a field the contact lacks; None raises instead
+
+        Raises:
+            MissingFieldError: If a field is missing and no default is given
+        """
+        args = []
+        missing = []
+        for field in self.fields:
+            if field in values:
+                args.append(values[field])
+            elif MERGE_FIELDS.get(field) in values:
+                args.append(values[MERGE_FIELDS[field]])
+            elif default is not None:
+                args.append(default)
+            else:
+                missing.append(field)
+        if missing:
+            raise MissingFieldError(missing)
+        return self._format.format(*args)
+
+    def render_many(self, rows: Sequence[Mapping[str, object]], default: Optional[str] = None) -> List[str]:
+        """
+        Render the template for many contacts
+
+        Merge fields are resolved once against the first row; rows with
+        different keys fall back to being resolved individually.
+
+        Args:
+            rows (Sequence[Mapping]): Contacts to render
+            default (Optional[str]): Value for a field a contact lacks; None raises instead
+
+        Returns:
+            List[str]: One message per row
+
+        Raises:
+            MissingFieldError: If a field is missing and no default is given
+        """
+        if not rows:
+            return []
+        try:
+            keys = self.resolve(rows[0])
+            render = self._format.format
+            if len(keys) == 1:
+                key = keys[0]
+                return [render(row[key]) for row in rows]
+            get = itemgetter(*keys)
+            return [render(*get(row)) for row in rows]
+        except KeyError:
+            return [self.render(row, default) for row in rows]
+
+    def render_columns(self, columns: Mapping[str, Sequence[object]]) -> List[str]:
+        """
+        Render the template for column-oriented contacts
+
+        Args:
+            columns (Mapping[str, Sequence]): Equal-length value sequences keyed by column name
+
+        Returns:
+            List[str]: One message per row
+        """
+        keys = self.resolve(columns)
+        render = self._format.format
+        if not keys:
+            length = len(next(iter(columns.values()))) if columns else 0
+            return [render()] * length
+        return list(map(render, *[columns[key] for key in keys]))
+
+@lru_cache(maxsize=256)
+def _compile_cached(text: str) -> MessageTemplate:
+    return MessageTemplate(text)
+
+def compile_template(text: str) -> MessageTemplate:
+    """
+    Compile a template, reusing the parse of a recently seen one
+
+    Raises:
+        TemplateError: If text is not a string or the template is malformed
+    """
+    # Checked before the cache, which can't hash e.g. a list from a JSON body
+    if not isinstance(text, str):
+        raise TemplateError("Message template must be a string")
+    return _compile_cached(text)
@@ -0,0 +1,385 @@
+import re
+import numpy as np
+import pandas as pd
+from typing import Dict, FrozenSet, Iterable, List, NamedTuple, Optional, Tuple
+
+# Columns checked for a usable number, best first
+PHONE_COLUMN_PRIORITY = ('Mobile', 'Phone', 'Work Phone')
+
+# Cells longer than this, or containing non-ASCII characters, take the
+# scalar path so the character matrix stays small and Unicode digits are
+# handled exactly as the str methods handle them
+_MAX_VECTOR_WIDTH = 32
+
+# Characters str.strip() removes that can appear in an ASCII cell
+_ASCII_WHITESPACE = np.array([9, 10, 11, 12, 13, 28, 29, 30, 31, 32], dtype=np.uint32)
+
+_ZERO, _ONE, _TWO, _FOUR, _SEVEN, _EIGHT, _NINE, _PLUS = map(ord, '0124789+')
+
+_NON_DIGITS = re.compile(r'[^\d]')
+
+class CountryRule(NamedTuple):
+    """Numbering plan facts used to validate numbers of one country"""
+    calling_code: str
+    trunk_prefix: str  # dialled before national numbers, wrongly kept in e.g. +44 (0)7946...
+    lengths: Tuple[int, ...]  # digits of the national significant number
+
+# Numbering plans with known national number lengths. Numbers under a calling
+# code not listed here only get the E.164 range check (GENERIC_LENGTHS).
+COUNTRY_RULES: Dict[str, CountryRule] = {
+    'GB': CountryRule('44', '0', (9, 10)),
+    'IE': CountryRule('353', '0', (7, 8, 9)),
+    'US': CountryRule('1', '', (10,)),
+    'CA': CountryRule('1', '', (10,)),
+    'FR': CountryRule('33', '0', (9,)),
+    'DE': CountryRule('49', '0', tuple(range(6, 14))),
+    'ES': CountryRule('34', '', (9,)),
+    'IT': CountryRule('39', '', tuple(range(6, 12))),
+    'NL': CountryRule('31', '0', (9,)),
+    'BE': CountryRule('32', '0', (8, 9)),
+    'PT': CountryRule('351', '', (9,)),
+    'PL': CountryRule('48', '', (9,)),
+    'IN': CountryRule('91', '0', (10,)),
+    'PK': CountryRule('92', '0', (9, 10)),
+    'AU': CountryRule('61', '0', (9,)),
+    'NZ': CountryRule('64', '0', (8, 9, 10)),
+    'ZA': CountryRule('27', '0', (9,)),
+    'NG': CountryRule('234', '0', (8, 10)),
+    'KE': CountryRule('254', '0', (9,)),
+    'AE': CountryRule('971', '0', (8, 9)),
+    'SG': CountryRule('65', '', (8,)),
+    'PH': CountryRule('63', '0', (10,)),
+    'BR': CountryRule('55', '0', (10, 11)),
+    'MX': CountryRule('52', '', (10,)),
+}
+
+# E.164 numbers are at most 15 digits; the shortest in use have 7
+GENERIC_LENGTHS = range(7, 16)
+
+def _e164_lengths() -> Dict[str, FrozenSet[int]]:
+    lengths: Dict[str, set] = {}
+    for rule in COUNTRY_RULES.values():
+        lengths.setdefault(rule.calling_code, set()).update(
+            len(rule.calling_code) + length for length in rule.lengths
+        )
+    return {code: frozenset(allowed) for code, allowed in lengths.items()}
+
+# Valid E.164 digit counts by calling code
+_E164_LENGTHS = _e164_lengths()
+
+# Trunk prefix by calling code, for codes whose countries use one
+_TRUNK_PREFIXES = {rule.calling_code: rule.trunk_prefix
+                   for rule in COUNTRY_RULES.values() if rule.trunk_prefix}
+
+def _length_tables() -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Allowed E.164 lengths as bitmasks, indexed by the 1, 2 and 3 digit
+    number prefixes that are calling codes. Calling codes are prefix free,
+    so at most one of the three lookups hits for any number.
+    """
+    tables = tuple(np.zeros(10 ** size, dtype=np.uint64) for size in (1, 2, 3))
+    for code, allowed in _E164_LENGTHS.items():
+        tables[len(code) - 1][int(code)] = sum(1 << length for length in allowed)
+    return tables
+
+_LENGTH_TABLES = _length_tables()
+
+def is_valid_e164(digits: str) -> bool:
+    """
+    Whether E.164 digits (no '+') have a length their country allows
+
+    Args:
+        digits (str): Number in international form, digits only
+
+    Returns:
+        bool: True if the length fits the country's numbering plan, or the
+            generic E.164 range for calling codes without a rule
+    """
+    for size in (1, 2, 3):
+        allowed = _E164_LENGTHS.get(digits[:size])
+        if allowed is not None:
+            return len(digits) in allowed
+    return len(digits) in GENERIC_LENGTHS
+
+def stored_phone(value: object) -> Optional[str]:
+    """
+    A number normalized earlier, such as a contact set's best_phone
+
+    Normalized numbers are E.164 digits without the '+'. They are checked
+    rather than run through process_phone_number again, which would read
+    e.g. 12025550123 as a UK national number and reject it.
+
+    Args:
+        value (object): Number in the form process_phone_number returns
+
+    Returns:
+        Optional[str]: value unchanged if it is valid E.164 digits, else None
+    """
+    if isinstance(value, str) and value.isascii() and value.isdigit() and is_valid_e164(value):
+        return value
+    return None
+
+def drop_trunk_prefix(digits: str) -> str:
+    """
+    Remove a national trunk prefix left after the calling code
+
+    Numbers written like +44 (0)7946 220153 keep the trunk 0 once the
+    formatting is stripped. It is dropped when the number is too long with
+    it and the right length without it.
+
+    Args:
+        digits (str): Number in international form, digits only
+
+    Returns:
+        str: The number without the stray trunk prefix, or digits unchanged
+    """
+    for size in (1, 2, 3):
+        code = digits[:size]
+        allowed = _E164_LENGTHS.get(code)
+        if allowed is None:
+            continue
+        trunk = _TRUNK_PREFIXES.get(code)
+        if trunk and digits.startswith(trunk, size) and len(digits) not in allowed \
+                and len(digits) - len(trunk) in allowed:
+            return code + digits[size + len(trunk):]
+        break
+    return digits
+
+def _valid_e164_lengths(digits: np.ndarray, length: np.ndarray) -> np.ndarray:
+    """Vectorized is_valid_e164 over a zero-padded digit code point matrix"""
+    values = np.clip(digits[:, :3].astype(np.int64) - _ZERO, 0, 9)
+    one, two, three = _LENGTH_TABLES
+    masks = (one[values[:, 0]]
+             | two[values[:, 0] * 10 + values[:, 1]]
+             | three[values[:, 0] * 100 + values[:, 1] * 10 + values[:, 2]])
+    in_range = (length >= GENERIC_LENGTHS.start) & (length < GENERIC_LENGTHS.stop)
+    shift = np.clip(length, 0, 63).astype(np.uint64)
+    listed = ((masks >> shift) & np.uint64(1)).astype(bool)
+    return in_range & np.where(masks > 0, listed, True)
+
+def process_phone_number(phone):
+    if not phone or pd.isna(phone):
+        return None
+
+    # Convert to string and clean
+    phone_str = str(phone).strip()
+
+    # Remove common formatting characters but preserve + at start
+    # Keep + at beginning for international format detection
+    if phone_str.startswith('+'):
+        # International format: +44 7946 220153 → +447946220153
+        phone = '+' + _NON_DIGITS.sub('', phone_str[1:])
+    else:
+        # Remove all non-numeric characters
+        phone = _NON_DIGITS.sub('', phone_str)
+
+    # Handle different number formats
+    if phone.startswith('+'):
+        # Already international format, remove + for WhatsApp
+        phone = phone[1:]
+        # Basic validation for international numbers
+        if not (7 <= len(phone) <= 15):
+            return None
+    elif phone.startswith('0'):
+        # UK national format: 07946220153 → 447946220153
+        phone = '44' + phone[1:]
+    elif phone.startswith('44'):
+        # Already UK international format
+        pass
+    elif len(phone) == 10 and phone.startswith('7'):
+        # UK mobile without leading 0: 7946220153 → 447946220153
+        phone = '44' + phone
+    else:
+        # Unknown format - could be international without +
+        # Only convert to UK if it looks like a UK number (10-11 digits starting with certain patterns)
+        if len(phone) in [10, 11] and phone[0] in ['7', '8', '1', '2']:
+            # Likely UK number, add 44
+            if phone.startswith('0'):
+                phone = '44' + phone[1:]
+            else:
+                phone = '44' + phone
+        else:
+            # Assume it's already in correct international format
+            pass
+
+    # Ensure it's all digits at this point
+    if not phone.isdigit():
+        return None
+
+    # Final validation against the country's numbering plan
+    phone = drop_trunk_prefix(phone)
+    if not is_valid_e164(phone):
+        return None
+
+    return phone
+
+def _char_codes(text: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Lay short ASCII strings out as a matrix of code points
+
+    Args:
+        text (np.ndarray): Object array of str
+
+    Returns:
+        tuple: (mask of rows in the matrix, uint32 matrix with one row per masked string)
+    """
+    lengths = np.fromiter(map(len, text), dtype=np.int64, count=len(text))
+    short = lengths <= _MAX_VECTOR_WIDTH
+    width = max(2, int(lengths[short].max()) if short.any() else 0)
+
+    codes = np.array(text[short], dtype=f'U{width}').view(np.uint32).reshape(-1, width)
+    ascii_rows = (codes < 128).all(axis=1)
+
+    fast = short.copy()
+    fast[short] = ascii_rows
+    return fast, np.ascontiguousarray(codes[ascii_rows])
+
+def _compact_digits(codes: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Shift the digits of each row to the front, zero-padding the rest
+
+    Returns:
+        tuple: (digit matrix, number of digits per row)
+    """
+    is_digit = (codes >= _ZERO) & (codes <= _NINE)
+    counts = is_digit.sum(axis=1)
+
+    # Boolean indexing reads row by row, left to right, so the digits come out
+    # in order and fill the first `count` columns of each row
+    digits = np.zeros_like(codes)
+    digits[np.arange(codes.shape[1]) < counts[:, None]] = codes[is_digit]
+    return digits, counts
+
+def _to_strings(codes: np.ndarray) -> np.ndarray:
+    """Turn a zero-padded code point matrix back into an object array of str"""
+    codes = np.ascontiguousarray(codes, dtype=np.uint32)
+    return codes.view(f'U{codes.shape[1]}').ravel().astype(object)
+
+def strip_non_digits(column: pd.Series) -> pd.Series:
+    """
+    Reduce every non-null cell of a column to its digits
+
+    Vectorized form of the per-cell cleanup in clean_dataframe. Cells that
+    are null, or have no digits at all, become pd.NA.
+
+    Args:
+        column (pd.Series): Raw phone column
+
+    Returns:
+        pd.Series: Object column of digit strings or pd.NA
+    """
+    result = np.full(len(column), pd.NA, dtype=object)
+    present = column.notna().to_numpy()
+    if present.any():
+        text = column[present].astype(str).to_numpy(dtype=object)
+        fast, codes = _char_codes(text)
+        digits, lengths = _compact_digits(codes)
+
+        cleaned = np.empty(len(text), dtype=object)
+        cleaned[fast] = _to_strings(digits)
+        cleaned[~fast] = [''.join(filter(str.isdigit, value)) for value in text[~fast]]
+        cleaned[cleaned == ''] = pd.NA
+        result[present] = cleaned
+
+    return pd.Series(result, index=column.index, dtype=object)
+
+def normalize_phone_series(column: pd.Series) -> pd.Series:
+    """
+    Normalize a whole column of phone numbers to the wa.me digit form
+
+    Produces exactly what process_phone_number returns for each cell
+    (E.164 digits without the '+', or None when the number is unusable),
+    including the COUNTRY_RULES length check.
+    Short ASCII cells are handled as one code point matrix with boolean
+    masks; anything else falls back to process_phone_number.
+
+    Args:
+        column (pd.Series): Phone values in any format
+
+    Returns:
+        pd.Series: Object column of digit strings or None, same index as column
+    """
+    result = np.full(len(column), None, dtype=object)
+    present = column.notna().to_numpy()
+    if not present.any():
+        return pd.Series(result, index=column.index, dtype=object)
+
+    raw = column[present].to_numpy(dtype=object)
+    text = column[present].astype(str).to_numpy(dtype=object)
+    fast, codes = _char_codes(text)
+    digits, length = _compact_digits(codes)
+
+    # A leading '+' counts after surrounding whitespace is stripped
+    lead = np.take_along_axis(
+        codes, np.argmax(~np.isin(codes, _ASCII_WHITESPACE), axis=1)[:, None], axis=1
+    ).ravel()
+    national = lead != _PLUS
+    first = digits[:, 0]
+
+    # Same rule order as process_phone_number
+    trunk = national & (first == _ZERO)
+    rest = national & ~trunk & ~((first == _FOUR) & (digits[:, 1] == _FOUR))
+    uk_mobile = rest & (length == 10) & (first == _SEVEN)
+    likely_uk = (rest & ~uk_mobile & np.isin(length, [10, 11])
+                 & np.isin(first, [_SEVEN, _EIGHT, _ONE, _TWO]))
+    add_prefix = uk_mobile | likely_uk
+    keep = ~(trunk | add_prefix)
+
+    width = digits.shape[1]
+    out = np.zeros((len(digits), width + 2), dtype=np.uint32)
+    out[keep, :width] = digits[keep]
+    out[trunk, :2] = _FOUR
+    out[trunk, 2:width + 1] = digits[trunk, 1:]
+    out[add_prefix, :2] = _FOUR
+    out[add_prefix, 2:] = digits[add_prefix]
+
+    new_length = length - trunk + 2 * (trunk | add_prefix)
+    normalized = _to_strings(out)
+    # '+' numbers outside 7-15 digits are rejected as they are, before any
+    # trunk prefix is dropped
+    out_of_range = ~national & ((length < GENERIC_LENGTHS.start) | (length >= GENERIC_LENGTHS.stop))
+    normalized[out_of_range] = None
+    invalid = ~out_of_range & ~_valid_e164_lengths(out, new_length)
+    # The few numbers that fail are retried without a stray trunk prefix
+    retried = [drop_trunk_prefix(value) for value in normalized[invalid]]
+    normalized[invalid] = [value if is_valid_e164(value) else None for value in retried]
+
+    values = np.empty(len(text), dtype=object)
+    values[fast] = normalized
+    values[~fast] = [process_phone_number(value) for value in raw[~fast]]
+    result[present] = values
+
+    return pd.Series(result, index=column.index, dtype=object)
+
+def normalize_phones(phones: Iterable[object]) -> List[Optional[str]]:
+    """
+    Normalize a batch of phone numbers, e.g. a recipient list
+
+    Args:
+        phones (Iterable): Phone numbers in any format
+
+    Returns:
+        List[Optional[str]]: E.164 digits without the '+' for each number, None where invalid
+    """
+    return normalize_phone_series(pd.Series(list(phones), dtype=object)).tolist()
+
+def select_best_phone(df: pd.DataFrame, columns: Iterable[str] = PHONE_COLUMN_PRIORITY) -> pd.Series:
+    """
+    Pick the first column that yields a valid number for every row in one pass
+
+    Args:
+        df (pd.DataFrame): Contact sheet
+        columns (Iterable[str]): Phone columns in order of preference
+
+    Returns:
+        pd.Series: Normalized best phone per row, None where no column is usable
+    """
+    best = pd.Series(None, index=df.index, dtype=object)
+    for col in columns:
+        if col not in df.columns:
+            continue
+        missing = best.isna().to_numpy()
+        if not missing.any():
+            break
+        best[missing] = normalize_phone_series(df.loc[missing, col]).to_numpy()
+    return best
@@ -0,0 +1,138 @@
+import numpy as np
+from typing import Dict, Sequence, Tuple
+
+# GSM 03.38 default alphabet, one septet each
+GSM7_BASIC = (
+    "@£$¥èéùìòÇ\nØø\rÅåΔ_ΦΓΛΩΠΨΣΘΞÆæßÉ !\"#¤%&'()*+,-./0123456789:;<=>?"
+    "¡ABCDEFGHIJKLMNOPQRSTUVWXYZÄÖÑÜ§¿abcdefghijklmnopqrstuvwxyzäöñüà"
+)
+
+# GSM 03.38 extension table, an escape septet plus one each
+GSM7_EXTENDED = "\f^{}\\[~]|€"
+
+# Characters per message part (single, concatenated) for each encoding
+GSM7_LIMITS = (160, 153)
+UCS2_LIMITS = (70, 67)
+
+_BASIC, _EXTENDED, _OTHER = 0, 1, 2
+
+def _char_classes() -> np.ndarray:
+    classes = np.full(0x10000, _OTHER, dtype=np.uint8)
+    classes[[ord(c) for c in GSM7_BASIC]] = _BASIC
+    classes[[ord(c) for c in GSM7_EXTENDED]] = _EXTENDED
+    return classes
+
+# Character class of every BMP code point
+_CLASSES = _char_classes()
+
+def _parts(units: np.ndarray, limits: Tuple[int, int]) -> np.ndarray:
+    single, multi = limits
+    return np.where(units <= single, 1, -(-units // multi))
+
+def character_counts(texts: Sequence[str]) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Count the characters of many texts by GSM-7 class
+
+    All texts are laid out as one UTF-32 code point array, classified
+    through a lookup table and summed per text, so the cost is a few numpy
+    passes over the text rather than Python work per character.
+
+    Args:
+        texts (Sequence[str]): Texts to count
+
+    Returns:
+        tuple: Per-text int64 arrays (characters, GSM-7 extension characters,
+            characters outside GSM-7, characters outside the BMP)
+    """
+    count = len(texts)
+    lengths = np.fromiter(map(len, texts), dtype=np.int64, count=count)
+    if not lengths.any():
+        zeros = np.zeros(count, dtype=np.int64)
+        return lengths, zeros, zeros.copy(), zeros.copy()
+
+    codes = np.frombuffer(''.join(texts).encode('utf-32-le'), dtype=np.uint32)
+    classes = _CLASSES[np.minimum(codes, 0xFFFF)].astype(np.int64)
+    astral = codes > 0xFFFF
+    if astral.any():
+        classes[astral] = _OTHER
+
+    # Pack the three per-character counts into one integer so a single
+    # reduceat sums them all; no text is long enough to overflow a field
+    packed = (classes == _EXTENDED) | ((classes == _OTHER).astype(np.int64) << 21) | \
+        (astral.astype(np.int64) << 42)
+    nonempty = lengths > 0
+    starts = (np.cumsum(lengths) - lengths)[nonempty]
+    totals = np.zeros(count, dtype=np.int64)
+    totals[nonempty] = np.add.reduceat(packed, starts)
+
+    mask = (1 << 21) - 1
+    return lengths, totals & mask, (totals >> 21) & mask, totals >> 42
+
+def segments_from_counts(lengths: np.ndarray, extended: np.ndarray, other: np.ndarray,
+                         astral: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Encoding, encoded length and segment count from per-message character counts
+
+    Returns:
+        tuple: (is_ucs2 bool array, encoded length, segment count)
+            Lengths are septets for GSM-7 and UTF-16 code units for UCS-2;
+            empty messages have 0 segments.
+    """
+    is_ucs2 = other > 0
+    units = np.where(is_ucs2, lengths + astral, lengths + extended)
+    segments = np.where(is_ucs2, _parts(units, UCS2_LIMITS), _parts(units, GSM7_LIMITS))
+    segments[lengths == 0] = 0
+    return is_ucs2, units, segments
+
+def count_segments(messages: Sequence[str]) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Work out the encoding and billable segment count of many messages at once
+
+    Args:
+        messages (Sequence[str]): Message bodies
+
+    Returns:
+        tuple: (is_ucs2 bool array, encoded length, segment count), as
+            returned by segments_from_counts
+    """
+    return segments_from_counts(*character_counts(messages))
+
+def message_segments(message: str) -> Tuple[str, int, int]:
+    """
+    Encoding, encoded length and segment count of a single message
+
+    Returns:
+        tuple: ('GSM-7' or 'UCS-2', length, segments)
+    """
+    is_ucs2, units, segments = count_segments([message])
+    return ('UCS-2' if is_ucs2[0] else 'GSM-7'), int(units[0]), int(segments[0])
+
+def summarize_segments(is_ucs2: np.ndarray, segments: np.ndarray, price_per_segment: float = 0.0,
+                       max_segments: int = 0) -> Dict[str, object]:
+    """
+    Batch totals for per-message segment counts
+
+    Args:
+        is_ucs2 (np.ndarray): Whether each message needs UCS-2
+        segments (np.ndarray): Segment count of each message
+        price_per_segment (float): Provider charge per segment
+        max_segments (int): Segment limit per message, 0 for none
+
+    Returns:
+        Dict: Message and segment totals by encoding, the largest message,
+            how many messages exceed max_segments and the estimated cost
+    """
+    is_ucs2 = np.asarray(is_ucs2, dtype=bool)
+    segments = np.asarray(segments, dtype=np.int64)
+    total = int(segments.sum())
+    return {
+        'messages': len(segments),
+        'segments': total,
+        'gsm7_messages': int((~is_ucs2).sum()),
+        'ucs2_messages': int(is_ucs2.sum()),
+        'ucs2_segments': int(segments[is_ucs2].sum()),
+        'multipart_messages': int((segments > 1).sum()),
+        'max_segments': int(segments.max()) if len(segments) else 0,
+        'over_limit': int((segments > max_segments).sum()) if max_segments else 0,
+        'estimated_cost': round(total * price_per_segment, 4)
+    }
@@ -0,0 +1,168 @@
+import logging
+import threading
+import time
+from typing import Iterable, List, Optional, Set
+import numpy as np
+from app.config import Config
+from app.models.user import db
+from app.models.suppression import SuppressionEvent
+from .dedup import phone_key
+
+logger = logging.getLogger(__name__)
+
+# Replies that opt a number out of, or back into, messages
+STOP_KEYWORDS = {'STOP', 'STOPALL', 'UNSUBSCRIBE', 'CANCEL', 'END', 'QUIT'}
+START_KEYWORDS = {'START', 'UNSTOP', 'YES'}
+
+# Pending changes folded into the sorted array once there are this many
+_MERGE_THRESHOLD = 10000
+
+# Events read per query while catching up
+_REFRESH_BATCH = 50000
+
+class SuppressionList:
+    """
+    In-memory copy of the suppression list, kept current from suppression_events
+
+    Suppressed numbers live in a sorted int64 array (8 bytes each, so a few
+    million numbers take tens of MB) with small sets for changes since the
+    last merge. Lookups are a set probe plus a binary search and never touch
+    the database; refresh reads only the events added since the last one.
+    """
+
+    def __init__(self, refresh_seconds: float = 30):
+        self.refresh_seconds = refresh_seconds
+        self._keys = np.empty(0, dtype=np.int64)
+        self._added: Set[int] = set()
+        self._removed: Set[int] = set()
+        self._last_event_id = 0
+        self._refreshed_at = 0.0
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._keys) + len(self._added) - len(self._removed)
+
+    def refresh(self) -> int:
+        """
+        Apply the events added since the last refresh
+
+        Needs an application context, as it reads the database.
+
+        Returns:
+            int: Number of events applied
+        """
+        with self._lock:
+            applied = 0
+            while True:
+                events = db.session.query(SuppressionEvent.id, SuppressionEvent.phone_key,
+                                          SuppressionEvent.suppressed) \
+                    .filter(SuppressionEvent.id > self._last_event_id) \
+                    .order_by(SuppressionEvent.id).limit(_REFRESH_BATCH).all()
+                for event_id, key, suppressed in events:
+                    self._apply(key, suppressed)
+                    self._last_event_id = event_id
+                applied += len(events)
+                if len(events) < _REFRESH_BATCH:
+                    break
+
+            if len(self._added) + len(self._removed) >= _MERGE_THRESHOLD:
+                self._merge()
+            self._refreshed_at = time.monotonic()
+
+        if applied:
+            logger.info(f"Suppression list refreshed with {applied} changes, {len(self)} numbers suppressed")
+        return applied
+
+    def refresh_if_stale(self) -> None:
+        """Refresh when the last refresh is older than refresh_seconds"""
+        if time.monotonic() - self._refreshed_at >= self.refresh_seconds:
+            self.refresh()
+
+    def _in_keys(self, key: int) -> bool:
+        index = np.searchsorted(self._keys, key)
+        return index < len(self._keys) and self._keys[index] == key
+
+    def _apply(self, key: int, suppressed: bool) -> None:
+        in_keys = self._in_keys(key)
+        if suppressed:
+            self._removed.discard(key)
+            if not in_keys:
+                self._added.add(key)
+        else:
+            self._added.discard(key)
+            if in_keys:
+                self._removed.add(key)
+
+    def _merge(self) -> None:
+        keys = self._keys
+        if self._removed:
+            keys = keys[~np.isin(keys, np.fromiter(self._removed, dtype=np.int64))]
+        if self._added:
+            keys = np.union1d(keys, np.fromiter(self._added, dtype=np.int64))
+        self._keys = keys
+        self._added = set()
+        self._removed = set()
+
+    def is_suppressed(self, phone: Optional[str]) -> bool:
+        """Whether a normalized number is on the list"""
+        key = phone_key(phone)
+        if key is None:
+            return False
+        if key in self._added:
+            return True
+        return key not in self._removed and self._in_keys(key)
+
+    def suppressed_mask(self, phones: Iterable[Optional[str]]) -> List[bool]:
+        """
+        Check many normalized numbers at once
+
+        Returns:
+            List[bool]: True for each number on the list
+        """
+        keys = [phone_key(phone) for phone in phones]
+        known = np.array([-1 if key is None else key for key in keys], dtype=np.int64)
+        index = np.minimum(np.searchsorted(self._keys, known), max(len(self._keys) - 1, 0))
+        found = (self._keys[index] == known).tolist() if len(self._keys) else [False] * len(keys)
+        added, removed = self._added, self._removed
+        return [key is not None and (key in added or (hit and key not in removed))
+                for key, hit in zip(keys, found)]
+
+def record_suppression(phones: Iterable[str], suppressed: bool, reason: str,
+                       user_id: Optional[int] = None) -> int:
+    """
+    Append suppression events for numbers and commit them
+
+    Processes pick the change up on their next refresh; this process's
+    shared list is refreshed straight away.
+
+    Args:
+        phones (Iterable[str]): Normalized numbers
+        suppressed (bool): True to suppress, False to lift a suppression
+        reason (str): One of the SuppressionEvent reasons
+        user_id (Optional[int]): User making a manual change
+
+    Returns:
+        int: Number of numbers recorded
+    """
+    keys = list(dict.fromkeys(key for key in map(phone_key, phones) if key is not None))
+    if not keys:
+        return 0
+    db.session.bulk_insert_mappings(SuppressionEvent, [
+        {'phone_key': key, 'suppressed': suppressed, 'reason': reason, 'user_id': user_id}
+        for key in keys
+    ])
+    db.session.commit()
+    logger.info(f"{'Suppressed' if suppressed else 'Unsuppressed'} {len(keys)} numbers ({reason})")
+    get_suppression_list().refresh()
+    return len(keys)
+
+_shared_list: Optional[SuppressionList] = None
+_shared_list_lock = threading.Lock()
+
+def get_suppression_list() -> SuppressionList:
+    """Return the suppression list shared by everything in this process"""
+    global _shared_list
+    with _shared_list_lock:
+        if _shared_list is None:
+            _shared_list = SuppressionList(Config.SUPPRESSION_REFRESH_SECONDS)
+        return _shared_list
@@ -0,0 +1,181 @@
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import threading
+import zlib
+from typing import BinaryIO, Optional
+
+logger = logging.getLogger(__name__)
+
+# Bump whenever the shape or content of processed upload results changes
+# (including which numbers are valid and how they are normalized). The
+# version is part of every upload key, so both cache entries and contact
+# sets built by older code are treated as misses
+CACHE_FORMAT_VERSION = 3
+
+_SUFFIX = '.json.z'
+_HASH_BLOCK = 1024 * 1024
+
+def hash_stream(stream: BinaryIO) -> str:
+    """
+    Key of an upload: SHA-256 of CACHE_FORMAT_VERSION and the stream's
+    contents, leaving the stream rewound
+
+    Args:
+        stream (BinaryIO): Uploaded file stream
+
+    Returns:
+        str: Hex digest
+    """
+    digest = hashlib.sha256(f"messagepilot-upload-v{CACHE_FORMAT_VERSION}\0".encode())
+    stream.seek(0)
+    for block in iter(lambda: stream.read(_HASH_BLOCK), b''):
+        digest.update(block)
+    stream.seek(0)
+    return digest.hexdigest()
+
+class UploadCache:
+    """
+    Size-bounded on-disk cache of processed uploads, keyed by content hash
+
+    Each entry is one zlib-compressed JSON file. Contact results are stored
+    column-wise (the keys once, then one value list per contact) since every
+    result dict has the same keys. Recency is tracked through file mtimes, so
+    several app processes can share one cache directory; the least recently
+    used entries are removed once the directory grows past max_bytes.
+    """
+
+    def __init__(self, directory: str, max_bytes: int):
+        """
+        Initialize the cache
+
+        Args:
+            directory (str): Folder holding the cache entries
+            max_bytes (int): Total size budget; 0 disables the cache
+        """
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        if self.enabled:
+            os.makedirs(directory, exist_ok=True)
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_bytes > 0
+
+    def _path(self, digest: str, extension: str) -> str:
+        # The parser depends on the extension, so identical bytes uploaded
+        # as .csv and .xlsx are different entries
+        return os.path.join(self.directory, f"{digest}-{extension.lower()}{_SUFFIX}")
+
+    def get(self, digest: str, extension: str) -> Optional[dict]:
+        """
+        Look up the processed result of an upload
+
+        Args:
+            digest (str): Upload key from hash_stream
+            extension (str): File extension without the dot
+
+        Returns:
+            Optional[dict]: Dict with results, warnings and merge_fields, or None on a miss
+        """
+        if not self.enabled:
+            return None
+
+        path = self._path(digest, extension)
+        try:
+            with open(path, 'rb') as f:
+                entry = json.loads(zlib.decompress(f.read()))
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError, zlib.error) as e:
+            logger.warning(f"Discarding unreadable upload cache entry {path}: {str(e)}")
+            self._remove(path)
+            return None
+
+        if entry.get('version') != CACHE_FORMAT_VERSION:
+            self._remove(path)
+            return None
+
+        try:
+            os.utime(path)  # Mark as recently used
+        except OSError:
+            pass
+
+        keys = entry['keys']
+        return {
+            'results': [dict(zip(keys, values)) for values in entry['rows']],
+            'warnings': entry['warnings'],
+            'merge_fields': entry['merge_fields']
+        }
+
+    def put(self, digest: str, extension: str, processed: dict) -> None:
+        """
+        Store the processed result of an upload, evicting old entries if needed
+
+        Args:
+            digest (str): Upload key from hash_stream
+            extension (str): File extension without the dot
+            processed (dict): Successful process_uploaded_file payload
+        """
+        if not self.enabled:
+            return
+
+        results = processed['results']
+        keys = list(results[0]) if results else []
+        entry = {
+            'version': CACHE_FORMAT_VERSION,
+            'keys': keys,
+            'rows': [[result[key] for key in keys] for result in results],
+            'warnings': processed.get('warnings', []),
+            'merge_fields': processed.get('merge_fields', [])
+        }
+        try:
+            data = zlib.compress(json.dumps(entry, separators=(',', ':')).encode('utf-8'))
+        except (TypeError, ValueError) as e:
+            logger.warning(f"Upload result is not cacheable: {str(e)}")
+            return
+        if len(data) > self.max_bytes:
+            return
+
+        # Write to a temporary file first so readers never see a partial entry
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(data)
+            os.replace(tmp_path, self._path(digest, extension))
+        except OSError as e:
+            logger.warning(f"Could not write upload cache entry: {str(e)}")
+            self._remove(tmp_path)
+            return
+
+        self._evict()
+
+    def _evict(self) -> None:
+        """Remove least recently used entries until the cache fits its budget"""
+        with self._lock:
+            entries = []
+            for item in os.scandir(self.directory):
+                if not item.name.endswith(_SUFFIX):
+                    continue
+                try:
+                    stat = item.stat()
+                except FileNotFoundError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, item.path))
+
+            total = sum(size for _, size, _ in entries)
+            for _, size, path in sorted(entries):
+                if total <= self.max_bytes:
+                    break
+                self._remove(path)
+                total -= size
+
+    @staticmethod
+    def _remove(path: str) -> None:
+        try:
+            os.remove(path)
+        except OSError:
+            pass
@@ -0,0 +1,104 @@
+import base64
+import json
+from datetime import datetime
+from typing import List, Optional, Tuple
+from sqlalchemy import tuple_
+from app.models.user import User
+
+# Sort keys accepted by the admin user list; each has an index, and the
+# user id breaks ties so every user has a distinct position
+USER_SORTS = {
+    'email': User.email,
+    'last_login': User.last_login,
+    'created_at': User.created_at
+}
+
+def _prefix_upper_bound(prefix: str) -> str:
+    """Smallest string greater than every string starting with prefix"""
+    return prefix[:-1] + chr(ord(prefix[-1]) + 1)
+
+def encode_cursor(value, user_id: int) -> str:
+    """Opaque cursor for the position after a user, given its sort value and id"""
+    if isinstance(value, datetime):
+        value = value.isoformat()
+    raw = json.dumps([value, user_id], separators=(',', ':')).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+def decode_cursor(cursor: str, sort: str) -> Tuple[Optional[object], int]:
+    """
+    Read a cursor made by encode_cursor
+
+    Raises:
+        ValueError: If the cursor is malformed or was made for another sort
+    """
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        value, user_id = json.loads(raw)
+        if not isinstance(user_id, int):
+            raise ValueError(user_id)
+        if sort == 'email':
+            if not isinstance(value, str):
+                raise ValueError(value)
+        elif value is not None:
+            value = datetime.fromisoformat(value)
+    except (TypeError, ValueError) as e:
+        raise ValueError('Invalid cursor') from e
+    return value, user_id
+
+def get_users_page(search: str, sort: str, descending: bool, cursor: Optional[str],
+                   limit: int) -> Tuple[List[User], Optional[str]]:
+    """
+    Fetch one page of users using keyset pagination
+
+    Pages continue from the last (sort value, id) seen instead of an offset,
+    so each page is an index range scan of limit rows wherever it falls.
+    Users without a value for the sort column (never logged in) come after
+    all others in either direction. The search matches the start of the
+    email address as a range on the unique email index.
+
+    Args:
+        search (str): Email prefix to match, '' for all users
+        sort (str): One of USER_SORTS
+        descending (bool): Largest values first
+        cursor (Optional[str]): next_cursor of the previous page, None for the first page
+        limit (int): Maximum users to return
+
+    Returns:
+        tuple: (users, cursor for the next page or None at the end)
+
+    Raises:
+        ValueError: If the cursor is malformed
+    """
+    column = USER_SORTS[sort]
+    after = decode_cursor(cursor, sort) if cursor else None
+
+    def base_query():
+        query = User.query
+        if search:
+            query = query.filter(User.email >= search, User.email < _prefix_upper_bound(search))
+        return query
+
+    users = []
+    if after is None or after[0] is not None:
+        query = base_query().filter(column.isnot(None))
+        if after is not None:
+            position = tuple_(column, User.id)
+            query = query.filter(position < after if descending else position > after)
+        if descending:
+            query = query.order_by(column.desc(), User.id.desc())
+        else:
+            query = query.order_by(column, User.id)
+        users = query.limit(limit + 1).all()
+
+    if len(users) <= limit and column.nullable:
+        # Users without a value, after every user that has one
+        query = base_query().filter(column.is_(None))
+        if after is not None and after[0] is None:
+            query = query.filter(User.id < after[1] if descending else User.id > after[1])
+        query = query.order_by(User.id.desc() if descending else User.id)
+        users += query.limit(limit + 1 - len(users)).all()
+
+    has_more = len(users) > limit
+    users = users[:limit]
+    next_cursor = encode_cursor(getattr(users[-1], sort), users[-1].id) if has_more else None
+    return users, next_cursor
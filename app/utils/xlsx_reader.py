@@ -0,0 +1,340 @@
+import posixpath
+import zipfile
+from xml.parsers import expat
+import pandas as pd
+from typing import Dict, Iterable, Iterator, List, Optional
+from openpyxl.styles.numbers import BUILTIN_FORMATS, is_date_format, is_timedelta_format
+from openpyxl.utils.cell import column_index_from_string
+from openpyxl.utils.datetime import CALENDAR_MAC_1904, CALENDAR_WINDOWS_1900, from_excel
+
+# Text pandas.read_excel treats as missing
+NA_VALUES = frozenset([
+    '', '#N/A', '#N/A N/A', '#NA', '-1.#IND', '-1.#QNAN', '-NaN', '-nan',
+    '1.#IND', '1.#QNAN', '<NA>', 'N/A', 'NA', 'NULL', 'NaN', 'None', 'n/a',
+    'nan', 'null'
+])
+
+_NS_MAIN = 'http://schemas.openxmlformats.org/spreadsheetml/2006/main'
+_NS_REL = 'http://schemas.openxmlformats.org/officeDocument/2006/relationships'
+_NS_PKG_REL = 'http://schemas.openxmlformats.org/package/2006/relationships'
+
+_C = f'{_NS_MAIN} c'
+_V = f'{_NS_MAIN} v'
+_IS = f'{_NS_MAIN} is'
+_ROW = f'{_NS_MAIN} row'
+
+# Bytes handed to the XML parser per call
+_READ_BLOCK = 1024 * 1024
+
+# Non-empty rows searched for the header row, past titles or notes above it
+_HEADER_SCAN_ROWS = 10
+
+def _parse(zf: zipfile.ZipFile, name: str, parser) -> None:
+    """Stream one archive member through an expat parser"""
+    with zf.open(name) as stream:
+        while True:
+            block = stream.read(_READ_BLOCK)
+            parser.Parse(block, not block)
+            if not block:
+                break
+
+def _new_parser():
+    parser = expat.ParserCreate(namespace_separator=' ')
+    parser.buffer_text = True
+    return parser
+
+def _first_sheet_path(zf: zipfile.ZipFile) -> str:
+    """Resolve the archive path of the first worksheet, the one read_excel reads by default"""
+    sheets: List[str] = []
+    targets: Dict[str, str] = {}
+
+    def workbook_start(tag, attrs):
+        if tag == f'{_NS_MAIN} sheet':
+            sheets.append(attrs.get(f'{_NS_REL} id'))
+
+    def rels_start(tag, attrs):
+        if tag == f'{_NS_PKG_REL} Relationship':
+            targets[attrs['Id']] = attrs['Target']
+
+    parser = _new_parser()
+    parser.StartElementHandler = workbook_start
+    _parse(zf, 'xl/workbook.xml', parser)
+
+    parser = _new_parser()
+    parser.StartElementHandler = rels_start
+    _parse(zf, 'xl/_rels/workbook.xml.rels', parser)
+
+    if not sheets or sheets[0] not in targets:
+        raise ValueError('Workbook has no worksheets')
+    target = targets[sheets[0]]
+    if target.startswith('/'):
+        return target.lstrip('/')
+    return posixpath.normpath(posixpath.join('xl', target))
+
+def _workbook_epoch(zf: zipfile.ZipFile):
+    epoch = [CALENDAR_WINDOWS_1900]
+
+    def start(tag, attrs):
+        if tag == f'{_NS_MAIN} workbookPr' and attrs.get('date1904') in ('1', 'true'):
+            epoch[0] = CALENDAR_MAC_1904
+
+    parser = _new_parser()
+    parser.StartElementHandler = start
+    _parse(zf, 'xl/workbook.xml', parser)
+    return epoch[0]
+
+def _shared_strings(zf: zipfile.ZipFile) -> List[str]:
+    """Read the shared string table, joining rich-text runs and skipping phonetic hints"""
+    if 'xl/sharedStrings.xml' not in zf.namelist():
+        return []
+
+    strings: List[str] = []
+    parts: List[str] = []
+    state = {'in_text': False, 'phonetic': 0}
+
+    def start(tag, attrs):
+        if tag == f'{_NS_MAIN} si':
+            parts.clear()
+        elif tag == f'{_NS_MAIN} rPh':
+            state['phonetic'] += 1
+        elif tag == f'{_NS_MAIN} t' and not state['phonetic']:
+            state['in_text'] = True
+
+    def end(tag):
+        if tag == f'{_NS_MAIN} si':
+            strings.append(''.join(parts))
+        elif tag == f'{_NS_MAIN} rPh':
+            state['phonetic'] -= 1
+        elif tag == f'{_NS_MAIN} t':
+            state['in_text'] = False
+
+    def text(data):
+        if state['in_text']:
+            parts.append(data)
+
+    parser = _new_parser()
+    parser.StartElementHandler = start
+    parser.EndElementHandler = end
+    parser.CharacterDataHandler = text
+    _parse(zf, 'xl/sharedStrings.xml', parser)
+    return strings
+
+def _date_styles(zf: zipfile.ZipFile) -> Dict[int, str]:
+    """
+    Map cell style indexes whose number format is a date/time to 'date' or 'timedelta'
+
+    Only the number formats are read; fonts, fills and borders are skipped.
+    """
+    if 'xl/styles.xml' not in zf.namelist():
+        return {}
+
+    custom_formats: Dict[int, str] = {}
+    xf_formats: List[int] = []
+    depth = {'cellXfs': False}
+
+    def start(tag, attrs):
+        if tag == f'{_NS_MAIN} numFmt':
+            custom_formats[int(attrs['numFmtId'])] = attrs.get('formatCode', '')
+        elif tag == f'{_NS_MAIN} cellXfs':
+            depth['cellXfs'] = True
+        elif tag == f'{_NS_MAIN} xf' and depth['cellXfs']:
+            xf_formats.append(int(attrs.get('numFmtId', 0)))
+
+    def end(tag):
+        if tag == f'{_NS_MAIN} cellXfs':
+            depth['cellXfs'] = False
+
+    parser = _new_parser()
+    parser.StartElementHandler = start
+    parser.EndElementHandler = end
+    _parse(zf, 'xl/styles.xml', parser)
+
+    kinds: Dict[int, str] = {}
+    for index, format_id in enumerate(xf_formats):
+        code = custom_formats.get(format_id, BUILTIN_FORMATS.get(format_id, 'General'))
+        if is_timedelta_format(code):
+            kinds[index] = 'timedelta'
+        elif is_date_format(code):
+            kinds[index] = 'date'
+    return kinds
+
+def iter_xlsx_chunks(filepath: str, columns: Iterable[str], chunk_rows: int) -> Iterator[pd.DataFrame]:
+    """
+    Stream the first worksheet of an .xlsx file as DataFrames of selected columns
+
+    The sheet XML is parsed with expat, keeping only the cells under the
+    wanted headers. Formulas contribute their cached value and styles are
+    consulted only to recognise dates. Cell values follow pandas.read_excel
+    (integral floats become int, errors and NA text become missing, blank
+    rows inside the data are kept and trailing ones dropped), but no dtype
+    inference is applied: every column is object dtype so chunks agree.
+
+    The header is the first row holding any of the wanted names, so blank
+    rows and titles above it are skipped. If none of the first
+    _HEADER_SCAN_ROWS non-empty rows holds one, the first non-empty row is
+    the header, as with read_excel, and the wanted columns are absent.
+
+    Args:
+        filepath (str): Path to the workbook
+        columns (Iterable[str]): Header names to extract; absent ones are left out
+        chunk_rows (int): Maximum rows per yielded DataFrame
+
+    Yields:
+        pd.DataFrame: Consecutive chunks with a running RangeIndex
+    """
+    wanted = list(columns)
+    wanted_names = set(wanted)
+    with zipfile.ZipFile(filepath) as zf:
+        sheet_path = _first_sheet_path(zf)
+        shared = _shared_strings(zf)
+        date_styles = _date_styles(zf)
+        epoch = _workbook_epoch(zf)
+
+        selected: Dict[int, int] = {}  # column index -> output position
+        out_columns: List[str] = []
+        leading: List[tuple] = []  # (row number, {column index: value}) of non-empty rows before the header
+        rows: List[list] = []
+        chunks: List[pd.DataFrame] = []
+        state = {
+            'row': 0, 'col': 0, 'type': None, 'style': None, 'in_value': False,
+            'in_inline': False, 'text': [], 'current': None, 'cells': None, 'has_data': False,
+            'header_found': False, 'last_row': 0, 'emitted': 0
+        }
+
+        def flush():
+            if rows:
+                index = pd.RangeIndex(state['emitted'], state['emitted'] + len(rows))
+                chunks.append(pd.DataFrame(rows, columns=out_columns, index=index, dtype=object))
+                state['emitted'] += len(rows)
+                rows.clear()
+
+        def append(row):
+            rows.append(row)
+            if len(rows) >= chunk_rows:
+                flush()
+
+        def emit(number, row):
+            # Blank rows count only when data follows them
+            for _ in range(number - state['last_row'] - 1):
+                append([None] * len(out_columns))
+            state['last_row'] = number
+            append(row)
+
+        def use_header(number, header):
+            for name in wanted:
+                for col, title in header.items():
+                    if title == name and col not in selected:
+                        selected[col] = len(out_columns)
+                        out_columns.append(name)
+                        break
+            state['header_found'] = True
+            state['last_row'] = number
+
+        def use_first_leading_row():
+            number, header = leading[0]
+            use_header(number, header)
+            for number, cells in leading[1:]:
+                row = [None] * len(out_columns)
+                for col, position in selected.items():
+                    row[position] = cells.get(col)
+                emit(number, row)
+            leading.clear()
+
+        def convert(raw: str, cell_type: Optional[str], style: Optional[str]):
+            if cell_type == 's':
+                value = shared[int(raw)]
+            elif cell_type in ('str', 'inlineStr'):
+                value = raw
+            elif cell_type == 'b':
+                return raw == '1'
+            elif cell_type == 'e':
+                return None
+            elif cell_type == 'd':
+                return pd.Timestamp(raw).to_pydatetime()
+            else:
+                number = float(raw)
+                kind = date_styles.get(int(style)) if style is not None else None
+                if kind == 'date':
+                    return from_excel(number, epoch)
+                if kind == 'timedelta':
+                    return from_excel(number, epoch, timedelta=True)
+                return int(number) if number.is_integer() else number
+            return None if value in NA_VALUES else value
+
+        def start(tag, attrs):
+            if tag == _C:
+                ref = attrs.get('r')
+                state['col'] = column_index_from_string(ref.rstrip('0123456789')) if ref else state['col'] + 1
+                state['type'] = attrs.get('t')
+                state['style'] = attrs.get('s')
+                state['text'] = []
+            elif tag == _V:
+                state['in_value'] = True
+            elif tag == _IS:
+                state['in_inline'] = True
+            elif tag == _ROW:
+                ref = attrs.get('r')
+                state['row'] = int(ref) if ref else state['row'] + 1
+                state['col'] = 0
+                state['has_data'] = False
+                if state['header_found']:
+                    state['current'] = [None] * len(out_columns)
+                else:
+                    state['cells'] = {}
+
+        def text(data):
+            if state['in_value'] or state['in_inline']:
+                state['text'].append(data)
+
+        def end(tag):
+            if tag == _C:
+                raw = ''.join(state['text'])
+                # Empty cells and empty strings are what read_excel trims as blank
+                if not raw and state['type'] != 'e':
+                    return
+                state['has_data'] = True
+                col = state['col']
+                if not state['header_found']:
+                    state['cells'][col] = convert(raw, state['type'], state['style'])
+                    return
+                position = selected.get(col)
+                if position is not None:
+                    state['current'][position] = convert(raw, state['type'], state['style'])
+            elif tag == _V:
+                state['in_value'] = False
+            elif tag == _IS:
+                state['in_inline'] = False
+            elif tag == _ROW:
+                if not state['has_data']:
+                    return
+                if state['header_found']:
+                    emit(state['row'], state['current'])
+                    return
+                cells = state['cells']
+                if any(isinstance(value, str) and value in wanted_names for value in cells.values()):
+                    # Rows above the header are titles or notes
+                    leading.clear()
+                    use_header(state['row'], cells)
+                    return
+                leading.append((state['row'], cells))
+                if len(leading) >= _HEADER_SCAN_ROWS:
+                    use_first_leading_row()
+
+        parser = _new_parser()
+        parser.StartElementHandler = start
+        parser.EndElementHandler = end
+        parser.CharacterDataHandler = text
+
+        with zf.open(sheet_path) as stream:
+            while True:
+                block = stream.read(_READ_BLOCK)
+                parser.Parse(block, not block)
+                yield from chunks
+                chunks.clear()
+                if not block:
+                    break
+
+        if leading:
+            use_first_leading_row()
+        flush()
+        yield from chunks
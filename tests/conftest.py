@@ -0,0 +1,55 @@
+import os
+import sys
+import tempfile
+import uuid
+
+import pytest
+
+# The app reads its configuration when it is first imported, so point it at a
+# throwaway database and folders before any test module imports it
+_workdir = tempfile.mkdtemp(prefix='messagepilot-tests-')
+os.environ.update({
+    'DATABASE_URL': 'sqlite:///' + os.path.join(_workdir, 'test.db'),
+    'FLASK_SECRET_KEY': 'test-secret-key',
+    'TWILIO_ACCOUNT_SID': 'AC' + '0' * 32,
+    'TWILIO_AUTH_TOKEN': 'test-auth-token',
+    'TWILIO_PHONE_NUMBER': '+15005550006',
+    'UPLOAD_CACHE_FOLDER': os.path.join(_workdir, 'upload-cache'),
+    'LOG_LEVEL': 'WARNING',
+})
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+# Logs and uploads go to folders relative to the working directory
+os.chdir(_workdir)
+
+@pytest.fixture(scope='session')
+def web():
+    """The app module, imported once for the whole run"""
+    import app.app as web
+    web.app.config['TESTING'] = True
+    yield web
+    # Write out queued records while pytest's captured stdout is still open
+    web.log_queue_handler.stop()
+
+@pytest.fixture
+def app(web):
+    with web.app.app_context():
+        yield web.app
+
+@pytest.fixture
+def user(app):
+    """A new customer account"""
+    from app.models.user import User, db
+    user = User(email=f"{uuid.uuid4().hex}@example.org", first_name='Test', last_name='User', is_admin=False)
+    user.set_password('password')
+    db.session.add(user)
+    db.session.commit()
+    return user
+
+@pytest.fixture
+def client(app, user):
+    """A test client logged in as user"""
+    client = app.test_client()
+    with client.session_transaction() as session:
+        session['_user_id'] = str(user.id)
+        session['_fresh'] = True
+    return client
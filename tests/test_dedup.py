@@ -0,0 +1,58 @@
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import event
+
+from app.models.recipient_history import RecipientHistory
+from app.models.user import db
+from app.utils import dedup
+from app.utils.dedup import phone_key, record_recipients
+
+@pytest.fixture
+def racing_campaign(app):
+    """
+    Commit history rows for numbers from another connection just before this
+    session's first write to recipient_history, as a campaign queued at the
+    same moment would
+    """
+    numbers = []
+
+    def insert_first(conn, cursor, statement, parameters, context, executemany):
+        if numbers and statement.lstrip().upper().startswith('INSERT INTO RECIPIENT_HISTORY'):
+            rows = [{'phone_key': phone_key(number), 'last_sent_at': datetime(2020, 1, 1)} for number in numbers]
+            numbers.clear()
+            with db.engine.begin() as other:
+                other.execute(RecipientHistory.__table__.insert(), rows)
+
+    event.listen(db.engine, 'before_cursor_execute', insert_first)
+    yield numbers
+    event.remove(db.engine, 'before_cursor_execute', insert_first)
+
+def history(numbers):
+    return {key: sent_at for key, sent_at in db.session.query(RecipientHistory.phone_key, RecipientHistory.last_sent_at)
+            .filter(RecipientHistory.phone_key.in_([phone_key(number) for number in numbers]))}
+
+def test_record_recipients_moves_existing_and_inserts_new(app):
+    earlier = datetime.utcnow() - timedelta(hours=1)
+    record_recipients(['447946220300'], earlier)
+    db.session.commit()
+
+    now = datetime.utcnow()
+    assert record_recipients(['+447946220300', '447946220301', '447946220301'], now) == 2
+    db.session.commit()
+
+    assert history(['447946220300', '447946220301']) == {447946220300: now, 447946220301: now}
+
+@pytest.mark.parametrize('upsert', [True, False], ids=['upsert', 'update-then-insert'])
+def test_concurrent_campaigns_with_a_shared_new_number_both_record_it(app, racing_campaign, monkeypatch, upsert):
+    if not upsert:
+        # The path taken on dialects without an upsert
+        monkeypatch.setattr(dedup, '_upsert', lambda keys, sent_at: False)
+    shared, own = f"4479462204{int(upsert)}0", f"4479462204{int(upsert)}1"
+    racing_campaign.append(shared)
+
+    now = datetime.utcnow()
+    record_recipients([shared, own], now)
+    db.session.commit()
+
+    assert history([shared, own]) == {int(shared): now, int(own): now}
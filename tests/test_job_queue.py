@@ -0,0 +1,116 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+from app.config import Config
+from app.models.sms_job import SMSJob, SMSJobRecipient
+from app.models.user import db
+from SMS.utils import job_queue
+from SMS.utils.job_queue import claim_next_job, enqueue_campaign, process_job, renew_lease
+
+class RecordingHandler:
+    """Stands in for the Twilio handler, recording the positions of each send call"""
+
+    def __init__(self):
+        self.calls = []
+        self.on_call = {}  # call number -> action run before that call sends
+
+    def send_batch_sms(self, recipients, message_template):
+        self.calls.append([recipient['position'] for recipient in recipients])
+        action = self.on_call.get(len(self.calls))
+        if action:
+            action()
+        return [{'success': True, 'message_id': f"SM{recipient['position']}"} for recipient in recipients]
+
+@pytest.fixture
+def handler(app, monkeypatch):
+    """A queue of one five-recipient job sent two at a time"""
+    # Jobs other tests left unfinished would be claimed first
+    db.session.query(SMSJob).filter(SMSJob.status.in_([SMSJob.STATUS_QUEUED, SMSJob.STATUS_RUNNING])) \
+        .update({'status': SMSJob.STATUS_FAILED}, synchronize_session=False)
+    db.session.commit()
+
+    handler = RecordingHandler()
+    monkeypatch.setattr(job_queue, 'get_sms_handler', lambda: handler)
+    monkeypatch.setattr(Config, 'SMS_BATCH_SIZE', 2)
+    monkeypatch.setattr(Config, 'SMS_JOB_LEASE_SECONDS', 300)
+    monkeypatch.setattr(Config, 'SMS_RATE_LIMIT', 1)
+    monkeypatch.setattr(Config, 'SMS_DEDUPE_WINDOW_HOURS', 0)
+    enqueue_campaign([{'phone': f"+44794622018{i}", 'position': i} for i in range(5)], 'Hi')
+    return handler
+
+def take_over(job_id, worker_id='other'):
+    """Claim the job from another connection, as a worker that saw its lease expire would"""
+    def action():
+        with db.engine.begin() as connection:
+            connection.execute(SMSJob.__table__.update().where(SMSJob.__table__.c.id == job_id)
+                               .values(worker_id=worker_id, heartbeat_at=datetime.utcnow()))
+    return action
+
+def stored(job_id):
+    db.session.expire_all()
+    job = db.session.get(SMSJob, job_id)
+    statuses = [recipient.status for recipient in job.recipients.order_by(SMSJobRecipient.position)]
+    return job, statuses
+
+def test_job_is_sent_in_checkpointed_chunks(handler):
+    job = claim_next_job('w1')
+    process_job(job, 'w1')
+
+    job, statuses = stored(job.id)
+    assert handler.calls == [[0, 1], [2, 3], [4]]
+    assert (job.status, job.sent, job.next_position, job.worker_id) == (SMSJob.STATUS_COMPLETED, 5, 5, None)
+    assert statuses == [SMSJobRecipient.STATUS_SENT] * 5
+
+def test_checkpoint_after_a_takeover_is_discarded(handler):
+    job = claim_next_job('w1')
+    handler.on_call[2] = take_over(job.id)
+    process_job(job, 'w1')
+
+    # The first chunk stays committed; the one sent after losing the job is not recorded
+    job, statuses = stored(job.id)
+    assert handler.calls == [[0, 1], [2, 3]]
+    assert (job.status, job.sent, job.next_position, job.worker_id) == (SMSJob.STATUS_RUNNING, 2, 2, 'other')
+    assert statuses == [SMSJobRecipient.STATUS_SENT] * 2 + [SMSJobRecipient.STATUS_PENDING] * 3
+
+def test_long_chunks_renew_the_lease_between_slices_and_stop_once_it_is_lost(handler, monkeypatch):
+    # Slices of one recipient in chunks of four
+    monkeypatch.setattr(Config, 'SMS_BATCH_SIZE', 4)
+    monkeypatch.setattr(Config, 'SMS_JOB_LEASE_SECONDS', 3)
+    job = claim_next_job('w1')
+    assert renew_lease(job.id, 'w1')
+    assert not renew_lease(job.id, 'w2')
+
+    handler.on_call[2] = take_over(job.id)
+    process_job(job, 'w1')
+
+    job, statuses = stored(job.id)
+    assert handler.calls == [[0], [1]]
+    assert (job.sent, job.next_position, job.worker_id) == (0, 0, 'other')
+    assert statuses == [SMSJobRecipient.STATUS_PENDING] * 5
+
+def test_transient_error_releases_the_job_to_resume_from_its_checkpoint(handler):
+    job = claim_next_job('w1')
+
+    def network_down():
+        raise OSError('network down')
+    handler.on_call[2] = network_down
+    process_job(job, 'w1')
+
+    job, statuses = stored(job.id)
+    assert (job.status, job.sent, job.next_position, job.worker_id, job.error) == \
+        (SMSJob.STATUS_RUNNING, 2, 2, None, 'network down')
+    # Not claimable again until the lease lapses, so the error can't resend in a tight loop
+    assert claim_next_job('w2') is None
+
+    db.session.query(SMSJob).filter(SMSJob.id == job.id) \
+        .update({'heartbeat_at': datetime.utcnow() - timedelta(seconds=Config.SMS_JOB_LEASE_SECONDS + 1)})
+    db.session.commit()
+    resumed = claim_next_job('w2')
+    assert resumed.id == job.id
+    process_job(resumed, 'w2')
+
+    job, statuses = stored(job.id)
+    assert handler.calls == [[0, 1], [2, 3], [2, 3], [4]]
+    assert (job.status, job.sent, job.next_position, job.error) == (SMSJob.STATUS_COMPLETED, 5, 5, None)
+    assert statuses == [SMSJobRecipient.STATUS_SENT] * 5
@@ -0,0 +1,34 @@
+from test_upload import contacts_csv, upload
+
+TEMPLATE = 'Hi {first_name} from {location}'
+
+def generate(client, body):
+    response = client.post('/generate_links', json=body)
+    return response.status_code, response.get_json()
+
+def test_links_for_a_contact_set_cover_the_pages_never_loaded(client, web, monkeypatch):
+    monkeypatch.setitem(web.app.config, 'LINK_BATCH_ROWS', 64)
+    _, uploaded = upload(client, contacts_csv([f"0794622{i:04d}" for i in range(1000, 1250)]))
+    contact_set = uploaded['contact_set']
+    assert len(uploaded['contacts']) < contact_set['total'] == 250
+
+    # Every page, as the page would hold after loading them all
+    rows, cursor = list(uploaded['contacts']), uploaded['next_cursor']
+    while cursor is not None:
+        page = client.get(f"/contact_sets/{contact_set['id']}/contacts?cursor={cursor}").get_json()
+        rows += page['contacts']
+        cursor = page['next_cursor']
+    excluded = [rows[3]['id'], rows[180]['id']]
+    rows = [row for row in rows if row['id'] not in excluded]
+
+    status, from_set = generate(client, {'message_template': TEMPLATE, 'contact_set_id': contact_set['id'],
+                                         'exclude_ids': excluded})
+    assert status == 200
+    _, from_rows = generate(client, {'message_template': TEMPLATE, 'rows': rows})
+    assert len(from_set['results']) == 248
+    assert from_set['results'] == from_rows['results']
+
+def test_links_for_an_unknown_contact_set_are_refused(client):
+    status, body = generate(client, {'message_template': TEMPLATE, 'contact_set_id': 10 ** 9})
+    assert status == 404
+    assert body['error'] == 'Contact set not found'
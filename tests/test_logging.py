@@ -0,0 +1,61 @@
+import logging
+import os
+import signal
+import subprocess
+import sys
+import time
+
+import pytest
+
+class Capture(logging.Handler):
+    """Collects the messages the log writer hands to its real handlers"""
+
+    def __init__(self):
+        super().__init__(logging.DEBUG)
+        self.messages = []
+
+    def emit(self, record):
+        self.messages.append(record.getMessage())
+
+@pytest.fixture
+def captured(web, monkeypatch):
+    capture = Capture()
+    monkeypatch.setattr(web.log_queue_handler, 'writers', web.log_queue_handler.writers + [capture])
+    monkeypatch.setattr(logging.getLogger('SMS'), 'level', logging.INFO)
+    yield capture.messages
+
+def flush(web):
+    # Stopping the writer drains the queue; the next record starts a new one
+    web.log_queue_handler.stop()
+
+def test_sms_handler_logs_are_queued_and_masked(web, captured):
+    from SMS.utils import sms_handler
+
+    sms_handler.logger.info("SMS sent successfully to +447946220153")
+    sms_handler.logger.error("Failed to send SMS to %s: %s", '+1 202 555 0123', 'timeout')
+    flush(web)
+
+    assert "SMS sent successfully to 44****0153" in captured
+    assert "Failed to send SMS to 12****0123: timeout" in captured
+    assert not any('7946220153' in message or '2025550123' in message for message in captured)
+
+def test_app_utils_logs_are_masked(web, captured):
+    logging.getLogger('app.utils.contact_store').warning("Bad number 07946220153 in upload")
+    flush(web)
+
+    assert "Bad number 07****0153 in upload" in captured
+
+def test_worker_logs_through_the_shared_handler(tmp_path):
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    env = dict(os.environ, LOG_LEVEL='INFO', SMS_WORKER_POLL_INTERVAL='0.1',
+               DATABASE_URL='sqlite:///' + str(tmp_path / 'worker.db'), PYTHONPATH=root)
+    worker = subprocess.Popen([sys.executable, '-m', 'SMS.worker'], cwd=tmp_path, env=env,
+                              stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True)
+    time.sleep(5)
+    worker.send_signal(signal.SIGTERM)
+    output, _ = worker.communicate(timeout=30)
+
+    # The shared handler's detailed format, not basicConfig's LEVEL:name:message
+    assert 'Message: SMS worker' in output
+    assert 'INFO:' not in output
+    assert (tmp_path / 'app' / 'logs' / 'app.log').read_text().count('SMS worker') == 2
@@ -0,0 +1,84 @@
+import random
+import urllib.parse
+
+import pandas as pd
+import pytest
+
+from app.utils.message_template import MERGE_FIELDS, compile_template
+from app.utils.personalize import percent_encode_many, personalize, render_links
+
+# Safe and unsafe ASCII, '%' and '/', accents, CJK, combining marks and astral emoji
+ALPHABET = 'aZ09_.-~/ %&?=#+\n\t"\'<>' + '\u00e9\u00df\u00f1' + '\u4e2d\u6587' + 'e\u0301' + '\U0001F600\U0001F44D\U0001F3FD'
+SPECS = ['', '', '', '!r', ':>12', ':^5', '!s:.3']
+
+def random_text(rng, longest=12):
+    return ''.join(rng.choice(ALPHABET) for _ in range(rng.randint(0, longest)))
+
+def random_template(rng):
+    """Template text mixing literals, braces and merge fields with conversions and specs"""
+    parts = []
+    for _ in range(rng.randint(0, 4)):
+        parts.append(random_text(rng).replace('{', '{{').replace('}', '}}'))
+        if rng.random() < 0.2:
+            parts.append('{{}}')
+        parts.append('{' + rng.choice(list(MERGE_FIELDS)) + rng.choice(SPECS) + '}')
+    parts.append(random_text(rng))
+    return ''.join(parts)
+
+def random_value(rng):
+    return rng.choice([random_text(rng), random_text(rng), rng.randint(0, 10 ** 6), ''])
+
+def quoted_link(phone, message):
+    return f"https://wa.me/{phone}?text={urllib.parse.quote(message)}" if phone else None
+
+@pytest.mark.parametrize('seed', range(3))
+def test_percent_encode_many_matches_quote(seed):
+    rng = random.Random(seed)
+    texts = [random_text(rng, 40) for _ in range(2000)] + ['', '%', '/', '~', '\U0001F600' * 3]
+    assert percent_encode_many(texts) == [urllib.parse.quote(text) for text in texts]
+
+@pytest.mark.parametrize('seed', range(3))
+def test_render_links_matches_rendering_and_quoting_each_row(seed):
+    rng = random.Random(seed)
+    for _ in range(40):
+        template = compile_template(random_template(rng))
+        rows = []
+        for _ in range(rng.randint(1, 60)):
+            # Posted rows name fields either way, or lack them
+            row = {}
+            for field, column in MERGE_FIELDS.items():
+                if rng.random() < 0.8:
+                    row[rng.choice([field, column])] = random_value(rng)
+            rows.append(row)
+        phones = [rng.choice(['447946220170', '4915123456789', None, '']) for _ in rows]
+
+        messages, links = render_links(rows, template, phones, default='')
+
+        expected = [template.render(row, default='') for row in rows]
+        assert messages == expected
+        assert links == [quoted_link(phone, message) for phone, message in zip(phones, expected)]
+
+def test_personalize_links_match_quoting_each_body():
+    rng = random.Random(7)
+    contacts = pd.DataFrame({
+        'id': range(500),
+        'best_phone': [f"44794622{i:04d}" for i in range(500)],
+        'full_name': [random_text(rng) for _ in range(500)],
+        'First Name': [rng.choice(['Ada', 'Bo', random_text(rng)]) for _ in range(500)],
+        'Last Name': [random_text(rng) for _ in range(500)],
+        'Location': [rng.choice(['Town', 'Zürich', '東京', None]) for _ in range(500)],
+        'Newest Engagement Date': ['1/1/2024'] * 500,
+        'Personal Volunteering Site URL': [f"https://example.org/{i}?a=b&c" for i in range(500)],
+    })
+    for _ in range(20):
+        batch = personalize(contacts, random_template(rng))
+        assert batch['link'] == [quoted_link(phone, body) for phone, body in zip(batch['phone'], batch['body'])]
+
+@pytest.mark.parametrize('template_text', [None, 'Hi {first_name:>8}, {location!r} 100% {{ok}} \U0001F44D'])
+def test_batched_link_results_match_row_by_row(web, template_text):
+    rng = random.Random(11)
+    template = compile_template(template_text) if template_text else None
+    rows = [{'First Name': random_value(rng), 'Last Name': random_text(rng), 'Location': random_value(rng),
+             'Phone': rng.choice(['07946220171', '+44 7946 220172', '', 'n/a']),
+             'Personal Volunteering Site URL': random_text(rng)} for _ in range(300)]
+    assert web.build_link_results(rows, template) == [web.build_link_result(row, template) for row in rows]
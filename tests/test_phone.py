@@ -0,0 +1,51 @@
+import random
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from app.utils.phone import COUNTRY_RULES, normalize_phone_series, process_phone_number
+
+CALLING_CODES = sorted({rule.calling_code for rule in COUNTRY_RULES.values()}) + ['7', '86', '380']
+
+def random_phone(rng):
+    """A phone cell in one of the shapes uploads contain, often slightly wrong"""
+    shape = rng.random()
+    if shape < 0.35:
+        # International, maybe with a stray trunk 0 and formatting
+        number = '+' + rng.choice(CALLING_CODES) + rng.choice(['', '0', ' (0)', '00'])
+        number += ''.join(rng.choice('0123456789') for _ in range(rng.randint(4, 15)))
+    elif shape < 0.7:
+        # National or bare digits
+        number = rng.choice(['0', '44', '7', '8', '1', '2', '']) + \
+            ''.join(rng.choice('0123456789') for _ in range(rng.randint(0, 14)))
+    else:
+        # Anything made of the characters found in phone cells
+        number = ''.join(rng.choice('0123456789+ -()./x') for _ in range(rng.randint(0, 24)))
+    if rng.random() < 0.3:
+        # Formatting between digits
+        chars = list(number)
+        for _ in range(rng.randint(1, 3)):
+            chars.insert(rng.randint(0, len(chars)), rng.choice(' -().'))
+        number = ''.join(chars)
+    if rng.random() < 0.1:
+        number = rng.choice([' ', '\t', '\n']) + number + rng.choice(['', ' '])
+    return number
+
+@pytest.mark.parametrize('seed', range(5))
+def test_vectorized_normalization_matches_process_phone_number(seed):
+    rng = random.Random(seed)
+    phones = [random_phone(rng) for _ in range(5000)]
+    # Values that take the scalar fallback or are missing
+    phones += [None, np.nan, '', ' ', '+', '٠٧٩٤٦', 'x' * 40 + '07946220153',
+               '+49 0 1234567890123', '+44 (0)7946 220153', 7946220153, 447946220153.0]
+
+    expected = [process_phone_number(phone) for phone in phones]
+    actual = normalize_phone_series(pd.Series(phones, dtype=object)).tolist()
+
+    mismatches = [(phone, want, got) for phone, want, got in zip(phones, expected, actual) if want != got]
+    assert mismatches == []
+
+def test_overlong_international_number_is_rejected_before_dropping_trunk_zero():
+    assert process_phone_number('+49 0 1234567890123') is None
+    assert normalize_phone_series(pd.Series(['+49 0 1234567890123'])).tolist() == [None]
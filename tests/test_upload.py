@@ -0,0 +1,68 @@
+import io
+
+import pytest
+
+from app.utils import upload_cache
+
+HEADER = 'First Name,Last Name,Phone,Location,Newest Engagement Date,Personal Volunteering Site URL,Mobile,Work Phone\n'
+
+def contacts_csv(phones):
+    """CSV bytes with one contact per phone number"""
+    rows = ''.join(f"First{i},Last{i},{phone},Town,1/1/2024,https://example.org/{i},,\n"
+                   for i, phone in enumerate(phones))
+    return (HEADER + rows).encode()
+
+def upload(client, data, name='contacts.csv'):
+    response = client.post('/upload', data={'file': (io.BytesIO(data), name)},
+                           content_type='multipart/form-data')
+    return response.status_code, response.get_json()
+
+def test_repeat_upload_reuses_contact_set_until_processing_version_changes(client, monkeypatch):
+    data = contacts_csv(['07946220150', '7946220151', '+44 (0)7946 220152'])
+
+    status, first = upload(client, data)
+    assert status == 200
+    assert [contact['best_phone'] for contact in first['contacts']] == \
+        ['447946220150', '447946220151', '447946220152']
+
+    _, again = upload(client, data)
+    assert again['contact_set']['id'] == first['contact_set']['id']
+
+    # Results built under older rules are neither served from the cache nor reused
+    monkeypatch.setattr(upload_cache, 'CACHE_FORMAT_VERSION', upload_cache.CACHE_FORMAT_VERSION + 1)
+    _, bumped = upload(client, data)
+    assert bumped['contact_set']['id'] != first['contact_set']['id']
+
+@pytest.fixture
+def messy_upload(tmp_path):
+    """Contacts with missing names, missing numbers and repeats spread across the file"""
+    lines = [HEADER]
+    for i in range(3000):
+        first = '' if i % 97 == 5 else f"First{i}"
+        last = '' if i % 89 == 7 else f"Last{i}"
+        # Every 10th row repeats an earlier row's number; every 71st has none
+        phone = '' if i % 71 == 3 else f"0794622{(i // 2 if i % 10 == 9 else i):04d}"
+        lines.append(f"{first},{last},{phone},Town,1/1/2024,https://example.org/{i},,\n")
+    path = tmp_path / 'messy.csv'
+    path.write_text(''.join(lines))
+    return str(path)
+
+def test_pooled_upload_gives_the_same_contacts_and_warnings_as_serial(web, messy_upload, monkeypatch):
+    monkeypatch.setitem(web.app.config, 'UPLOAD_WORKERS', 0)
+    serial, status = web.process_uploaded_file(messy_upload)
+    assert status == 200
+
+    monkeypatch.setitem(web.app.config, 'UPLOAD_WORKERS', 2)
+    monkeypatch.setitem(web.app.config, 'UPLOAD_CHUNK_ROWS', 1000)
+    monkeypatch.setitem(web.app.config, 'UPLOAD_PARTITION_ROWS', 170)
+    try:
+        pooled, status = web.process_uploaded_file(messy_upload)
+    finally:
+        web.get_upload_pool().terminate()
+    assert status == 200
+
+    assert pooled['results'] == serial['results']
+    assert pooled['warnings'] == serial['warnings']
+    assert any('Duplicate phone number' in warning for warning in serial['warnings'])
+    rows = [web.warning_row(warning) for warning in serial['warnings']]
+    assert rows == sorted(rows)
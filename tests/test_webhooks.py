@@ -0,0 +1,62 @@
+from twilio.request_validator import RequestValidator
+
+from app.config import Config
+from app.utils.suppression import get_suppression_list
+
+CALLBACK_URL = 'https://messagepilot.example.org/sms/status-callback'
+
+def signed(url, form):
+    """Headers Twilio would send when posting form to url"""
+    signature = RequestValidator(Config.TWILIO_AUTH_TOKEN).compute_signature(url, form)
+    return {'X-Twilio-Signature': signature}
+
+def test_status_callback_accepts_receipt_signed_for_public_https_url(app, monkeypatch):
+    # The test client posts to http://localhost, as the app sees requests behind the front end
+    monkeypatch.setattr(Config, 'SMS_STATUS_CALLBACK_URL', CALLBACK_URL)
+    form = {'MessageSid': 'SM' + '1' * 32, 'MessageStatus': 'delivered'}
+
+    response = app.test_client().post('/sms/status-callback', data=form, headers=signed(CALLBACK_URL, form))
+
+    assert response.status_code == 204
+
+def test_status_callback_rejects_signature_for_another_url(app, monkeypatch):
+    monkeypatch.setattr(Config, 'SMS_STATUS_CALLBACK_URL', CALLBACK_URL)
+    form = {'MessageSid': 'SM' + '2' * 32, 'MessageStatus': 'delivered'}
+
+    response = app.test_client().post('/sms/status-callback', data=form,
+                                      headers=signed('http://localhost/sms/status-callback', form))
+
+    assert response.status_code == 403
+
+def test_status_callback_rejects_unsigned_receipt(app, monkeypatch):
+    monkeypatch.setattr(Config, 'SMS_STATUS_CALLBACK_URL', CALLBACK_URL)
+
+    response = app.test_client().post('/sms/status-callback',
+                                      data={'MessageSid': 'SM' + '3' * 32, 'MessageStatus': 'delivered'})
+
+    assert response.status_code == 403
+
+INBOUND_URL = 'https://messagepilot.example.org/sms/inbound'
+
+def test_inbound_stop_signed_for_public_https_url_suppresses_sender(app, monkeypatch):
+    monkeypatch.setattr(Config, 'SMS_INBOUND_URL', INBOUND_URL)
+    sender = '+447700900123'
+    client = app.test_client()
+
+    stop = {'From': sender, 'Body': ' stop '}
+    assert client.post('/sms/inbound', data=stop, headers=signed(INBOUND_URL, stop)).status_code == 200
+    assert get_suppression_list().is_suppressed(sender)
+
+    start = {'From': sender, 'Body': 'START'}
+    assert client.post('/sms/inbound', data=start, headers=signed(INBOUND_URL, start)).status_code == 200
+    assert not get_suppression_list().is_suppressed(sender)
+
+def test_inbound_rejects_signature_for_another_url(app, monkeypatch):
+    monkeypatch.setattr(Config, 'SMS_INBOUND_URL', INBOUND_URL)
+    sender = '+447700900124'
+    form = {'From': sender, 'Body': 'STOP'}
+
+    response = app.test_client().post('/sms/inbound', data=form, headers=signed('http://localhost/sms/inbound', form))
+
+    assert response.status_code == 403
+    assert not get_suppression_list().is_suppressed(sender)
@@ -0,0 +1,54 @@
+import pandas as pd
+import pytest
+from openpyxl import Workbook
+
+from app.utils.xlsx_reader import _HEADER_SCAN_ROWS, iter_xlsx_chunks
+
+COLUMNS = ['First Name', 'Phone']
+
+def workbook(path, rows):
+    """Save rows to the first sheet, a None row left blank"""
+    book = Workbook()
+    sheet = book.active
+    for number, row in enumerate(rows, start=1):
+        for col, value in enumerate(row or [], start=1):
+            sheet.cell(row=number, column=col, value=value)
+    book.save(path)
+    return str(path)
+
+def read(path, chunk_rows=2):
+    return pd.concat(list(iter_xlsx_chunks(path, COLUMNS, chunk_rows)))
+
+DATA = [
+    ['First Name', 'Notes', 'Phone'],
+    ['Ada', 'x', '07946220160'],
+    None,
+    ['Bo', None, 7946220161],
+    ['Cy', 'y', None],
+]
+
+def test_header_on_first_row_reads_like_read_excel(tmp_path):
+    path = workbook(tmp_path / 'plain.xlsx', DATA)
+    expected = pd.read_excel(path, usecols=COLUMNS, dtype=object)
+    actual = read(path)
+    assert list(actual.columns) == COLUMNS
+    assert actual.where(actual.notna(), None).values.tolist() == \
+        expected.where(expected.notna(), None).values.tolist()
+
+@pytest.mark.parametrize('above', [[None, None], [['Volunteer contacts'], None], [None, ['Exported', '1/1/2024'], None]],
+                         ids=['blank rows', 'title', 'notes'])
+def test_header_below_blank_and_title_rows_is_found(tmp_path, above):
+    expected = read(workbook(tmp_path / 'plain.xlsx', DATA))
+    actual = read(workbook(tmp_path / 'offset.xlsx', above + DATA))
+    assert list(actual.columns) == COLUMNS
+    assert actual.values.tolist() == expected.values.tolist()
+    assert list(actual.index) == list(range(len(actual)))
+
+def test_sheet_without_the_wanted_headers_uses_its_first_non_empty_row(tmp_path):
+    rows = [None, ['Name', 'Number']] + [[f"N{i}", f"0794622{i:04d}"] for i in range(_HEADER_SCAN_ROWS + 5)]
+    rows.insert(5, None)
+    path = workbook(tmp_path / 'unknown.xlsx', rows)
+    actual = read(path)
+    # As read_excel would give it: no wanted columns, every row below the header kept
+    assert list(actual.columns) == []
+    assert len(actual) == len(pd.read_excel(path, header=1))